@@ -0,0 +1,158 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Motivos de rechazo
+MOTIVO_CAPACIDAD = 'capacidad'
+MOTIVO_PLAZO = 'plazo'
+
+
+class Saturado(Exception):
+    """La petición se rechaza sin procesarla (responder 503 con Retry-After)"""
+
+    def __init__(self, grupo, motivo, reintentar_en):
+        super().__init__(f"{grupo}: {motivo}")
+        self.grupo = grupo
+        self.motivo = motivo
+        self.reintentar_en = reintentar_en
+
+
+def leer_inicio_cola(valor):
+    """
+    Interpreta la cabecera X-Request-Start que agrega el proxy ("t=1700000000.123",
+    en segundos, milisegundos o microsegundos). Devuelve el instante en segundos
+    (time.time()) o None si no viene o no se entiende.
+    """
+    if not valor:
+        return None
+    try:
+        numero = float(valor.strip().removeprefix('t='))
+    except ValueError:
+        return None
+
+    # Normalizar a segundos según la magnitud
+    while numero > 1e11:
+        numero /= 1000
+    return numero
+
+
+class PresupuestoRuta:
+    """
+    Presupuesto de concurrencia de un grupo de rutas: como mucho 'limite'
+    peticiones en curso y una cola corta con espera acotada. Lleva las
+    métricas del grupo y una media móvil de la duración para el Retry-After.
+    """
+
+    def __init__(self, nombre, limite, espera_max=0.5, max_cola=None):
+        self.nombre = nombre
+        self.limite = limite
+        self.espera_max = espera_max
+        self.max_cola = limite if max_cola is None else max_cola
+        self._condicion = threading.Condition()
+
+        self.en_curso = 0
+        self.en_cola = 0
+        self.admitidas = 0
+        self.rechazadas = {MOTIVO_CAPACIDAD: 0, MOTIVO_PLAZO: 0}
+        self.fuera_de_plazo = 0
+        self.max_en_curso = 0
+        self.duracion_media = 0.0
+
+    def reintentar_en(self):
+        """Segundos sugeridos para reintentar: lo que tarda en vaciarse la cola"""
+        espera = self.duracion_media * (1 + self.en_cola / max(self.limite, 1))
+        return max(1, math.ceil(espera))
+
+    def _rechazar(self, motivo):
+        self.rechazadas[motivo] += 1
+        return Saturado(self.nombre, motivo, self.reintentar_en())
+
+    def entrar(self, disponible):
+        """Ocupa un lugar esperando como mucho 'disponible' segundos o lanza Saturado"""
+        with self._condicion:
+            if disponible <= 0:
+                raise self._rechazar(MOTIVO_PLAZO)
+
+            if self.en_curso >= self.limite:
+                if self.espera_max <= 0 or self.en_cola >= self.max_cola:
+                    raise self._rechazar(MOTIVO_CAPACIDAD)
+
+                self.en_cola += 1
+                try:
+                    hay_lugar = self._condicion.wait_for(
+                        lambda: self.en_curso < self.limite,
+                        min(self.espera_max, disponible)
+                    )
+                finally:
+                    self.en_cola -= 1
+                if not hay_lugar:
+                    raise self._rechazar(MOTIVO_CAPACIDAD)
+
+            self.en_curso += 1
+            self.admitidas += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+
+    def salir(self, duracion, fuera_de_plazo):
+        with self._condicion:
+            self.en_curso -= 1
+            # Media móvil exponencial: reacciona rápido a picos sin guardar historial
+            self.duracion_media += 0.2 * (duracion - self.duracion_media)
+            if fuera_de_plazo:
+                self.fuera_de_plazo += 1
+            self._condicion.notify()
+
+    def metricas(self):
+        with self._condicion:
+            return {
+                'limite': self.limite,
+                'en_curso': self.en_curso,
+                'en_cola': self.en_cola,
+                'max_en_curso': self.max_en_curso,
+                'admitidas': self.admitidas,
+                'rechazadas': dict(self.rechazadas),
+                'fuera_de_plazo': self.fuera_de_plazo,
+                'duracion_media_ms': int(self.duracion_media * 1000)
+            }
+
+
+class ControlAdmision:
+    """
+    Control de admisión por grupos de rutas con un plazo por petición.
+    El plazo cuenta desde que la petición llegó al proxy (X-Request-Start):
+    si ya pasó esperando en la cola del servidor, se rechaza de inmediato
+    en lugar de hacer un trabajo cuya respuesta nadie va a esperar.
+    """
+
+    def __init__(self, plazo=10.0):
+        self.plazo = plazo
+        self._grupos = {}
+
+    def grupo(self, nombre, limite, espera_max=0.5, max_cola=None):
+        """Registra un grupo de rutas con su presupuesto de concurrencia"""
+        self._grupos[nombre] = PresupuestoRuta(nombre, limite, espera_max, max_cola)
+        return self._grupos[nombre]
+
+    @contextmanager
+    def admitir(self, nombre, inicio_cola=None):
+        """
+        Contexto que ocupa un lugar del grupo mientras se atiende la petición.
+        Lanza Saturado si no hay capacidad o ya se agotó el plazo.
+        """
+        presupuesto = self._grupos[nombre]
+        ahora = time.time()
+        inicio = inicio_cola if inicio_cola is not None and inicio_cola <= ahora else ahora
+
+        presupuesto.entrar(self.plazo - (ahora - inicio))
+
+        comienzo = time.perf_counter()
+        try:
+            yield presupuesto
+        finally:
+            presupuesto.salir(time.perf_counter() - comienzo, time.time() - inicio > self.plazo)
+
+    def metricas(self):
+        return {
+            'plazo_s': self.plazo,
+            'grupos': {nombre: grupo.metricas() for nombre, grupo in self._grupos.items()}
+        }
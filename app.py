@@ -1,8 +1,14 @@
+import base64
 import json
+import logging
+import math
 import os
 import sys
 import smtplib
-from flask import Flask, jsonify, request, send_from_directory
+import time
+import uuid
+from functools import wraps
+from flask import Flask, g, jsonify, request, send_from_directory
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
@@ -11,10 +17,24 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from dotenv import load_dotenv
 import resend
+from catalogo import GestorCatalogo, resumir_item, etag_combinado, ordenar_por_relevancia
+from busqueda import slug_persona
+from recomendaciones import vecinos_de
+from resolucion import CacheEnlaces, ResolvedorEnlaces
+from salud_servidores import TablaSalud, VerificadorSalud, verificar_catalogo, ordenar_servidores
+from concurrencia import UnVuelo, UnVueloEntreProcesos
+from cambios import RegistroCambios
+from admision import ControlAdmision, Saturado, leer_inicio_cola
+from registro import configurar_registro, request_id, registros_descartados
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Logging estructurado (JSON por defecto, escrito desde un hilo aparte)
+configurar_registro()
+log = logging.getLogger('api')
+log_peticiones = logging.getLogger('api.peticiones')
+
 # ==================== CONFIGURACIÓN DE LA APP ====================
 if sys.platform == 'win32':
     app = Flask(__name__, static_folder='../frontend', static_url_path='')
@@ -46,7 +66,7 @@ if ENV == 'development':
             "supports_credentials": True
         }
     })
-    print("🔧 CORS configurado para DESARROLLO")
+    log.info("🔧 CORS configurado para DESARROLLO")
 else:
     ALLOWED_ORIGINS = [
         "https://web-streaming-frontend.pages.dev",  
@@ -61,19 +81,151 @@ else:
             "supports_credentials": True
         }
     })
-    print(f"🔒 CORS configurado para PRODUCCIÓN: {ALLOWED_ORIGINS}")
+    log.info(f"🔒 CORS configurado para PRODUCCIÓN: {ALLOWED_ORIGINS}")
 
 # Configuración
 CACHE_DIR = 'cache'
 PELICULAS_FILE = os.path.join(CACHE_DIR, 'peliculas.json')
 SERIES_FILE = os.path.join(CACHE_DIR, 'series.json')
+ENLACES_FILE = os.path.join(CACHE_DIR, 'enlaces.sqlite3')
+SALUD_FILE = os.path.join(CACHE_DIR, 'salud.sqlite3')
+SALUD_LOCK = os.path.join(CACHE_DIR, 'salud.lock')
+VUELOS_DIR = os.path.join(CACHE_DIR, 'vuelos')
+CAMBIOS_FILE = os.path.join(CACHE_DIR, 'cambios.sqlite3')
+
+# Tiempo de vida de un enlace de video resuelto (segundos)
+ENLACES_TTL = int(os.getenv('ENLACES_TTL', 1800))
+ENLACES_MAX = int(os.getenv('ENLACES_MAX', 5000))
+
+# Cada cuántos minutos se revisa la salud de los servidores (0 = desactivado)
+SALUD_INTERVALO_MIN = int(os.getenv('SALUD_INTERVALO_MIN', 0))
+
+# Agrupar cálculos idénticos también entre workers de gunicorn (archivos de bloqueo)
+COALESCER_ENTRE_WORKERS = os.getenv('COALESCER_ENTRE_WORKERS', '0') == '1'
+
+# Carga de catálogos al arrancar: 'fondo' (hilo aparte), 'sincrona' (antes de
+# aceptar peticiones; con gunicorn --preload se hace una vez en el master y los
+# workers comparten la memoria) o 'no' (al llegar la primera petición)
+PRECARGA = os.getenv('PRECARGA', 'fondo')
+
+# Plazo de una petición desde que llega al proxy (segundos); pasado ese tiempo
+# se rechaza en lugar de atenderla
+PLAZO_PETICION = float(os.getenv('PLAZO_PETICION', 10))
+
+# Peticiones simultáneas por worker en cada grupo de rutas costosas
+PRESUPUESTOS_RUTAS = {
+    'busqueda': int(os.getenv('PRESUPUESTO_BUSQUEDA', 4)),
+    'relacionados': int(os.getenv('PRESUPUESTO_RELACIONADOS', 4)),
+    'listados': int(os.getenv('PRESUPUESTO_LISTADOS', 8)),
+    'resolver': int(os.getenv('PRESUPUESTO_RESOLVER', 8))
+}
 
 resend.api_key = os.getenv('RESEND_API_KEY')
 EMAIL_DESTINATARIO = os.getenv('EMAIL_DESTINATARIO')
 
+# Máximo de IDs aceptados por /api/lote
+LIMITE_LOTE = 50
+
+# Órdenes de /api/peliculas que usan una columna tipada: (columna, descendente)
+ORDENES_COLUMNA = {'año': ('año', True), 'rating': ('rating', True), 'duracion': ('duracion', False)}
+
+# Máximo de sugerencias devueltas por /api/sugerencias
+LIMITE_SUGERENCIAS = 10
+
+# Máximo de resultados de una búsqueda difusa (antes de paginar)
+LIMITE_BUSQUEDA_DIFUSA = 100
+
+# Máximo de resultados por catálogo en /api/buscar (antes de paginar)
+LIMITE_BUSQUEDA_UNIFICADA = 100
+
+# Versiones del catálogo cuyo historial de cambios se conserva
+MAX_VERSIONES_CAMBIOS = int(os.getenv('MAX_VERSIONES_CAMBIOS', 200))
+
+# Máximo de ids en una respuesta de /api/cambios (si hay más, resincronizar)
+LIMITE_CAMBIOS = 5000
+
 # Crear directorio de cache si no existe
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# Catálogos en memoria con índices (se recargan si cambia el archivo)
+catalogo = GestorCatalogo({
+    'peliculas': PELICULAS_FILE,
+    'series': SERIES_FILE
+}, cambios=RegistroCambios(CAMBIOS_FILE, max_versiones=MAX_VERSIONES_CAMBIOS))
+
+if PRECARGA == 'sincrona':
+    catalogo.precargar()
+elif PRECARGA == 'fondo':
+    catalogo.precargar_en_segundo_plano()
+
+# Resolución de enlaces de video bajo demanda (cache compartida entre workers)
+resolvedor = ResolvedorEnlaces(CacheEnlaces(ENLACES_FILE, ttl=ENLACES_TTL, max_entradas=ENLACES_MAX))
+
+# Peticiones idénticas simultáneas se calculan una sola vez
+vuelos = UnVuelo()
+vuelos_entre_workers = UnVueloEntreProcesos(VUELOS_DIR) if COALESCER_ENTRE_WORKERS else None
+
+# Control de admisión: las rutas pesadas no pueden ocupar todos los hilos
+admision = ControlAdmision(plazo=PLAZO_PETICION)
+for nombre, limite in PRESUPUESTOS_RUTAS.items():
+    admision.grupo(nombre, limite)
+
+# Salud de servidores (tabla compartida entre workers)
+tabla_salud = TablaSalud(SALUD_FILE)
+
+def revisar_salud_servidores():
+    """Tarea periódica: revisa todos los servidores del catálogo"""
+    try:
+        verificar_catalogo(
+            VerificadorSalud(tabla_salud),
+            catalogo.obtener('peliculas').items,
+            catalogo.obtener('series').items,
+            archivo_lock=SALUD_LOCK
+        )
+    except Exception as e:
+        log.exception(f"Error revisando salud de servidores: {e}")
+
+if SALUD_INTERVALO_MIN > 0:
+    from apscheduler.schedulers.background import BackgroundScheduler
+    
+    planificador = BackgroundScheduler(daemon=True)
+    planificador.add_job(
+        revisar_salud_servidores,
+        'interval',
+        minutes=SALUD_INTERVALO_MIN,
+        max_instances=1,
+        coalesce=True
+    )
+    planificador.start()
+    log.info(f"🩺 Revisión de servidores cada {SALUD_INTERVALO_MIN} minutos")
+
+# ==================== REGISTRO DE PETICIONES ====================
+
+@app.before_request
+def iniciar_peticion():
+    """Asigna un id a la petición (o respeta el del proxy) y empieza a medir"""
+    g.inicio_peticion = time.perf_counter()
+    g.request_id = request.headers.get('X-Request-Id') or uuid.uuid4().hex[:16]
+    request_id.set(g.request_id)
+
+@app.after_request
+def registrar_peticion(response):
+    """Una línea de log por petición con su estado y duración"""
+    inicio = g.get('inicio_peticion')
+    if inicio is not None:
+        log_peticiones.info(
+            f"{request.method} {request.path} {response.status_code}",
+            extra={
+                'metodo': request.method,
+                'ruta': request.path,
+                'endpoint': request.endpoint,
+                'estado': response.status_code,
+                'duracion_ms': round((time.perf_counter() - inicio) * 1000, 1)
+            }
+        )
+        response.headers['X-Request-Id'] = g.request_id
+    return response
+
 # ==================== UTILIDADES ====================
 
 def cargar_json(archivo):
@@ -84,7 +236,7 @@ def cargar_json(archivo):
                 return json.load(f)
         return []
     except Exception as e:
-        print(f"Error cargando {archivo}: {e}")
+        log.error(f"Error cargando {archivo}: {e}")
         return []
 
 def guardar_json(archivo, datos):
@@ -94,9 +246,26 @@ def guardar_json(archivo, datos):
             json.dump(datos, f, ensure_ascii=False, indent=2)
         return True
     except Exception as e:
-        print(f"Error guardando {archivo}: {e}")
+        log.error(f"Error guardando {archivo}: {e}")
         return False
 
+def es_verdadero(valor):
+    """Interpreta un parámetro de query string como booleano"""
+    return str(valor).lower() in ['1', 'true', 'si', 'sí']
+
+def parametro_numerico(nombre, tipo):
+    """
+    Parámetro numérico opcional de la query string: None si falta o está
+    vacío; ValueError si viene pero no es un número finito
+    """
+    valor = request.args.get(nombre, '').strip()
+    if not valor:
+        return None
+    numero = tipo(valor)
+    if not math.isfinite(numero):
+        raise ValueError(valor)
+    return numero
+
 def paginar(items, pagina, por_pagina=20):
     """Pagina una lista de items"""
     inicio = (pagina - 1) * por_pagina
@@ -111,6 +280,108 @@ def paginar(items, pagina, por_pagina=20):
         'items_por_pagina': por_pagina
     }
 
+def codificar_cursor(posicion, huella):
+    """Genera un cursor opaco con la posición y la huella del catálogo"""
+    return base64.urlsafe_b64encode(f"{posicion}:{huella}".encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor):
+    """Devuelve (posicion, huella) de un cursor, o None si es inválido"""
+    try:
+        posicion, huella = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':', 1)
+        return int(posicion), huella
+    except Exception:
+        return None
+
+def coalescer(vista):
+    """
+    Decorador para rutas costosas: las peticiones simultáneas con la misma
+    ruta, argumentos y versión del catálogo esperan el resultado de la primera
+    en lugar de recalcularlo. No usar en rutas con respuestas condicionales.
+    Va por fuera de con_presupuesto: solo la primera ocupa un lugar del
+    presupuesto y las que esperan su resultado no lo agotan.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        clave = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(request.args.items(multi=True))),
+            catalogo.version_actual()
+        )
+        
+        def calcular():
+            respuesta = app.make_response(vista(*args, **kwargs))
+            return respuesta.get_data(), respuesta.status_code, list(respuesta.headers.items())
+        
+        if vuelos_entre_workers is not None:
+            cuerpo, estado, headers = vuelos.ejecutar(clave, vuelos_entre_workers.ejecutar, clave, calcular)
+        else:
+            cuerpo, estado, headers = vuelos.ejecutar(clave, calcular)
+        
+        # Cada petición recibe su propia respuesta (after_request/CORS la modifican)
+        return app.response_class(cuerpo, status=estado, headers=headers)
+    
+    return envoltura
+
+def con_presupuesto(grupo):
+    """
+    Decorador que atiende la ruta dentro del presupuesto de concurrencia del
+    grupo. Si no hay capacidad responde 503 con Retry-After de inmediato.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            try:
+                with admision.admitir(grupo, leer_inicio_cola(request.headers.get('X-Request-Start'))):
+                    return vista(*args, **kwargs)
+            except Saturado as e:
+                respuesta = jsonify({
+                    'error': 'Servidor ocupado, intenta de nuevo en unos segundos',
+                    'motivo': e.motivo
+                })
+                respuesta.status_code = 503
+                respuesta.headers['Retry-After'] = str(e.reintentar_en)
+                return respuesta
+        
+        return envoltura
+    
+    return decorador
+
+def con_servidores_por_salud(item, incluir_caidos=False):
+    """Copia de un item (película o episodio) con sus servidores ordenados por salud"""
+    servidores = item.get('servidores') or []
+    estados = tabla_salud.estados([s.get('url_redirect') for s in servidores])
+    return {**item, 'servidores': ordenar_servidores(servidores, estados, incluir_caidos)}
+
+def serie_con_servidores_por_salud(serie, incluir_caidos=False):
+    """Copia de una serie con los servidores de cada episodio ordenados por salud"""
+    # En los listados 'temporadas' es un texto ("seasons 1"): la serie va tal cual
+    if not isinstance(serie.get('temporadas'), list):
+        return serie
+    
+    urls = [
+        s.get('url_redirect')
+        for temporada in serie['temporadas'] if isinstance(temporada, dict)
+        for episodio in temporada.get('episodios') or [] if isinstance(episodio, dict)
+        for s in episodio.get('servidores') or []
+    ]
+    estados = tabla_salud.estados(urls)
+    
+    temporadas = []
+    for temporada in serie['temporadas']:
+        if isinstance(temporada, dict) and isinstance(temporada.get('episodios'), list):
+            temporada = {
+                **temporada,
+                'episodios': [
+                    {**ep, 'servidores': ordenar_servidores(ep.get('servidores') or [], estados, incluir_caidos)}
+                    if isinstance(ep, dict) else ep
+                    for ep in temporada['episodios']
+                ]
+            }
+        temporadas.append(temporada)
+    
+    return {**serie, 'temporadas': temporadas}
+
 # ==================== RUTAS FRONTEND ====================
 
 @app.route('/')
@@ -126,6 +397,8 @@ def static_files(path):
 # ==================== API RELACIONADOS ====================
 
 @app.route('/api/<tipo>/<item_id>/relacionados', methods=['GET'])
+@coalescer
+@con_presupuesto('relacionados')
 def obtener_relacionados(tipo, item_id):
     """
     Obtiene contenido relacionado por género y año
@@ -134,6 +407,8 @@ def obtener_relacionados(tipo, item_id):
         - item_id: ID del item actual
     Query params opcionales:
         - limite: cantidad de resultados (default: 10)
+        - modo: 'generos' (default) o 'contenido' (similitud de descripción,
+          director y actores precalculada al cargar el catálogo)
     """
     try:
         # Validar tipo
@@ -145,44 +420,60 @@ def obtener_relacionados(tipo, item_id):
         if limite > 20:
             limite = 20  # Máximo 20 resultados
         
-        # Cargar datos según el tipo
-        archivo = PELICULAS_FILE if tipo == 'peliculas' else SERIES_FILE
-        datos = cargar_json(archivo)
+        modo = request.args.get('modo', 'generos')
+        if modo not in ['generos', 'contenido']:
+            return jsonify({'error': 'Modo inválido'}), 400
+        
+        # Obtener el catálogo según el tipo
+        snapshot = catalogo.obtener(tipo)
+        datos = snapshot.items
         
         if not datos:
             return jsonify({'error': 'No se pudieron cargar los datos'}), 500
         
         # Buscar el item actual
-        item_actual = next((item for item in datos if item.get('id') == item_id), None)
+        item_actual = snapshot.por_id.get(item_id)
         
         if not item_actual:
             return jsonify({'error': f'Item con ID {item_id} no encontrado'}), 404
         
-        # Obtener géneros y año del item actual
+        # Obtener géneros y año del item actual (el año ya viene tipado)
         generos_actual = item_actual.get('generos', [])
         año_actual = item_actual.get('año')
+        años = snapshot.columnas['año'].valores
+        año_actual_num = años[snapshot.posicion_de(item_actual)]
         
-        # Calcular relacionados con puntuación
-        relacionados = []
+        # Modo contenido: los vecinos ya están calculados, solo se leen
+        if modo == 'contenido' and snapshot.vecinos is None:
+            modo = 'generos'
         
-        for item in datos:
-            # Saltar el item actual
-            if item == item_actual:
-                continue
-            
-            puntuacion = 0
-            
-            # Puntos por géneros compartidos
-            generos_item = item.get('generos', [])
-            if generos_actual and generos_item:
-                generos_comunes = set(generos_actual) & set(generos_item)
-                puntuacion += len(generos_comunes) * 3  # 3 puntos por género común
+        if modo == 'contenido':
+            vecinos = vecinos_de(snapshot.vecinos, snapshot.posicion_de(item_actual), limite)
+            relacionados = [
+                {'item': datos[posicion], 'puntuacion': similitud}
+                for posicion, similitud in vecinos
+            ]
+        else:
+            # Calcular relacionados con puntuación
+            relacionados = []
             
-            # Puntos por año cercano
-            año_item = item.get('año')
-            if año_actual and año_item:
-                try:
-                    diferencia_años = abs(int(año_actual) - int(año_item))
+            for posicion, item in enumerate(datos):
+                # Saltar el item actual
+                if item is item_actual:
+                    continue
+                
+                puntuacion = 0
+                
+                # Puntos por géneros compartidos
+                generos_item = item.get('generos', [])
+                if generos_actual and generos_item:
+                    generos_comunes = set(generos_actual) & set(generos_item)
+                    puntuacion += len(generos_comunes) * 3  # 3 puntos por género común
+                
+                # Puntos por año cercano
+                año_item = años[posicion]
+                if año_actual_num is not None and año_item is not None:
+                    diferencia_años = abs(año_actual_num - año_item)
                     if diferencia_años == 0:
                         puntuacion += 5
                     elif diferencia_años <= 1:
@@ -191,15 +482,13 @@ def obtener_relacionados(tipo, item_id):
                         puntuacion += 2
                     elif diferencia_años <= 5:
                         puntuacion += 1
-                except (ValueError, TypeError):
-                    pass
-            
-            # Solo incluir si tiene alguna relación
-            if puntuacion > 0:
-                relacionados.append({
-                    'item': item,
-                    'puntuacion': puntuacion
-                })
+                
+                # Solo incluir si tiene alguna relación
+                if puntuacion > 0:
+                    relacionados.append({
+                        'item': item,
+                        'puntuacion': puntuacion
+                    })
         
         # Ordenar por puntuación descendente
         relacionados.sort(key=lambda x: x['puntuacion'], reverse=True)
@@ -213,6 +502,7 @@ def obtener_relacionados(tipo, item_id):
         return jsonify({
             'relacionados': resultado,
             'total': len(resultado),
+            'modo': modo,
             'item_actual': {
                 'id': item_id,
                 'titulo': item_actual.get('titulo') or item_actual.get('nombre'),
@@ -222,54 +512,113 @@ def obtener_relacionados(tipo, item_id):
         })
     
     except Exception as e:
-        print(f'Error obteniendo relacionados: {str(e)}')
+        log.exception(f'Error obteniendo relacionados: {str(e)}')
         return jsonify({'error': 'Error procesando la solicitud'}), 500
 
 # ==================== API PELÍCULAS ====================
 
 @app.route('/api/peliculas')
+@con_presupuesto('listados')
 def listar_peliculas():
-    """Lista todas las películas con paginación"""
-    peliculas = cargar_json(PELICULAS_FILE)
+    """
+    Lista todas las películas con paginación
+    Query params opcionales:
+        - genero, calidad, año: filtros exactos
+        - año_desde, año_hasta, rating_min, duracion_max (minutos): filtros por rango
+          (un valor que no es número responde 400)
+        - persona: nombre o slug de un director/actor
+        - rol: 'director' o 'actor' (solo junto con persona)
+        - ordenar: 'reciente' (default), 'titulo', 'año', 'rating' o 'duracion'
+    """
+    snapshot = catalogo.obtener('peliculas')
     
     # Parámetros de consulta
     pagina = request.args.get('pagina', 1, type=int)
     por_pagina = request.args.get('por_pagina', 20, type=int)
     genero = request.args.get('genero', None)
-    año = request.args.get('año', None)
     calidad = request.args.get('calidad', None)
+    persona = request.args.get('persona', None)
+    rol = request.args.get('rol', None)
     ordenar = request.args.get('ordenar', 'reciente')
     
-    # Filtrar
-    if genero:
-        peliculas = [p for p in peliculas if genero in p.get('generos', [])]
+    # Un filtro numérico inválido es un error del cliente, no un filtro ignorado
+    try:
+        año = parametro_numerico('año', int)
+        año_desde = parametro_numerico('año_desde', int)
+        año_hasta = parametro_numerico('año_hasta', int)
+        rating_min = parametro_numerico('rating_min', float)
+        duracion_max = parametro_numerico('duracion_max', int)
+    except ValueError:
+        return jsonify({'error': 'año, año_desde, año_hasta, rating_min y duracion_max deben ser números'}), 400
     
-    if año:
-        peliculas = [p for p in peliculas if str(p.get('año', '')) == str(año)]
+    if año is not None:
+        año_desde = año_hasta = año
     
-    if calidad:
-        peliculas = [p for p in peliculas if p.get('calidad', '') == calidad]
+    # Filtros por rango con búsqueda binaria sobre las columnas tipadas
+    candidatos = snapshot.filtrar_rangos({
+        'año': (año_desde, año_hasta),
+        'rating': (rating_min, None),
+        'duracion': (None, duracion_max)
+    })
     
-    # Ordenar
-    if ordenar == 'titulo':
-        peliculas.sort(key=lambda x: x.get('titulo', ''))
-    elif ordenar == 'año':
-        peliculas.sort(key=lambda x: x.get('año', 0), reverse=True)
+    # La persona se resuelve con el índice, sin recorrer el catálogo
+    if persona:
+        posiciones_persona = {
+            snapshot.posicion_de(p)
+            for p in snapshot.personas.titulos(slug_persona(persona), rol)
+        }
+        candidatos = posiciones_persona if candidatos is None else candidatos & posiciones_persona
+    
+    # Orden de las posiciones: sin filtros se usan los órdenes precalculados;
+    # con filtros se ordenan solo los candidatos, sin recorrer toda la columna
+    if ordenar in ORDENES_COLUMNA:
+        campo, descendente = ORDENES_COLUMNA[ordenar]
+        columna = snapshot.columnas[campo]
+        if candidatos is not None:
+            posiciones = columna.ordenar(candidatos, descendente)
+        else:
+            posiciones = columna.orden_descendente if descendente else columna.orden_ascendente
+    elif ordenar == 'titulo':
+        posiciones = sorted(
+            candidatos if candidatos is not None else range(len(snapshot.items)),
+            key=lambda i: snapshot.items[i].get('titulo') or ''
+        )
+    else:
+        posiciones = sorted(candidatos) if candidatos is not None else range(len(snapshot.items))
+    
+    if genero:
+        posiciones = [i for i in posiciones if genero in snapshot.items[i].get('generos', [])]
+    
+    if calidad:
+        posiciones = [i for i in posiciones if snapshot.items[i].get('calidad', '') == calidad]
     
-    # Paginar
-    resultado = paginar(peliculas, pagina, por_pagina)
+    # Paginar posiciones y solo materializar los items de la página
+    resultado = paginar(posiciones, pagina, por_pagina)
+    resultado['items'] = [snapshot.items[i] for i in resultado['items']]
     
     return jsonify(resultado)
 
 @app.route('/api/peliculas/buscar')
+@coalescer
+@con_presupuesto('busqueda')
 def buscar_peliculas():
-    """Busca películas por título"""
+    """
+    Busca películas por título
+    Query params opcionales:
+        - difuso: si es 1, tolera errores de escritura y acentos en el título
+    """
     query = request.args.get('q', '').lower()
     pagina = request.args.get('pagina', 1, type=int)
+    difuso = es_verdadero(request.args.get('difuso', '0'))
     
     if not query:
         return jsonify({'error': 'Se requiere un término de búsqueda'}), 400
     
+    if difuso:
+        snapshot = catalogo.obtener('peliculas')
+        resultados = [p for _, p in snapshot.trigramas.buscar(query, LIMITE_BUSQUEDA_DIFUSA)]
+        return jsonify(paginar(resultados, pagina))
+    
     peliculas = cargar_json(PELICULAS_FILE)
     
     # Buscar en título y descripción
@@ -283,16 +632,21 @@ def buscar_peliculas():
 
 @app.route('/api/pelicula/<string:id>')
 def detalle_pelicula(id):
-    """Obtiene el detalle de una película"""
-    peliculas = cargar_json(PELICULAS_FILE)
+    """
+    Obtiene el detalle de una película
+    Los servidores vienen ordenados por salud y sin los caídos
+    (query param incluir_caidos=1 para verlos)
+    """
+    snapshot = catalogo.obtener('peliculas')
     
-    if not peliculas:
+    if not snapshot.items:
         return jsonify({'error': 'No se pudieron cargar los datos'}), 500
     
-    pelicula = next((p for p in peliculas if p.get('id') == id), None)
+    pelicula = snapshot.por_id.get(id)
     
     if pelicula:
-        return jsonify(pelicula)
+        incluir_caidos = es_verdadero(request.args.get('incluir_caidos', '0'))
+        return jsonify(con_servidores_por_salud(pelicula, incluir_caidos))
     
     return jsonify({'error': 'Película no encontrada'}), 404
 
@@ -310,6 +664,7 @@ def pelicula_por_url(url):
 # ==================== API SERIES ====================
 
 @app.route('/api/series')
+@con_presupuesto('listados')
 def listar_series():
     """Lista todas las series con paginación"""
     series = cargar_json(SERIES_FILE)
@@ -330,14 +685,26 @@ def listar_series():
     return jsonify(resultado)
 
 @app.route('/api/series/buscar')
+@coalescer
+@con_presupuesto('busqueda')
 def buscar_series():
-    """Busca series por título"""
+    """
+    Busca series por título
+    Query params opcionales:
+        - difuso: si es 1, tolera errores de escritura y acentos en el título
+    """
     query = request.args.get('q', '').lower()
     pagina = request.args.get('pagina', 1, type=int)
+    difuso = es_verdadero(request.args.get('difuso', '0'))
     
     if not query:
         return jsonify({'error': 'Se requiere un término de búsqueda'}), 400
     
+    if difuso:
+        snapshot = catalogo.obtener('series')
+        resultados = [s for _, s in snapshot.trigramas.buscar(query, LIMITE_BUSQUEDA_DIFUSA)]
+        return jsonify(paginar(resultados, pagina))
+    
     series = cargar_json(SERIES_FILE)
     
     resultados = [
@@ -349,14 +716,18 @@ def buscar_series():
     return jsonify(paginar(resultados, pagina))
 
 @app.route('/api/serie/<string:id>')
+@coalescer
 def detalle_serie(id):
-    """Obtiene el detalle completo de una serie"""
-    series = cargar_json(SERIES_FILE)
-    
-    serie = next((p for p in series if p.get('id') == id), None)
+    """
+    Obtiene el detalle completo de una serie
+    Los servidores de cada episodio vienen ordenados por salud y sin los
+    caídos (query param incluir_caidos=1 para verlos)
+    """
+    serie = catalogo.obtener('series').por_id.get(id)
 
     if serie:
-        return jsonify(serie)
+        incluir_caidos = es_verdadero(request.args.get('incluir_caidos', '0'))
+        return jsonify(serie_con_servidores_por_salud(serie, incluir_caidos))
     
     return jsonify({'error': 'Serie no encontrada'}), 404
 
@@ -371,6 +742,355 @@ def serie_por_url(url):
     
     return jsonify({'error': 'Serie no encontrada'}), 404
 
+# ==================== API EPISODIOS ====================
+
+def describir_episodio(entrada, con_servidores=True):
+    """Arma la respuesta de un episodio con su serie y temporada"""
+    serie = entrada['serie']
+    temporada = entrada['temporada']
+    episodio = entrada['episodio']
+    
+    datos = {
+        'id': entrada['id'],
+        'numero': episodio.get('numero'),
+        'titulo': episodio.get('titulo'),
+        'url': episodio.get('url'),
+        'imagen': episodio.get('imagen'),
+        'estado': episodio.get('estado'),
+        'serie': {
+            'id': serie.get('id'),
+            'titulo': serie.get('titulo')
+        },
+        'temporada': {
+            'numero': temporada.get('numero'),
+            'nombre': temporada.get('nombre')
+        }
+    }
+    if con_servidores:
+        incluir_caidos = es_verdadero(request.args.get('incluir_caidos', '0'))
+        datos['servidores'] = con_servidores_por_salud(episodio, incluir_caidos)['servidores']
+    
+    return datos
+
+def responder_episodio(entrada):
+    """Respuesta de un episodio con los IDs de sus episodios vecinos"""
+    indice = catalogo.obtener('series').episodios
+    anterior = indice.vecino(entrada, -1)
+    siguiente = indice.vecino(entrada, 1)
+    
+    return jsonify({
+        **describir_episodio(entrada),
+        'anterior': anterior['id'] if anterior else None,
+        'siguiente': siguiente['id'] if siguiente else None
+    })
+
+@app.route('/api/episodio/<string:episodio_id>')
+def detalle_episodio(episodio_id):
+    """Resuelve un episodio: su serie, temporada, servidores y vecinos"""
+    entrada = catalogo.obtener('series').episodios.obtener(episodio_id)
+    
+    if not entrada:
+        return jsonify({'error': 'Episodio no encontrado'}), 404
+    
+    return responder_episodio(entrada)
+
+@app.route('/api/episodio/url/<path:url>')
+def episodio_por_url(url):
+    """Obtiene un episodio por su URL original"""
+    entrada = catalogo.obtener('series').episodios.obtener_por_url(url)
+    
+    if not entrada:
+        return jsonify({'error': 'Episodio no encontrado'}), 404
+    
+    return responder_episodio(entrada)
+
+@app.route('/api/episodio/<string:episodio_id>/<any(siguiente, anterior):direccion>')
+def episodio_vecino(episodio_id, direccion):
+    """Obtiene el episodio siguiente o anterior (con sus servidores) para autoplay"""
+    indice = catalogo.obtener('series').episodios
+    entrada = indice.obtener(episodio_id)
+    
+    if not entrada:
+        return jsonify({'error': 'Episodio no encontrado'}), 404
+    
+    vecino = indice.vecino(entrada, 1 if direccion == 'siguiente' else -1)
+    
+    if not vecino:
+        return jsonify({'error': f'No hay episodio {direccion}'}), 404
+    
+    return responder_episodio(vecino)
+
+# ==================== API ENLACES ====================
+
+@app.route('/api/<any(pelicula, episodio):tipo>/<string:item_id>/servidores/<int:indice>/resolver')
+@limiter.limit("60 per minute")
+@con_presupuesto('resolver')
+def resolver_servidor(tipo, item_id, indice):
+    """
+    Resuelve la URL final de video de un servidor en el momento del clic
+    Parámetros:
+        - tipo: 'pelicula' o 'episodio'
+        - item_id: ID de la película o del episodio
+        - indice: posición del servidor en la lista 'servidores'
+    """
+    if tipo == 'pelicula':
+        item = catalogo.obtener('peliculas').por_id.get(item_id)
+    else:
+        entrada = catalogo.obtener('series').episodios.obtener(item_id)
+        item = entrada['episodio'] if entrada else None
+    
+    if not item:
+        return jsonify({'error': 'Item no encontrado'}), 404
+    
+    servidores = item.get('servidores') or []
+    if not 0 <= indice < len(servidores):
+        return jsonify({'error': 'Servidor no encontrado'}), 404
+    
+    servidor = servidores[indice]
+    url_redirect = servidor.get('url_redirect')
+    if not url_redirect:
+        return jsonify({'error': 'El servidor no tiene enlace'}), 404
+    
+    url_final, desde_cache = resolvedor.resolver(url_redirect, item.get('player_url'))
+    
+    if not url_final:
+        return jsonify({'error': 'No se pudo resolver el enlace'}), 502
+    
+    return jsonify({
+        'servidor': servidor.get('nombre'),
+        'url_final': url_final,
+        'desde_cache': desde_cache
+    })
+
+# ==================== API BÚSQUEDA UNIFICADA ====================
+
+@app.route('/api/buscar')
+@coalescer
+@con_presupuesto('busqueda')
+def buscar_todo():
+    """
+    Busca a la vez en películas y series con un único ranking
+    Query params:
+        - q: término de búsqueda
+        - cursor: cursor devuelto por la página anterior (opcional)
+        - limite: resultados por página (default: 20, máximo: 50)
+        - modo: 'resumen' (default) o 'completo'
+    """
+    query = request.args.get('q', '')
+    cursor = request.args.get('cursor')
+    limite = max(1, min(request.args.get('limite', 20, type=int), 50))
+    modo = request.args.get('modo', 'resumen')
+    
+    if not query.strip():
+        return jsonify({'error': 'Se requiere un término de búsqueda'}), 400
+    
+    if modo not in ['resumen', 'completo']:
+        return jsonify({'error': 'Modo inválido'}), 400
+    
+    peliculas = catalogo.obtener('peliculas')
+    series = catalogo.obtener('series')
+    huella = etag_combinado([peliculas, series])[:12]
+    
+    posicion = 0
+    if cursor:
+        datos_cursor = decodificar_cursor(cursor)
+        if datos_cursor is None:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        posicion, huella_cursor = datos_cursor
+        if huella_cursor != huella:
+            return jsonify({'error': 'El catálogo cambió, reinicia la búsqueda'}), 409
+    
+    resultados = []
+    for snapshot, tipo in [(peliculas, 'pelicula'), (series, 'serie')]:
+        for relevancia, item in snapshot.buscar(query, LIMITE_BUSQUEDA_UNIFICADA):
+            resultados.append((relevancia, tipo, item))
+    
+    ordenar_por_relevancia(resultados)
+    pagina = resultados[posicion:posicion + limite]
+    
+    siguiente = posicion + limite
+    
+    return jsonify({
+        'resultados': [
+            {
+                'id': item.get('id'),
+                'tipo': tipo,
+                'relevancia': round(relevancia, 3),
+                'datos': item if modo == 'completo' else resumir_item(item)
+            }
+            for relevancia, tipo, item in pagina
+        ],
+        'total': len(resultados),
+        'siguiente_cursor': codificar_cursor(siguiente, huella) if siguiente < len(resultados) else None
+    })
+
+# ==================== API PERSONAS ====================
+
+def resumir_persona(persona):
+    """Datos básicos de una persona con la cantidad de títulos por rol"""
+    return {
+        'slug': persona['slug'],
+        'nombre': persona['nombre'],
+        'roles': {rol: len(titulos) for rol, titulos in persona['titulos'].items()}
+    }
+
+@app.route('/api/personas/buscar')
+def buscar_personas():
+    """
+    Autocompletado de directores y actores
+    Query params:
+        - q: parte del nombre (se ignoran acentos y mayúsculas)
+        - limite: cantidad de resultados (default: 10, máximo: 20)
+    """
+    query = request.args.get('q', '')
+    limite = max(1, min(request.args.get('limite', 10, type=int), 20))
+    
+    if not query.strip():
+        return jsonify({'error': 'Se requiere un término de búsqueda'}), 400
+    
+    personas = catalogo.obtener('peliculas').personas.buscar(query, limite)
+    
+    return jsonify({
+        'personas': [resumir_persona(p) for p in personas],
+        'total': len(personas)
+    })
+
+@app.route('/api/persona/<string:slug>')
+def detalle_persona(slug):
+    """Obtiene una persona y sus títulos ordenados por año (más recientes primero)"""
+    snapshot = catalogo.obtener('peliculas')
+    slug = slug_persona(slug)
+    persona = snapshot.personas.obtener(slug)
+    
+    if not persona:
+        return jsonify({'error': 'Persona no encontrada'}), 404
+    
+    # Año ya parseado de la columna tipada; los títulos sin año van al final
+    años = snapshot.columnas['año'].valores
+    def clave_año(item):
+        año = años[snapshot.posicion_de(item)]
+        return (año is None, -(año or 0))
+    
+    titulos = {}
+    for rol, items in persona['titulos'].items():
+        ordenados = sorted(items, key=clave_año)
+        titulos[rol] = [resumir_item(item) for item in ordenados]
+    
+    return jsonify({
+        **resumir_persona(persona),
+        'titulos': titulos
+    })
+
+# ==================== API LOTE ====================
+
+@app.route('/api/lote', methods=['GET', 'POST'])
+@con_presupuesto('listados')
+def obtener_lote():
+    """
+    Obtiene varias películas y/o series por ID en una sola petición
+    Parámetros (query string o cuerpo JSON):
+        - ids: lista de IDs (en query string separados por comas)
+        - modo: 'resumen' (default) o 'completo'
+    Los IDs que no existen se devuelven en 'no_encontrados'
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'El cuerpo debe ser un objeto JSON'}), 400
+        ids = data.get('ids', [])
+        modo = data.get('modo', 'resumen')
+    else:
+        ids = request.args.get('ids', '').split(',')
+        modo = request.args.get('modo', 'resumen')
+    
+    # bool es subclase de int: true/false no son IDs
+    if not isinstance(ids, list) or any(
+        isinstance(i, bool) or not isinstance(i, (str, int)) for i in ids
+    ):
+        return jsonify({'error': 'El campo ids debe ser una lista de textos o números'}), 400
+    
+    # Normalizar y quitar duplicados conservando el orden
+    ids = list(dict.fromkeys(str(i).strip() for i in ids if str(i).strip()))
+    
+    if not ids:
+        return jsonify({'error': 'Se requiere al menos un ID'}), 400
+    
+    if len(ids) > LIMITE_LOTE:
+        return jsonify({'error': f'Máximo {LIMITE_LOTE} IDs por petición'}), 400
+    
+    if modo not in ['resumen', 'completo']:
+        return jsonify({'error': 'Modo inválido'}), 400
+    
+    peliculas = catalogo.obtener('peliculas')
+    series = catalogo.obtener('series')
+    
+    items = []
+    no_encontrados = []
+    
+    for item_id in ids:
+        item = peliculas.por_id.get(item_id)
+        tipo = 'pelicula'
+        if item is None:
+            item = series.por_id.get(item_id)
+            tipo = 'serie'
+        
+        if item is None:
+            no_encontrados.append(item_id)
+            continue
+        
+        items.append({
+            'id': item_id,
+            'tipo': tipo,
+            'datos': item if modo == 'completo' else resumir_item(item)
+        })
+    
+    response = jsonify({
+        'items': items,
+        'no_encontrados': no_encontrados,
+        'total': len(items)
+    })
+    response.set_etag(etag_combinado([peliculas, series], ids, modo))
+    
+    return response.make_conditional(request)
+
+# ==================== API SUGERENCIAS ====================
+
+@app.route('/api/sugerencias')
+def sugerencias():
+    """
+    Autocompletado de títulos de películas y series
+    Query params:
+        - q: texto escrito por el usuario (se ignoran acentos y mayúsculas)
+        - limite: cantidad de sugerencias (default y máximo: LIMITE_SUGERENCIAS)
+    """
+    query = request.args.get('q', '')
+    limite = request.args.get('limite', LIMITE_SUGERENCIAS, type=int)
+    limite = max(1, min(limite, LIMITE_SUGERENCIAS))
+    
+    candidatos = []
+    for tipo_catalogo, tipo in [('peliculas', 'pelicula'), ('series', 'serie')]:
+        snapshot = catalogo.obtener(tipo_catalogo)
+        for puntaje, item in snapshot.prefijos.buscar(query, limite):
+            candidatos.append((puntaje, tipo, item))
+    
+    # Mezclar ambos catálogos por el mismo puntaje
+    candidatos.sort(key=lambda c: c[0], reverse=True)
+    
+    resultado = [
+        {
+            'id': item.get('id'),
+            'tipo': tipo,
+            'titulo': item.get('titulo'),
+            'año': item.get('año'),
+            'imagen': item.get('imagen')
+        }
+        for _, tipo, item in candidatos[:limite]
+    ]
+    
+    return jsonify({'sugerencias': resultado, 'total': len(resultado)})
+
 # ==================== API GÉNEROS ====================
 
 @app.route('/api/generos/peliculas')
@@ -413,9 +1133,78 @@ def estadisticas():
         'total_peliculas': len(peliculas),
         'total_series': len(series),
         'total_episodios': total_episodios,
+        'errores_normalizacion': {
+            'peliculas': catalogo.obtener('peliculas').errores_normalizacion,
+            'series': catalogo.obtener('series').errores_normalizacion
+        },
         'ultima_actualizacion': datetime.now().isoformat()
     })
 
+@app.route('/api/cambios')
+def cambios_catalogo():
+    """
+    Cambios del catálogo desde una versión, para sincronizar sin volver a
+    descargar todo. Parámetros:
+    - desde: última versión que tiene el cliente (0 = desde el principio)
+    
+    Si el historial ya no llega hasta esa versión responde resync: true y
+    el cliente debe descargar el catálogo completo.
+    """
+    desde = request.args.get('desde', type=int)
+    if desde is None or desde < 0:
+        return jsonify({'error': 'Parámetro desde requerido (versión entera)'}), 400
+    
+    # Registrar primero cualquier cambio pendiente en disco
+    for tipo in catalogo.archivos:
+        catalogo.obtener(tipo)
+    
+    resultado = catalogo.cambios.desde(desde, LIMITE_CAMBIOS)
+    if resultado is None:
+        return jsonify({
+            'desde': desde,
+            'version': catalogo.cambios.version_actual(),
+            'resync': True
+        })
+    
+    version, delta = resultado
+    return jsonify({
+        'desde': desde,
+        'version': version,
+        'resync': False,
+        'cambios': delta
+    })
+
+@app.route('/api/ready')
+def readiness():
+    """Responde 503 hasta que los catálogos están cargados e indexados"""
+    if not catalogo.listo():
+        return jsonify({
+            'listo': False,
+            'error': catalogo.error_precarga,
+            'catalogos': catalogo.estado()
+        }), 503
+    
+    return jsonify({
+        'listo': True,
+        'duracion_ms': catalogo.duracion_precarga,
+        'catalogos': catalogo.estado()
+    })
+
+@app.route('/api/metricas')
+def metricas():
+    """Estado del control de admisión y de la coalescencia de este worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'admision': admision.metricas(),
+        'coalescencia': {
+            'ejecutadas': vuelos.ejecutadas,
+            'compartidas': vuelos.compartidas
+        },
+        'registro': {
+            'descartados': registros_descartados()
+        }
+    })
+
 # ==================== ADMINISTRACIÓN ====================
 
 @app.route('/api/admin/actualizar', methods=['POST'])
@@ -489,7 +1278,7 @@ def contacto():
             }), 500
     
     except Exception as e:
-        print(f'Error en endpoint contacto: {str(e)}')
+        log.exception(f'Error en endpoint contacto: {str(e)}')
         return jsonify({
             'error': 'Error procesando la solicitud'
         }), 500
@@ -512,7 +1301,7 @@ def enviar_email(nombre, email, asunto, mensaje):
     """
     try:
         if not resend.api_key:
-            print('❌ Error: RESEND_API_KEY no configurado')
+            log.error('❌ Error: RESEND_API_KEY no configurado')
             return False
         
         html = f"""
@@ -597,11 +1386,11 @@ def enviar_email(nombre, email, asunto, mensaje):
         }
         
         email_response = resend.Emails.send(params)
-        print(f'✅ Email enviado: {email_response}')
+        log.info(f'✅ Email enviado: {email_response}')
         return True
         
     except Exception as e:
-        print(f'❌ Error enviando email con Resend: {str(e)}')
+        log.exception(f'❌ Error enviando email con Resend: {str(e)}')
         return False
 
 # ==================== INICIO DEL SERVIDOR ====================
@@ -610,8 +1399,7 @@ if __name__ == '__main__':
     print("=" * 60)
     print("🎬 API de Streaming iniciada")
     print("=" * 60)
-    print(f"📁 Películas: {len(cargar_json(PELICULAS_FILE))}")
-    print(f"📺 Series: {len(cargar_json(SERIES_FILE))}")
+    print(f"📁 Catálogos: {PELICULAS_FILE}, {SERIES_FILE} (precarga: {PRECARGA})")
     print("=" * 60)
     print("🌐 Servidor corriendo en http://localhost:5400")
     print("=" * 60)
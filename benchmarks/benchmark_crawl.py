@@ -0,0 +1,129 @@
+"""
+Benchmark de crawl de punta a punta contra el origen falso (origen_falso.py)
+
+Para cada nivel de concurrencia mide tiempo total, páginas por segundo y
+recuperación de errores (503 inyectados, 429 del límite del origen,
+reintentos del cliente y extracciones que igual fallaron) de:
+    listados   CinecalidadScraper.extraer_multiples_paginas
+    peliculas  AdvancedLinksExtractor con el pipeline por etapas
+    series     CineCalidadSerieExtractor.procesar_serie
+
+Cada corrida usa un ClienteHTTP nuevo y sin cache de respuestas.
+
+Uso:
+    python benchmarks/benchmark_crawl.py
+    python benchmarks/benchmark_crawl.py --concurrencias 1 4 16 --latencia 0.1 --tasa-error 0.05 --limite 40
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from origen_falso import OrigenFalso
+from registro import configurar_registro
+from cliente_http import ClienteHTTP
+from cinecalidad_scraping import CinecalidadScraper
+from pelicula_link_extractor import AdvancedLinksExtractor
+from pipeline_peliculas import PipelinePeliculas
+from serie_link_extractor import CineCalidadSerieExtractor
+
+
+def crawl_listados(origen_falso, cliente, concurrencia, args):
+    scraper = CinecalidadScraper(
+        max_trabajadores=concurrencia, peticiones_por_segundo=args.tasa, rafaga=concurrencia,
+        cliente=cliente, base_url=origen_falso.origen
+    )
+    items = scraper.extraer_multiples_paginas(num_paginas=args.paginas)
+    return len(items), args.paginas * origen_falso.items_por_pagina
+
+
+def crawl_peliculas(cliente, concurrencia, args, peliculas):
+    pipeline = PipelinePeliculas(
+        AdvancedLinksExtractor(cliente=cliente),
+        trabajadores={'pagina': concurrencia, 'player': concurrencia},
+        max_por_host=concurrencia, peticiones_por_segundo=args.tasa, peticiones_por_segundo_host=args.tasa
+    )
+    resultados = pipeline.procesar(peliculas)
+    return sum(1 for r in resultados if r.get('servidores')), len(peliculas)
+
+
+def crawl_series(origen, cliente, concurrencia, args, series):
+    extractor = CineCalidadSerieExtractor(
+        cliente=cliente, max_trabajadores=concurrencia, peticiones_por_segundo=args.tasa,
+        rafaga=concurrencia, base_url=origen
+    )
+    completas = 0
+    for serie in series:
+        resultado = extractor.procesar_serie(serie)
+        episodios = [e for t in (resultado or {}).get('temporadas', []) for e in t['episodios']]
+        if episodios and all(e['servidores'] for e in episodios):
+            completas += 1
+    return completas, len(series)
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Benchmark de crawl contra el origen falso')
+    argumentos.add_argument('--concurrencias', type=int, nargs='+', default=[1, 2, 4, 8])
+    argumentos.add_argument('--escenarios', nargs='+', choices=['listados', 'peliculas', 'series'],
+                            default=['listados', 'peliculas', 'series'])
+    argumentos.add_argument('--latencia', type=float, default=0.05, help='segundos por respuesta del origen')
+    argumentos.add_argument('--jitter', type=float, default=0.02)
+    argumentos.add_argument('--tasa-error', type=float, default=0.02, help='fracción de respuestas 503')
+    argumentos.add_argument('--limite', type=float, default=None, help='peticiones por segundo del origen antes de 429')
+    argumentos.add_argument('--tasa', type=float, default=1000.0, help='peticiones por segundo de los scrapers')
+    argumentos.add_argument('--paginas', type=int, default=10, help='páginas de listado a recorrer')
+    argumentos.add_argument('--peliculas', type=int, default=48)
+    argumentos.add_argument('--series', type=int, default=4)
+    argumentos.add_argument('--backoff', type=float, default=0.1, help='backoff base de los reintentos')
+    args = argumentos.parse_args()
+
+    # Solo los errores: las advertencias de reintentos son parte de lo que se mide
+    configurar_registro(nivel=os.getenv('LOG_NIVEL', 'ERROR'), formato='texto')
+
+    origen_falso = OrigenFalso(
+        args.latencia, args.jitter, args.tasa_error, args.limite, paginas=max(args.paginas, 3), semilla=42
+    )
+    origen = origen_falso.iniciar()
+
+    # Los items de entrada salen de los listados del origen, sin errores ni límites
+    tasa_error, limite = origen_falso.tasa_error, origen_falso.limite_por_segundo
+    origen_falso.tasa_error, origen_falso.limite_por_segundo = 0.0, None
+    semilla = CinecalidadScraper(max_trabajadores=4, peticiones_por_segundo=1e9, rafaga=1e9,
+                                 cliente=ClienteHTTP(), base_url=origen)
+    peliculas = semilla.extraer_multiples_paginas(num_paginas=3)[:args.peliculas]
+    series = semilla.extraer_multiples_paginas(num_paginas=1, tipo='serie')[:args.series]
+    origen_falso.tasa_error, origen_falso.limite_por_segundo = tasa_error, limite
+
+    escenarios = {
+        'listados': lambda cliente, c: crawl_listados(origen_falso, cliente, c, args),
+        'peliculas': lambda cliente, c: crawl_peliculas(cliente, c, args, peliculas),
+        'series': lambda cliente, c: crawl_series(origen, cliente, c, args, series)
+    }
+
+    print(f"🎭 Origen falso: latencia {args.latencia}s (+{args.jitter}s), {args.tasa_error:.0%} de 503, "
+          f"límite {args.limite or 'ninguno'} pet/s")
+    print("=" * 100)
+    print(f"{'Escenario':<10} | {'Conc.':>5} | {'Tiempo (s)':>10} | {'Págs/s':>7} | {'Peticiones':>10} | "
+          f"{'503':>4} | {'429':>4} | {'Reintentos':>10} | {'Completos':>11}")
+    print("-" * 100)
+
+    for escenario in args.escenarios:
+        for concurrencia in args.concurrencias:
+            cliente = ClienteHTTP(tamaño_pool=max(20, concurrencia * 2), backoff=args.backoff)
+            origen_falso.reiniciar_estadisticas()
+
+            inicio = time.perf_counter()
+            completos, total = escenarios[escenario](cliente, concurrencia)
+            segundos = time.perf_counter() - inicio
+
+            servidor = origen_falso.estadisticas()
+            reintentos = sum(datos['reintentos'] for datos in cliente.estadisticas().values())
+            print(f"{escenario:<10} | {concurrencia:>5} | {segundos:>10.2f} | {servidor['ok'] / segundos:>7.1f} | "
+                  f"{servidor['peticiones']:>10} | {servidor['errores_inyectados']:>4} | {servidor['limitadas']:>4} | "
+                  f"{reintentos:>10} | {f'{completos}/{total}':>11}")
+        print("-" * 100)
+
+    origen_falso.detener()
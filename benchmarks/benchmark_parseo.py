@@ -0,0 +1,126 @@
+"""
+Benchmark del parseo de los scrapers sobre el corpus de benchmarks/fixtures/cinecalidad
+
+Mide, por página, el tiempo de cada extracción (parseo del HTML incluido) y
+la memoria que asigna, con cada modo de parseo. El tiempo se informa como
+el mínimo de las repeticiones (el menos afectado por el ruido de la máquina)
+y la mediana:
+    referencia  html.parser sobre la página completa (como antes)
+    lxml        lxml sobre la página completa
+    rapido      lxml con los filtros por página de scraper/parseo.py
+
+No hace peticiones: las descargas las responde el corpus (ver corpus_cinecalidad.py).
+
+Uso:
+    python benchmarks/benchmark_parseo.py
+    python benchmarks/benchmark_parseo.py --repeticiones 200 --modos referencia rapido
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+import parseo
+from corpus_cinecalidad import (
+    URL_EPISODIO, URL_PELICULA, URL_PLAYER, ClienteFixtures, leer_fixture
+)
+from cinecalidad_scraping import CinecalidadScraper
+from pelicula_link_extractor import AdvancedLinksExtractor
+from serie_link_extractor import CineCalidadSerieExtractor
+
+MODOS = {
+    'referencia': ('html.parser', False),
+    'lxml': ('lxml', False),
+    'rapido': ('lxml', True)
+}
+
+
+def extracciones():
+    """(nombre, función sin argumentos) de cada extracción a medir"""
+    cliente = ClienteFixtures()
+    scraper = CinecalidadScraper(cliente=cliente, peticiones_por_segundo=1e9, rafaga=1e9)
+    peliculas = AdvancedLinksExtractor(cliente=cliente)
+    series = CineCalidadSerieExtractor(cliente=cliente, peticiones_por_segundo=1e9, rafaga=1e9)
+
+    listado_peliculas = leer_fixture('listado_peliculas.html')
+    listado_series = leer_fixture('listado_series.html')
+    pelicula = leer_fixture('pelicula.html')
+    serie = leer_fixture('serie.html')
+
+    return [
+        ('_parsear_peliculas', lambda: scraper._parsear_peliculas(listado_peliculas, 'pelicula')),
+        ('_parsear_series', lambda: scraper._parsear_series(listado_series, 'serie')),
+        ('_extraer_info_pelicula', lambda: peliculas._extraer_info_pelicula(parseo.sopa(pelicula))),
+        ('_extraer_info_basica', lambda: series._extraer_info_basica(parseo.sopa(serie))),
+        ('_extraer_temporadas_episodios', lambda: series._extraer_temporadas_episodios(parseo.sopa(serie))),
+        ('extraer_servidores_video', lambda: peliculas.extraer_servidores_video(URL_PLAYER, URL_PELICULA)),
+        ('extraer_player_url_episodio', lambda: series.extraer_player_url_episodio(URL_EPISODIO))
+    ]
+
+
+def usar_modo(modo):
+    parseo.PARSER, parseo.FILTRAR = MODOS[modo]
+
+
+def medir(funcion, modos, repeticiones):
+    """
+    {modo: (mínimo en ms, mediana en ms, pico de memoria en KB)}. Los modos
+    se alternan en cada repetición para que el ruido de la máquina les toque
+    a todos por igual. La memoria se mide en una pasada aparte porque
+    tracemalloc distorsiona el tiempo.
+    """
+    tiempos = {modo: [] for modo in modos}
+    for modo in modos:
+        usar_modo(modo)
+        funcion()  # calentamiento
+
+    for _ in range(repeticiones):
+        for modo in modos:
+            usar_modo(modo)
+            inicio = time.perf_counter()
+            funcion()
+            tiempos[modo].append(time.perf_counter() - inicio)
+
+    resultados = {}
+    for modo in modos:
+        usar_modo(modo)
+        tracemalloc.start()
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados[modo] = (
+            min(tiempos[modo]) * 1000, statistics.median(tiempos[modo]) * 1000, pico / 1024
+        )
+    return resultados
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Benchmark del parseo de los scrapers')
+    argumentos.add_argument('--repeticiones', type=int, default=200)
+    argumentos.add_argument('--modos', nargs='+', choices=list(MODOS), default=list(MODOS))
+    args = argumentos.parse_args()
+
+    if parseo._parser_por_defecto() != 'lxml' and any(MODOS[modo][0] == 'lxml' for modo in args.modos):
+        print("❌ Los modos lxml y rapido requieren lxml (pip install -r requirements.txt)")
+        sys.exit(1)
+
+    resultados = {}
+    for nombre, funcion in extracciones():
+        for modo, medicion in medir(funcion, args.modos, args.repeticiones).items():
+            resultados[nombre, modo] = medicion
+
+    ancho = 33 + 26 * len(args.modos)
+    print("=" * ancho)
+    print(f"{'Extracción (ms mín/mediana | KB)':<33}" + ''.join(f"{modo:>26}" for modo in args.modos))
+    print("-" * ancho)
+    for nombre, _ in extracciones():
+        fila = f"{nombre:<33}"
+        for modo in args.modos:
+            minimo, mediana, kb = resultados[nombre, modo]
+            fila += f"{minimo:>8.2f} /{mediana:>7.2f} | {kb:>6.0f}"
+        print(fila)
+    print("=" * ancho)
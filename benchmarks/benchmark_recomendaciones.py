@@ -0,0 +1,84 @@
+"""
+Benchmark de construcción de vecinos TF-IDF (recomendaciones por contenido)
+
+Genera catálogos sintéticos a partir de cache/peliculas.json (descripciones y
+repartos mezclados al azar) y mide tiempo de construcción y memoria.
+
+Uso:
+    python benchmarks/benchmark_recomendaciones.py
+    python benchmarks/benchmark_recomendaciones.py --tamaños 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import recomendaciones
+
+ARCHIVO_BASE = os.path.join(os.path.dirname(__file__), '../cache/peliculas.json')
+
+
+def generar_catalogo(base, tamaño, semilla=42):
+    """Crea 'tamaño' items mezclando palabras y personas de los items reales"""
+    aleatorio = random.Random(semilla)
+    palabras = [p for item in base for p in (item.get('descripcion') or '').split()]
+    personas = [n for item in base for n in (item.get('actores') or [])]
+    directores = [n for item in base for n in (item.get('director') or [])]
+
+    catalogo = []
+    for i in range(tamaño):
+        catalogo.append({
+            'id': str(i),
+            'titulo_original': ' '.join(aleatorio.sample(palabras, 3)),
+            'descripcion': ' '.join(aleatorio.choices(palabras, k=aleatorio.randint(15, 40))),
+            'director': aleatorio.sample(directores, 1),
+            'actores': aleatorio.sample(personas, aleatorio.randint(3, 10))
+        })
+    return catalogo
+
+
+def medir(items):
+    """
+    Devuelve (segundos, pico de memoria en MB, tamaño de los vecinos en MB).
+    El tiempo se mide en una pasada sin tracemalloc, que lo distorsiona.
+    """
+    inicio = time.perf_counter()
+    recomendaciones.construir_vecinos(items)
+    segundos = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    vecinos = recomendaciones.construir_vecinos(items)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    indices, similitudes = vecinos
+    return segundos, pico / 1024 / 1024, (indices.nbytes + similitudes.nbytes) / 1024 / 1024
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de recomendaciones TF-IDF')
+    parser.add_argument('--tamaños', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    if not recomendaciones.DISPONIBLE:
+        print("❌ Se requieren numpy y scipy (pip install -r requirements.txt)")
+        sys.exit(1)
+
+    with open(ARCHIVO_BASE, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+
+    print("=" * 70)
+    print(f"{'Títulos':>10} | {'Construcción (s)':>17} | {'Pico memoria (MB)':>17} | {'Vecinos (MB)':>12}")
+    print("-" * 70)
+
+    for tamaño in args.tamaños:
+        items = generar_catalogo(base, tamaño)
+        segundos, pico, vecinos = medir(items)
+        print(f"{tamaño:>10} | {segundos:>17.2f} | {pico:>17.1f} | {vecinos:>12.1f}")
+
+    print("=" * 70)
@@ -0,0 +1,98 @@
+"""
+Actualiza el corpus de benchmarks/fixtures/cinecalidad con páginas reales
+
+Descarga una página de cada tipo que parsean los scrapers: listado de
+películas y de series, detalle de una película, su player, una serie con
+varias temporadas y uno de sus episodios. Conviene correrlo cuando cambia
+el HTML del sitio y después volver a correr tests/test_parseo.py.
+
+Uso:
+    python benchmarks/capturar_fixtures.py
+    python benchmarks/capturar_fixtures.py --base-url https://cinecalidad.bar
+"""
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from parseo import sopa
+from cliente_http import ClienteHTTP
+from cinecalidad_scraping import CinecalidadScraper
+from pelicula_link_extractor import AdvancedLinksExtractor
+from serie_link_extractor import CineCalidadSerieExtractor
+from corpus_cinecalidad import CARPETA_FIXTURES
+
+
+def descargar(cliente, url, headers, referer=None):
+    if referer:
+        headers = {**headers, 'Referer': referer}
+    response = cliente.get(url, headers=headers)
+    response.raise_for_status()
+    return response.content
+
+
+def guardar(nombre, contenido):
+    ruta = os.path.join(CARPETA_FIXTURES, nombre)
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+    print(f"  ✓ {nombre:<24} {len(contenido) / 1024:>7.1f} KB")
+
+
+def numero_temporadas(serie):
+    coincidencia = re.search(r'\d+', serie.get('temporadas') or '')
+    return int(coincidencia.group()) if coincidencia else 0
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Captura el corpus de páginas de los benchmarks')
+    argumentos.add_argument('--base-url', default=None)
+    args = argumentos.parse_args()
+
+    # Sin cache: el corpus tiene que ser lo que sirve el sitio ahora
+    cliente = ClienteHTTP()
+    scraper = CinecalidadScraper(cliente=cliente, base_url=args.base_url)
+    peliculas = AdvancedLinksExtractor(cliente=cliente)
+    series = CineCalidadSerieExtractor(cliente=cliente, base_url=args.base_url)
+    base_url = scraper.base_url
+    os.makedirs(CARPETA_FIXTURES, exist_ok=True)
+
+    print(f"📥 Capturando páginas de {base_url}")
+
+    # Películas: listado -> detalle -> player
+    listado = descargar(cliente, base_url, scraper.headers)
+    guardar('listado_peliculas.html', listado)
+
+    pelicula = next(p for p in scraper._parsear_peliculas(listado, 'pelicula') if p.get('enlace'))
+    detalle = descargar(cliente, pelicula['enlace'], peliculas.headers)
+    guardar('pelicula.html', detalle)
+
+    player_url = peliculas.extraer_player_url(sopa(detalle, 'iframes'))
+    if player_url:
+        guardar('player.html', descargar(cliente, player_url, peliculas.headers, referer=pelicula['enlace']))
+    else:
+        print("  ⚠️ La película no tiene player, player.html no se actualizó")
+
+    # Series: listado -> la serie con más temporadas -> su primer episodio
+    listado = descargar(cliente, f"{base_url}/serie/", scraper.headers)
+    guardar('listado_series.html', listado)
+
+    serie = max(
+        (s for s in scraper._parsear_series(listado, 'serie') if s.get('enlace')),
+        key=numero_temporadas
+    )
+    detalle = descargar(cliente, serie['enlace'], series.headers)
+    guardar('serie.html', detalle)
+
+    episodios = [
+        episodio
+        for temporada in series._extraer_temporadas_episodios(sopa(detalle))
+        for episodio in temporada['episodios'] if episodio.get('url')
+    ]
+    if episodios:
+        guardar('episodio.html', descargar(cliente, episodios[0]['url'], series.headers, referer=serie['enlace']))
+    else:
+        print("  ⚠️ La serie no tiene episodios, episodio.html no se actualizó")
+
+    print("\n✅ Corpus actualizado. Verificá el parseo con: python -m pytest tests/test_parseo.py")
@@ -0,0 +1,103 @@
+"""
+Corpus de páginas de cinecalidad (benchmarks/fixtures/cinecalidad) y un
+cliente falso que las sirve, para correr las extracciones de los scrapers
+sin red. Lo usan benchmark_parseo.py y tests/test_parseo.py (que compara
+el parseo rápido con el de referencia).
+"""
+import functools
+import os
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+import parseo
+from cinecalidad_scraping import CinecalidadScraper
+from pelicula_link_extractor import AdvancedLinksExtractor
+from serie_link_extractor import CineCalidadSerieExtractor
+
+CARPETA_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'cinecalidad')
+
+BASE_URL = 'https://cinecalidad.bar'
+URL_PELICULA = f'{BASE_URL}/peli/fixture/'
+URL_SERIE = f'{BASE_URL}/serie/fixture/'
+URL_EPISODIO = f'{BASE_URL}/episodio/fixture-1x1/'
+URL_PLAYER = 'https://playerkasjkajs.top/embed.php?id=5633'
+
+# Página del corpus que responde cada URL
+PAGINAS = {
+    f'{BASE_URL}': 'listado_peliculas.html',
+    f'{BASE_URL}/serie/': 'listado_series.html',
+    URL_PELICULA: 'pelicula.html',
+    URL_SERIE: 'serie.html',
+    URL_EPISODIO: 'episodio.html',
+    URL_PLAYER: 'player.html'
+}
+
+
+@functools.lru_cache(maxsize=None)
+def leer_fixture(nombre):
+    with open(os.path.join(CARPETA_FIXTURES, nombre), 'rb') as f:
+        return f.read()
+
+
+class ClienteFixtures:
+    """Responde con las páginas del corpus en lugar de ir a la red"""
+
+    def get(self, url, **kwargs):
+        response = requests.Response()
+        nombre = PAGINAS.get(url)
+        response.url = url
+        response.status_code = 200 if nombre else 404
+        response._content = leer_fixture(nombre) if nombre else b''
+        return response
+
+    def parseado(self, response, nombre, parsear):
+        return parsear()
+
+
+def casos():
+    """(nombre, función sin argumentos que corre la extracción)"""
+    cliente = ClienteFixtures()
+    scraper = CinecalidadScraper(cliente=cliente, peticiones_por_segundo=1000, rafaga=1000)
+    peliculas = AdvancedLinksExtractor(cliente=cliente)
+    series = CineCalidadSerieExtractor(cliente=cliente, peticiones_por_segundo=1000, rafaga=1000)
+
+    listado_peliculas = leer_fixture('listado_peliculas.html')
+    listado_series = leer_fixture('listado_series.html')
+    pelicula = leer_fixture('pelicula.html')
+    player = leer_fixture('player.html')
+    serie = leer_fixture('serie.html')
+
+    return [
+        ('listado de películas', lambda: scraper._parsear_peliculas(listado_peliculas, 'pelicula')),
+        ('listado de series', lambda: scraper._parsear_series(listado_series, 'serie')),
+        ('número de páginas', lambda: scraper.obtener_numero_paginas('pelicula')),
+        ('detalle de película', lambda: peliculas.armar_resultado({'año': '2025'}, URL_PELICULA, pelicula)),
+        ('player de película', lambda: peliculas.extraer_player_url(parseo.sopa(pelicula, 'iframes'))),
+        ('servidores de película', lambda: peliculas.parsear_servidores(URL_PLAYER, player)),
+        ('info de serie', lambda: series._extraer_info_basica(parseo.sopa(serie))),
+        ('temporadas de serie', lambda: series._extraer_temporadas_episodios(parseo.sopa(serie))),
+        ('player de episodio', lambda: series.extraer_player_url_episodio(URL_EPISODIO)),
+        ('servidores de episodio', lambda: series.extraer_servidores_video(URL_PLAYER, URL_EPISODIO))
+    ]
+
+
+def sin_ids(valor):
+    """Los listados generan un uuid por item: no cuentan para la comparación"""
+    if isinstance(valor, list):
+        return [sin_ids(v) for v in valor]
+    if isinstance(valor, dict):
+        return {k: sin_ids(v) for k, v in valor.items() if k != 'id'}
+    return valor
+
+
+def correr(parser, filtrar):
+    """Resultados de todos los casos con ese parser y filtros (sin los ids)"""
+    anterior = parseo.PARSER, parseo.FILTRAR
+    parseo.PARSER, parseo.FILTRAR = parser, filtrar
+    try:
+        return {nombre: sin_ids(funcion()) for nombre, funcion in casos()}
+    finally:
+        parseo.PARSER, parseo.FILTRAR = anterior
@@ -0,0 +1,234 @@
+"""
+Origen falso de cinecalidad para benchmarks de crawl sin tocar el sitio real
+
+Sirve las páginas del corpus (benchmarks/fixtures/cinecalidad) reescritas
+para que todos los enlaces apunten a este servidor:
+    /  y /page/N/                  listado de películas (N hasta --paginas)
+    /serie/  y /serie/page/N/      listado de series
+    /peli/<slug>/                  detalle de película
+    /serie/<slug>/                 detalle de serie
+    /episodio/<slug>/              episodio
+    /embed.php?id=...              player con los servidores
+    /r.php?id=...                  redirección 302 al video
+
+Con latencia configurable, una fracción de respuestas 503 y un límite de
+peticiones por segundo que responde 429 con Retry-After.
+
+Uso (servidor suelto, para apuntar los scrapers con CINECALIDAD_URL):
+    python benchmarks/origen_falso.py --puerto 8765 --latencia 0.05 --tasa-error 0.02
+"""
+import argparse
+import hashlib
+import http.server
+import os
+import random
+import re
+import socketserver
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+CARPETA_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'cinecalidad')
+
+# Orígenes que aparecen en el corpus y se reemplazan por el del servidor
+ORIGENES_CORPUS = ('https://cinecalidad.bar', 'https://playerkasjkajs.top')
+
+ARTICULO = re.compile(r'<article class="tposty.*?</article>', re.S)
+PAGINACION = re.compile(r'<nav class="navigation pagination".*?</nav>', re.S)
+ENLACE_ITEM = re.compile(r'((?:/peli|/serie)/)([^/"]+)/')
+
+
+def leer_fixture(nombre):
+    with open(os.path.join(CARPETA_FIXTURES, nombre), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class OrigenFalso:
+    """
+    Servidor HTTP local que imita cinecalidad. Se inicia en un hilo con
+    iniciar() y cuenta las peticiones servidas, los errores inyectados y
+    las respuestas 429.
+    """
+
+    def __init__(self, latencia=0.0, jitter=0.0, tasa_error=0.0, limite_por_segundo=None,
+                 paginas=10, semilla=None):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tasa_error = tasa_error
+        self.limite_por_segundo = limite_por_segundo
+        self.paginas = paginas
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._tokens = limite_por_segundo or 0
+        self._ultima = time.monotonic()
+        self._servidor = None
+        self.origen = None
+
+        self._plantillas = {
+            nombre: leer_fixture(f'{nombre}.html')
+            for nombre in ('listado_peliculas', 'listado_series', 'pelicula', 'serie', 'episodio', 'player')
+        }
+        self.items_por_pagina = len(ARTICULO.findall(self._plantillas['listado_peliculas']))
+        self.reiniciar_estadisticas()
+
+    # ==================== ESTADO ====================
+
+    def reiniciar_estadisticas(self):
+        with self._lock:
+            self._estadisticas = {'peticiones': 0, 'ok': 0, 'errores_inyectados': 0, 'limitadas': 0, 'no_encontradas': 0}
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._estadisticas)
+
+    def _anotar(self, campo):
+        with self._lock:
+            self._estadisticas[campo] += 1
+
+    def _admitir(self):
+        """Token bucket del servidor: devuelve 0 si se atiende o los segundos a esperar (429)"""
+        if not self.limite_por_segundo:
+            return 0
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.limite_por_segundo, self._tokens + (ahora - self._ultima) * self.limite_por_segundo)
+            self._ultima = ahora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.limite_por_segundo
+
+    def _fallar(self):
+        with self._lock:
+            return self._aleatorio.random() < self.tasa_error
+
+    def _demora(self):
+        with self._lock:
+            return self.latencia + self._aleatorio.uniform(0, self.jitter)
+
+    # ==================== PÁGINAS ====================
+
+    def _reescribir(self, html):
+        for origen in ORIGENES_CORPUS:
+            html = html.replace(origen, self.origen)
+        return html
+
+    def _paginacion(self, ruta, actual):
+        enlaces = ''.join(
+            f'<a class="page-numbers" href="{self.origen}{ruta}/page/{n}/">{n}</a>'
+            for n in sorted({1, 2, 3, self.paginas}) if n != actual and n <= self.paginas
+        )
+        return f'<nav class="navigation pagination"><div class="nav-links">{enlaces}</div></nav>'
+
+    def _listado(self, plantilla, ruta, pagina):
+        """La página N del listado: los items del corpus con slugs únicos por página"""
+        if pagina > self.paginas:
+            return None
+        html = ARTICULO.sub(
+            lambda articulo: ENLACE_ITEM.sub(lambda m: f'{m.group(1)}{m.group(2)}-p{pagina}/', articulo.group(0)),
+            self._plantillas[plantilla]
+        )
+        html = PAGINACION.sub(self._paginacion(ruta, pagina), html)
+        return self._reescribir(html)
+
+    def pagina(self, path, consulta):
+        """(estado, cabeceras, cuerpo) para una ruta, sin latencia ni errores"""
+        partes = [p for p in path.split('/') if p]
+
+        if not partes or partes[0] == 'page' or (partes[0] == 'serie' and (len(partes) == 1 or partes[1] == 'page')):
+            serie = bool(partes) and partes[0] == 'serie'
+            numero = partes[-1] if partes and partes[-1].isdigit() else '1'
+            html = self._listado(
+                'listado_series' if serie else 'listado_peliculas', '/serie' if serie else '', int(numero)
+            )
+            return (200, {}, html) if html else (404, {}, 'No encontrado')
+
+        if partes[0] == 'r.php':
+            destino = hashlib.sha1(consulta.get('id', [''])[0].encode()).hexdigest()[:12]
+            return 302, {'Location': f'https://video.servidor.invalid/e/{destino}'}, ''
+
+        plantillas = {'peli': 'pelicula', 'serie': 'serie', 'episodio': 'episodio', 'embed.php': 'player'}
+        if partes[0] in plantillas:
+            return 200, {}, self._reescribir(self._plantillas[plantillas[partes[0]]])
+
+        return 404, {}, 'No encontrado'
+
+    # ==================== SERVIDOR ====================
+
+    def _manejador(self):
+        origen_falso = self
+
+        class Manejador(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def responder(self, estado, cabeceras, cuerpo):
+                datos = cuerpo.encode('utf-8')
+                self.send_response(estado)
+                self.send_header('Content-Type', 'text/html; charset=UTF-8')
+                self.send_header('Content-Length', str(len(datos)))
+                for clave, valor in cabeceras.items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_GET(self):
+                origen_falso._anotar('peticiones')
+
+                espera = origen_falso._admitir()
+                if espera > 0:
+                    origen_falso._anotar('limitadas')
+                    return self.responder(429, {'Retry-After': f'{espera:.2f}'}, 'Demasiadas peticiones')
+
+                time.sleep(origen_falso._demora())
+                if origen_falso._fallar():
+                    origen_falso._anotar('errores_inyectados')
+                    return self.responder(503, {}, 'Servicio no disponible')
+
+                url = urlparse(self.path)
+                estado, cabeceras, cuerpo = origen_falso.pagina(url.path, parse_qs(url.query))
+                origen_falso._anotar('ok' if estado < 400 else 'no_encontradas')
+                self.responder(estado, cabeceras, cuerpo)
+
+        return Manejador
+
+    def iniciar(self, puerto=0, host='127.0.0.1'):
+        """Arranca el servidor en un hilo y devuelve su origen (http://host:puerto)"""
+
+        class Servidor(socketserver.ThreadingMixIn, http.server.HTTPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+            request_queue_size = 128
+
+        self._servidor = Servidor((host, puerto), self._manejador())
+        self.origen = f'http://{host}:{self._servidor.server_address[1]}'
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self.origen
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Origen falso de cinecalidad')
+    argumentos.add_argument('--puerto', type=int, default=8765)
+    argumentos.add_argument('--latencia', type=float, default=0.05, help='segundos por respuesta')
+    argumentos.add_argument('--jitter', type=float, default=0.02, help='segundos extra al azar')
+    argumentos.add_argument('--tasa-error', type=float, default=0.0, help='fracción de respuestas 503')
+    argumentos.add_argument('--limite', type=float, default=None, help='peticiones por segundo antes de responder 429')
+    argumentos.add_argument('--paginas', type=int, default=10, help='páginas de cada listado')
+    args = argumentos.parse_args()
+
+    origen_falso = OrigenFalso(args.latencia, args.jitter, args.tasa_error, args.limite, args.paginas)
+    origen = origen_falso.iniciar(args.puerto)
+    print(f"🎭 Origen falso en {origen} (CINECALIDAD_URL={origen} para apuntar los scrapers)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        origen_falso.detener()
+        print(f"\n📊 {origen_falso.estadisticas()}")
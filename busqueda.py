@@ -0,0 +1,313 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+_NO_ALFANUMERICO = re.compile(r'[\W_]+')
+
+# Campos de texto que se indexan para sugerencias
+CAMPOS_TITULO = ['titulo', 'titulo_original']
+
+
+class _TablaSinAcentos(dict):
+    """Tabla para str.translate que quita acentos; cada carácter se calcula una sola vez"""
+
+    def __missing__(self, codigo):
+        descompuesto = unicodedata.normalize('NFKD', chr(codigo))
+        limpio = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+        self[codigo] = limpio
+        return limpio
+
+
+_SIN_ACENTOS = _TablaSinAcentos()
+
+
+def normalizar_texto(texto):
+    """
+    Normaliza un texto para búsquedas: minúsculas, sin acentos
+    y sin signos de puntuación ("Días Perfectos!" -> "dias perfectos")
+    """
+    if not texto:
+        return ''
+    texto = str(texto).casefold()
+    if not texto.isascii():
+        texto = texto.translate(_SIN_ACENTOS)
+    return ' '.join(_NO_ALFANUMERICO.sub(' ', texto).split())
+
+
+def _a_numero(valor, tipo=float):
+    """Convierte un valor a número o devuelve 0 si no se puede"""
+    try:
+        return tipo(valor)
+    except (ValueError, TypeError):
+        return 0
+
+
+def puntuacion_popularidad(item):
+    """
+    Señal simple de popularidad/novedad: primero el año más reciente,
+    después el rating más alto
+    """
+    return (_a_numero(item.get('año'), int), _a_numero(item.get('rating')))
+
+
+class IndicePrefijos:
+    """
+    Índice de prefijos sobre títulos normalizados para autocompletado.
+
+    Cada título se indexa desde cada una de sus palabras ("el señor de los
+    anillos", "señor de los anillos", ...) en un arreglo ordenado, de modo que
+    un prefijo se resuelve con búsqueda binaria. Los prefijos cortos, que
+    son los que más coincidencias tienen, se precalculan al construir.
+    """
+
+    def __init__(self, items, campos=CAMPOS_TITULO, popularidad=puntuacion_popularidad,
+                 largo_precalculado=3, limite_precalculado=20):
+        entradas = []
+
+        for item in items:
+            puntaje_item = popularidad(item)
+            vistas = set()
+            for campo in campos:
+                palabras = normalizar_texto(item.get(campo)).split()
+                for i in range(len(palabras)):
+                    clave = ' '.join(palabras[i:])
+                    if clave in vistas:
+                        continue
+                    vistas.add(clave)
+                    # Las coincidencias al inicio del título pesan más
+                    entradas.append((clave, (i == 0, *puntaje_item), item))
+
+        entradas.sort(key=lambda e: e[0])
+        self._entradas = entradas
+        self._claves = [e[0] for e in entradas]
+
+        # Top de resultados para prefijos cortos
+        self._precalculados = {}
+        grupos = defaultdict(list)
+        for entrada in entradas:
+            for largo in range(1, largo_precalculado + 1):
+                if len(entrada[0]) >= largo:
+                    grupos[entrada[0][:largo]].append(entrada)
+        for prefijo, grupo in grupos.items():
+            self._precalculados[prefijo] = self._rankear(grupo, limite_precalculado)
+
+    def __len__(self):
+        return len(self._claves)
+
+    def _rankear(self, entradas, limite):
+        """Deja la mejor entrada por item y devuelve las 'limite' mejores"""
+        mejores = {}
+        for clave, puntaje, item in entradas:
+            actual = mejores.get(id(item))
+            if actual is None or puntaje > actual[0]:
+                mejores[id(item)] = (puntaje, item)
+        return heapq.nlargest(limite, mejores.values(), key=lambda r: r[0])
+
+    def buscar(self, texto, limite=10):
+        """
+        Devuelve una lista de (puntaje, item) cuyos títulos tienen
+        alguna palabra que empieza por el texto normalizado
+        """
+        prefijo = normalizar_texto(texto)
+        if not prefijo:
+            return []
+
+        precalculado = self._precalculados.get(prefijo)
+        if precalculado is not None and len(precalculado) >= limite:
+            return precalculado[:limite]
+
+        inicio = bisect_left(self._claves, prefijo)
+        fin = bisect_left(self._claves, prefijo[:-1] + chr(ord(prefijo[-1]) + 1), inicio)
+
+        return self._rankear(self._entradas[inicio:fin], limite)
+
+
+def _trigramas(texto):
+    """Conjunto de trigramas de caracteres con relleno al inicio y al final"""
+    relleno = f"  {texto} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _similitud(consulta, texto):
+    """
+    Similitud entre 0 y 1 tolerante a errores de escritura. Compara contra el
+    título completo y contra su inicio, para que "harripoter" se parezca
+    a "harrypotterylapiedrafilosofal"
+    """
+    if consulta in texto:
+        return max(0.9, len(consulta) / len(texto))
+    completo = SequenceMatcher(None, consulta, texto).ratio()
+    inicio = SequenceMatcher(None, consulta, texto[:len(consulta)]).ratio() * 0.95
+    return max(completo, inicio)
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido de trigramas sobre títulos normalizados (sin espacios,
+    así "spiderman" y "spider-man" generan los mismos trigramas).
+
+    La búsqueda genera candidatos contando trigramas compartidos, empezando
+    por los menos frecuentes, y solo a esos pocos candidatos les calcula
+    la similitud de texto, por lo que el costo no crece con todo el catálogo.
+    """
+
+    def __init__(self, items, max_frecuencia=0.05):
+        self._items = items
+        self._textos = []
+        self._doc_item = []
+        self._tamaños = []
+        postings = defaultdict(list)
+
+        for posicion, item in enumerate(items):
+            vistos = set()
+            for campo in CAMPOS_TITULO:
+                compacto = normalizar_texto(item.get(campo)).replace(' ', '')
+                if not compacto or compacto in vistos:
+                    continue
+                vistos.add(compacto)
+
+                doc = len(self._textos)
+                trigramas = _trigramas(compacto)
+                self._textos.append(compacto)
+                self._doc_item.append(posicion)
+                self._tamaños.append(len(trigramas))
+                for trigrama in trigramas:
+                    postings[trigrama].append(doc)
+
+        self._postings = dict(postings)
+        # Trigramas más frecuentes que esto no generan candidatos nuevos
+        self._max_posting = max(50, int(len(self._textos) * max_frecuencia))
+
+    def __len__(self):
+        return len(self._textos)
+
+    def buscar(self, texto, limite=20, candidatos=100, umbral=0.5):
+        """Devuelve una lista de (similitud, item) ordenada de mayor a menor"""
+        consulta = normalizar_texto(texto).replace(' ', '')
+        if not consulta:
+            return []
+
+        trigramas = _trigramas(consulta)
+        listas = sorted((self._postings.get(t, []) for t in trigramas), key=len)
+
+        comunes = defaultdict(int)
+        for posting in listas:
+            if len(posting) > self._max_posting and comunes:
+                break
+            for doc in posting:
+                comunes[doc] += 1
+
+        # Coeficiente de Jaccard aproximado para elegir candidatos
+        total = len(trigramas)
+        elegidos = heapq.nlargest(
+            candidatos,
+            comunes.items(),
+            key=lambda par: par[1] / (total + self._tamaños[par[0]] - par[1])
+        )
+
+        # Re-ranking por similitud de texto, conservando el mejor por item
+        mejores = {}
+        for doc, _ in elegidos:
+            similitud = _similitud(consulta, self._textos[doc])
+            posicion = self._doc_item[doc]
+            if similitud >= umbral and similitud > mejores.get(posicion, 0):
+                mejores[posicion] = similitud
+
+        resultado = [(similitud, self._items[posicion]) for posicion, similitud in mejores.items()]
+        resultado.sort(key=lambda r: (round(r[0], 3), puntuacion_popularidad(r[1])), reverse=True)
+        return resultado[:limite]
+
+
+def buscar_titulos(prefijos, trigramas, texto, limite=100):
+    """
+    Combina el índice de prefijos y el de trigramas en una sola relevancia
+    entre 0 y 1, comparable entre catálogos distintos.
+    Devuelve una lista de (relevancia, item) ordenada de mayor a menor.
+    """
+    relevancias = {}
+    items = {}
+
+    for (al_inicio, *_), item in prefijos.buscar(texto, limite):
+        relevancias[id(item)] = 1.0 if al_inicio else 0.85
+        items[id(item)] = item
+
+    for similitud, item in trigramas.buscar(texto, limite):
+        if similitud > relevancias.get(id(item), 0):
+            relevancias[id(item)] = similitud
+            items[id(item)] = item
+
+    resultado = [(relevancia, items[clave]) for clave, relevancia in relevancias.items()]
+    resultado.sort(key=lambda r: (round(r[0], 3), puntuacion_popularidad(r[1])), reverse=True)
+    return resultado[:limite]
+
+
+# Campos de personas en los registros y el rol que representan
+ROLES_PERSONA = {'director': 'director', 'actores': 'actor'}
+
+
+def slug_persona(nombre):
+    """Identificador estable de una persona ("Penélope Cruz" -> "penelope-cruz")"""
+    return normalizar_texto(nombre).replace(' ', '-')
+
+
+class IndicePersonas:
+    """
+    Índice de personas (directores y actores) -> títulos en los que participan.
+    Incluye un índice de prefijos sobre los nombres para autocompletado.
+    """
+
+    def __init__(self, items):
+        self._personas = {}
+
+        for item in items:
+            for campo, rol in ROLES_PERSONA.items():
+                for nombre in item.get(campo) or []:
+                    slug = slug_persona(nombre)
+                    if not slug:
+                        continue
+
+                    persona = self._personas.get(slug)
+                    if persona is None:
+                        persona = {'slug': slug, 'nombre': nombre.strip(), 'titulos': {}}
+                        self._personas[slug] = persona
+
+                    titulos = persona['titulos'].setdefault(rol, [])
+                    if not titulos or titulos[-1] is not item:
+                        titulos.append(item)
+
+        self._prefijos = IndicePrefijos(
+            self._personas.values(),
+            campos=['nombre'],
+            popularidad=lambda p: (sum(len(t) for t in p['titulos'].values()),)
+        )
+
+    def __len__(self):
+        return len(self._personas)
+
+    def obtener(self, slug):
+        """Devuelve la persona con ese slug o None"""
+        return self._personas.get(slug)
+
+    def titulos(self, slug, rol=None):
+        """Títulos de una persona, opcionalmente solo de un rol ('director' o 'actor')"""
+        persona = self._personas.get(slug)
+        if persona is None:
+            return []
+        if rol:
+            return list(persona['titulos'].get(rol, []))
+
+        vistos = set()
+        resultado = []
+        for titulos in persona['titulos'].values():
+            for item in titulos:
+                if id(item) not in vistos:
+                    vistos.add(id(item))
+                    resultado.append(item)
+        return resultado
+
+    def buscar(self, texto, limite=10):
+        """Autocompletado de nombres; devuelve una lista de personas"""
+        return [persona for _, persona in self._prefijos.buscar(texto, limite)]
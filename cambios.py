@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger('cambios')
+
+AGREGADO = 'agregado'
+MODIFICADO = 'modificado'
+ELIMINADO = 'eliminado'
+
+
+def huella_item(item):
+    """Huella del contenido de un item (cambia si cambia cualquier campo)"""
+    contenido = json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:16]
+
+
+def compactar(filas):
+    """
+    Reduce una secuencia de (item_id, accion) en orden de versión al cambio
+    neto: agregado y luego eliminado se anula, eliminado y luego agregado
+    queda como modificado, etc.
+    Devuelve {'agregados': [...], 'modificados': [...], 'eliminados': [...]}.
+    """
+    primera = {}
+    ultima = {}
+    for item_id, accion in filas:
+        primera.setdefault(item_id, accion)
+        ultima[item_id] = accion
+
+    delta = {'agregados': [], 'modificados': [], 'eliminados': []}
+    for item_id, inicial in primera.items():
+        final = ultima[item_id]
+        existia = inicial != AGREGADO
+        existe = final != ELIMINADO
+
+        if existia and existe:
+            delta['modificados'].append(item_id)
+        elif existe:
+            delta['agregados'].append(item_id)
+        elif existia:
+            delta['eliminados'].append(item_id)
+
+    return delta
+
+
+class RegistroCambios:
+    """
+    Versión monótona del catálogo y registro de ids agregados, modificados
+    y eliminados en cada versión, guardados en SQLite para que sobrevivan a
+    reinicios y todos los workers vean los mismos números de versión.
+    Solo se conservan las últimas 'max_versiones' versiones del historial.
+    """
+
+    def __init__(self, archivo, max_versiones=200):
+        self.archivo = archivo
+        self.max_versiones = max_versiones
+        self._local = threading.local()
+
+        with self._conexion() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS versiones ('
+                ' version INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, huella TEXT, creada REAL)'
+            )
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS cambios ('
+                ' version INTEGER, tipo TEXT, item_id TEXT, accion TEXT)'
+            )
+            conexion.execute('CREATE INDEX IF NOT EXISTS cambios_version ON cambios (version)')
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS items ('
+                ' tipo TEXT, item_id TEXT, huella TEXT, PRIMARY KEY (tipo, item_id))'
+            )
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS vigentes ('
+                ' tipo TEXT PRIMARY KEY, huella TEXT, version INTEGER)'
+            )
+
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=30, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def registrar(self, tipo, huella, items):
+        """
+        Registra el contenido de un archivo de catálogo y devuelve su versión.
+        Si la huella es la misma que la vigente (otro worker ya la registró
+        o el archivo no cambió desde el último arranque) no crea versión nueva.
+        """
+        huellas = {}
+        for item in items:
+            item_id = item.get('id')
+            if item_id is not None:
+                huellas.setdefault(str(item_id), huella_item(item))
+
+        conexion = self._conexion()
+        # BEGIN IMMEDIATE: un solo worker a la vez calcula y guarda la diferencia
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            vigente = conexion.execute(
+                'SELECT huella, version FROM vigentes WHERE tipo = ?', (tipo,)
+            ).fetchone()
+            if vigente is not None and vigente[0] == huella:
+                conexion.execute('COMMIT')
+                return vigente[1]
+
+            anteriores = dict(conexion.execute(
+                'SELECT item_id, huella FROM items WHERE tipo = ?', (tipo,)
+            ))
+            cambios = []
+            for item_id, huella_actual in huellas.items():
+                anterior = anteriores.get(item_id)
+                if anterior is None:
+                    cambios.append((item_id, AGREGADO))
+                elif anterior != huella_actual:
+                    cambios.append((item_id, MODIFICADO))
+            for item_id in anteriores.keys() - huellas.keys():
+                cambios.append((item_id, ELIMINADO))
+
+            version = conexion.execute(
+                'INSERT INTO versiones (tipo, huella, creada) VALUES (?, ?, ?)',
+                (tipo, huella, time.time())
+            ).lastrowid
+
+            conexion.executemany(
+                'INSERT INTO cambios (version, tipo, item_id, accion) VALUES (?, ?, ?, ?)',
+                [(version, tipo, item_id, accion) for item_id, accion in cambios]
+            )
+            conexion.execute('DELETE FROM items WHERE tipo = ?', (tipo,))
+            conexion.executemany(
+                'INSERT INTO items (tipo, item_id, huella) VALUES (?, ?, ?)',
+                [(tipo, item_id, h) for item_id, h in huellas.items()]
+            )
+            conexion.execute(
+                'INSERT OR REPLACE INTO vigentes (tipo, huella, version) VALUES (?, ?, ?)',
+                (tipo, huella, version)
+            )
+
+            # Truncar el historial
+            conexion.execute('DELETE FROM versiones WHERE version <= ?', (version - self.max_versiones,))
+            conexion.execute('DELETE FROM cambios WHERE version <= ?', (version - self.max_versiones,))
+            conexion.execute('COMMIT')
+        except Exception:
+            conexion.execute('ROLLBACK')
+            raise
+
+        log.info(
+            f"📝 {tipo}: versión {version} ({len(cambios)} cambios)",
+            extra={'catalogo': tipo, 'version': version, 'cambios': len(cambios)}
+        )
+        return version
+
+    def version_actual(self):
+        """Última versión registrada (0 si todavía no hay ninguna)"""
+        fila = self._conexion().execute('SELECT MAX(version) FROM versiones').fetchone()
+        return fila[0] or 0
+
+    def version_minima(self):
+        """Versión más antigua cuyo historial se conserva"""
+        fila = self._conexion().execute('SELECT MIN(version) FROM versiones').fetchone()
+        return fila[0] or 0
+
+    def desde(self, version, limite=5000):
+        """
+        Cambios netos posteriores a 'version'. Devuelve None si hay que
+        resincronizar: el historial ya no llega hasta esa versión o el
+        delta tiene más de 'limite' ids.
+        """
+        conexion = self._conexion()
+        conexion.execute('BEGIN')
+        try:
+            actual = self.version_actual()
+            minima = self.version_minima()
+            if version > actual or (version < minima - 1 and actual > 0):
+                return None
+
+            filas = conexion.execute(
+                'SELECT tipo, item_id, accion FROM cambios WHERE version > ? ORDER BY version, rowid',
+                (version,)
+            ).fetchall()
+        finally:
+            conexion.execute('COMMIT')
+
+        por_tipo = {}
+        for tipo, item_id, accion in filas:
+            por_tipo.setdefault(tipo, []).append((item_id, accion))
+
+        delta = {tipo: compactar(cambios) for tipo, cambios in por_tipo.items()}
+        if sum(len(ids) for cambios in delta.values() for ids in cambios.values()) > limite:
+            return None
+
+        return actual, delta
@@ -0,0 +1,478 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from busqueda import (IndicePrefijos, IndiceTrigramas, IndicePersonas,
+                      buscar_titulos, puntuacion_popularidad)
+from recomendaciones import construir_vecinos
+
+log = logging.getLogger('catalogo')
+
+# Campos que se devuelven cuando se pide un resumen de un item
+CAMPOS_RESUMEN = ['id', 'titulo', 'imagen', 'año', 'calidad', 'generos', 'rating']
+
+# Ejemplos de valores inválidos que se guardan por columna
+MAX_EJEMPLOS_ERROR = 10
+
+_PATRON_AÑO = re.compile(r'^\s*(\d{4})\s*$')
+_PATRON_HORAS = re.compile(r'(\d+)\s*h')
+_PATRON_MINUTOS = re.compile(r'(\d+)\s*m')
+_PATRON_NUMERO = re.compile(r'(\d+)')
+
+
+# ==================== NORMALIZACIÓN ====================
+
+def parsear_año(valor):
+    """'2025' -> 2025"""
+    match = _PATRON_AÑO.match(str(valor))
+    if not match:
+        raise ValueError(valor)
+    return int(match.group(1))
+
+
+def parsear_rating(valor):
+    """'6.7' -> 6.7"""
+    rating = float(str(valor).replace(',', '.'))
+    if not 0 <= rating <= 10:
+        raise ValueError(valor)
+    return rating
+
+
+def parsear_duracion(valor):
+    """'1h 32m' -> 92 (minutos)"""
+    texto = str(valor).lower()
+    horas = _PATRON_HORAS.search(texto)
+    minutos = _PATRON_MINUTOS.search(texto)
+    total = (int(horas.group(1)) * 60 if horas else 0) + (int(minutos.group(1)) if minutos else 0)
+    if total <= 0:
+        raise ValueError(valor)
+    return total
+
+
+# Columnas tipadas que se calculan al cargar el catálogo
+PARSERS_COLUMNAS = {
+    'año': parsear_año,
+    'rating': parsear_rating,
+    'duracion': parsear_duracion
+}
+
+
+class ColumnaOrdenada:
+    """
+    Valores tipados de un campo (uno por posición del item, None si falta)
+    con un índice ordenado para filtrar por rango con búsqueda binaria
+    """
+
+    def __init__(self, valores):
+        self.valores = valores
+
+        presentes = sorted((valor, posicion) for posicion, valor in enumerate(valores) if valor is not None)
+        faltantes = [posicion for posicion, valor in enumerate(valores) if valor is None]
+        self._claves = [valor for valor, _ in presentes]
+        self._posiciones = [posicion for _, posicion in presentes]
+
+        # Órdenes precalculados; los items sin valor siempre van al final
+        self.orden_ascendente = self._posiciones + faltantes
+        self.orden_descendente = self._posiciones[::-1] + faltantes
+
+        # Lugar de cada posición en esos órdenes, para ordenar subconjuntos
+        # sin recorrer la columna entera
+        self._lugar_ascendente = [0] * len(valores)
+        self._lugar_descendente = [0] * len(valores)
+        for lugar, posicion in enumerate(self.orden_ascendente):
+            self._lugar_ascendente[posicion] = lugar
+        for lugar, posicion in enumerate(self.orden_descendente):
+            self._lugar_descendente[posicion] = lugar
+
+    def rango(self, desde=None, hasta=None):
+        """Posiciones con desde <= valor <= hasta (ambos opcionales)"""
+        inicio = bisect_left(self._claves, desde) if desde is not None else 0
+        fin = bisect_right(self._claves, hasta) if hasta is not None else len(self._claves)
+        return self._posiciones[inicio:fin]
+
+    def ordenar(self, posiciones, descendente=False):
+        """
+        Ordena un subconjunto de posiciones igual que orden_ascendente u
+        orden_descendente, en O(k log k) para k posiciones
+        """
+        lugares = self._lugar_descendente if descendente else self._lugar_ascendente
+        return sorted(posiciones, key=lugares.__getitem__)
+
+
+def normalizar_columnas(items):
+    """
+    Convierte una sola vez los campos de texto a columnas tipadas.
+    Devuelve (columnas, errores) donde errores cuenta valores vacíos e inválidos.
+    """
+    columnas = {}
+    errores = {}
+
+    for campo, parser in PARSERS_COLUMNAS.items():
+        valores = []
+        resumen = {'vacios': 0, 'invalidos': 0, 'ejemplos': []}
+
+        for item in items:
+            valor = item.get(campo)
+            if valor is None or str(valor).strip() == '':
+                resumen['vacios'] += 1
+                valores.append(None)
+                continue
+            try:
+                valores.append(parser(valor))
+            except (ValueError, TypeError):
+                resumen['invalidos'] += 1
+                if len(resumen['ejemplos']) < MAX_EJEMPLOS_ERROR:
+                    resumen['ejemplos'].append({'id': item.get('id'), 'valor': valor})
+                valores.append(None)
+
+        columnas[campo] = ColumnaOrdenada(valores)
+        errores[campo] = resumen
+
+    return columnas, errores
+
+
+# ==================== EPISODIOS ====================
+
+def id_episodio(url):
+    """ID legible de un episodio a partir de su URL (último segmento de la ruta)"""
+    if not url:
+        return None
+    segmentos = [s for s in urlparse(url).path.split('/') if s]
+    return segmentos[-1] if segmentos else hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+
+
+def _ordenar_por_numero(elementos):
+    """
+    Ordena temporadas o episodios por el último número de su campo 'numero'
+    ("Temporada 2", "1x3", "3"); los que no tienen número conservan su orden
+    """
+    def clave(par):
+        posicion, elemento = par
+        numeros = _PATRON_NUMERO.findall(str(elemento.get('numero') or ''))
+        return (int(numeros[-1]) if numeros else float('inf'), posicion)
+    return [elemento for _, elemento in sorted(enumerate(elementos), key=clave)]
+
+
+class IndiceEpisodios:
+    """
+    Índice episodio -> (serie, temporada, posición) construido al cargar las series.
+    Cada serie guarda su secuencia de episodios en orden de reproducción,
+    así el anterior/siguiente de un episodio se obtiene en O(1).
+    """
+
+    def __init__(self, series):
+        self._por_id = {}
+        self._por_url = {}
+        self._secuencias = {}
+
+        for serie in series:
+            # En los listados 'temporadas' es un texto ("seasons 1"): sin episodios que indexar
+            temporadas = serie.get('temporadas')
+            if not isinstance(temporadas, list):
+                continue
+            secuencia = []
+            for temporada in _ordenar_por_numero([t for t in temporadas if isinstance(t, dict)]):
+                episodios = temporada.get('episodios')
+                if not isinstance(episodios, list):
+                    continue
+                for episodio in _ordenar_por_numero([e for e in episodios if isinstance(e, dict)]):
+                    episodio_id = id_episodio(episodio.get('url'))
+                    if episodio_id is None or episodio_id in self._por_id:
+                        continue
+                    entrada = {
+                        'id': episodio_id,
+                        'serie': serie,
+                        'temporada': temporada,
+                        'episodio': episodio,
+                        'posicion': len(secuencia),
+                        'secuencia': secuencia
+                    }
+                    secuencia.append(entrada)
+                    self._por_id[episodio_id] = entrada
+                    self._por_url[episodio.get('url')] = entrada
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def obtener(self, episodio_id):
+        """Entrada del episodio por su ID, o None"""
+        return self._por_id.get(episodio_id)
+
+    def obtener_por_url(self, url):
+        """Entrada del episodio por su URL original, o None"""
+        return self._por_url.get(url)
+
+    def vecino(self, entrada, desplazamiento):
+        """Episodio anterior (-1) o siguiente (+1) dentro de la misma serie, o None"""
+        posicion = entrada['posicion'] + desplazamiento
+        if 0 <= posicion < len(entrada['secuencia']):
+            return entrada['secuencia'][posicion]
+        return None
+
+
+class SnapshotCatalogo:
+    """
+    Foto inmutable de un archivo de catálogo junto con sus índices.
+    Se construye una sola vez al cargar el archivo y se comparte entre peticiones.
+    """
+
+    def __init__(self, tipo, items, huella, version):
+        self.tipo = tipo
+        self.items = items
+        self.huella = huella
+        self.version = version
+        self.cargado_en = time.time()
+        # Milisegundos que tomó construir cada índice
+        self.tiempos = {}
+
+        # Índice id -> item (se conserva la primera aparición, igual que next())
+        self.por_id = {}
+        self.posiciones = {}
+        with self._medir('ids'):
+            for posicion, item in enumerate(items):
+                self.posiciones[id(item)] = posicion
+                item_id = item.get('id')
+                if item_id is not None:
+                    self.por_id.setdefault(str(item_id), item)
+
+        # Columnas tipadas (año, rating, duración) con índices ordenados
+        with self._medir('columnas'):
+            self.columnas, self.errores_normalizacion = normalizar_columnas(items)
+
+        # Vecinos por contenido (TF-IDF); None si NumPy/SciPy no están instalados
+        with self._medir('vecinos'):
+            self.vecinos = construir_vecinos(items)
+
+        # Índice de prefijos para autocompletado
+        with self._medir('prefijos'):
+            self.prefijos = IndicePrefijos(items)
+
+        # Índice de trigramas para búsqueda tolerante a errores
+        with self._medir('trigramas'):
+            self.trigramas = IndiceTrigramas(items)
+
+        # Índice de directores y actores
+        with self._medir('personas'):
+            self.personas = IndicePersonas(items)
+
+        # Índice de episodios (solo tiene datos en el catálogo de series)
+        with self._medir('episodios'):
+            self.episodios = IndiceEpisodios(items)
+
+    @contextmanager
+    def _medir(self, nombre):
+        inicio = time.perf_counter()
+        yield
+        self.tiempos[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def buscar(self, texto, limite=100):
+        """Busca por título usando los índices; devuelve (relevancia, item)"""
+        return buscar_titulos(self.prefijos, self.trigramas, texto, limite)
+
+    def posicion_de(self, item):
+        """Posición de un item de este snapshot en la lista de items"""
+        return self.posiciones[id(item)]
+
+    def filtrar_rangos(self, rangos):
+        """
+        Intersecta filtros de rango sobre columnas tipadas.
+        rangos: {'año': (desde, hasta), ...}; los límites None no se aplican.
+        Devuelve un set de posiciones, o None si no hay ningún filtro.
+        """
+        resultado = None
+        for campo, (desde, hasta) in rangos.items():
+            if desde is None and hasta is None:
+                continue
+            posiciones = set(self.columnas[campo].rango(desde, hasta))
+            resultado = posiciones if resultado is None else resultado & posiciones
+        return resultado
+
+
+class GestorCatalogo:
+    """
+    Mantiene un snapshot por tipo de catálogo y lo reconstruye
+    únicamente cuando el archivo en disco cambia. Con un RegistroCambios,
+    la versión de cada snapshot es la versión persistida del catálogo.
+    """
+
+    def __init__(self, archivos, cambios=None):
+        self.archivos = archivos
+        self.cambios = cambios
+        self._snapshots = {}
+        self._firmas = {}
+        self._versiones = {}
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self.error_precarga = None
+        self.duracion_precarga = None
+
+    def obtener(self, tipo):
+        """Devuelve el snapshot vigente de 'peliculas' o 'series'"""
+        archivo = self.archivos[tipo]
+        firma = self._firma_archivo(archivo)
+
+        snapshot = self._snapshots.get(tipo)
+        if snapshot is not None and self._firmas.get(tipo) == firma:
+            return snapshot
+
+        with self._lock:
+            # Otro hilo pudo haberlo recargado mientras esperábamos
+            snapshot = self._snapshots.get(tipo)
+            if snapshot is not None and self._firmas.get(tipo) == firma:
+                return snapshot
+
+            snapshot = self._cargar(tipo, archivo)
+            self._snapshots[tipo] = snapshot
+            self._firmas[tipo] = firma
+            return snapshot
+
+    def precargar(self):
+        """Carga e indexa todos los catálogos ahora (fase de arranque)"""
+        inicio = time.perf_counter()
+        try:
+            for tipo in self.archivos:
+                self.obtener(tipo)
+        except Exception as e:
+            self.error_precarga = str(e)
+            log.exception(f"❌ Error precargando catálogos: {e}")
+            raise
+
+        self.duracion_precarga = round((time.perf_counter() - inicio) * 1000, 1)
+        self._listo.set()
+        log.info(
+            f"✓ Catálogos listos en {self.duracion_precarga} ms",
+            extra={'duracion_ms': self.duracion_precarga}
+        )
+
+    def precargar_en_segundo_plano(self):
+        """
+        Lanza la precarga en un hilo para que el worker empiece a aceptar
+        conexiones enseguida. Si el proceso se bifurca antes de terminar
+        (gunicorn --preload), el hijo vuelve a lanzarla, porque los hilos
+        no sobreviven al fork.
+        """
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._despues_de_fork)
+        self._lanzar_precarga()
+
+    def _lanzar_precarga(self):
+        threading.Thread(target=self._precargar_en_hilo, name='precarga-catalogos', daemon=True).start()
+
+    def _precargar_en_hilo(self):
+        try:
+            self.precargar()
+        except Exception:
+            # Ya quedó registrado; las peticiones volverán a intentar la carga
+            pass
+
+    def _despues_de_fork(self):
+        if self._listo.is_set():
+            return
+        # El hilo que tenía el lock ya no existe en este proceso
+        self._lock = threading.Lock()
+        self._lanzar_precarga()
+
+    def listo(self):
+        """True cuando todos los catálogos ya están cargados e indexados"""
+        return self._listo.is_set()
+
+    def esperar(self, timeout=None):
+        """Espera a que termine la precarga; devuelve listo()"""
+        return self._listo.wait(timeout)
+
+    def estado(self):
+        """Resumen por catálogo: cantidad de items y tiempos de construcción"""
+        return {
+            tipo: {
+                'items': len(snapshot.items),
+                'version': snapshot.version,
+                'tiempos_ms': snapshot.tiempos
+            }
+            for tipo, snapshot in self._snapshots.items()
+        }
+
+    def version_actual(self):
+        """Huellas de todos los catálogos vigentes (cambia si cambia cualquiera)"""
+        return tuple((tipo, self.obtener(tipo).huella) for tipo in sorted(self.archivos))
+
+    def _firma_archivo(self, archivo):
+        """Firma barata del archivo (mtime y tamaño) para detectar cambios"""
+        try:
+            stat = os.stat(archivo)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _cargar(self, tipo, archivo):
+        """Lee el archivo JSON y construye el snapshot con sus índices"""
+        contenido = b''
+        items = []
+        leido = True
+        try:
+            if os.path.exists(archivo):
+                with open(archivo, 'rb') as f:
+                    contenido = f.read()
+                items = json.loads(contenido.decode('utf-8'))
+        except Exception as e:
+            log.error(f"Error cargando {archivo}: {e}")
+            items = []
+            leido = False
+
+        huella = hashlib.sha1(contenido).hexdigest()[:16]
+        version = self._versiones.get(tipo, 0)
+        if self.cambios is None:
+            version += 1
+        elif leido:
+            # Un archivo ilegible no se registra (marcaría todo como eliminado)
+            try:
+                version = self.cambios.registrar(tipo, huella, items)
+            except Exception as e:
+                log.exception(f"❌ Error registrando cambios de {tipo}: {e}")
+        self._versiones[tipo] = version
+
+        inicio = time.perf_counter()
+        snapshot = SnapshotCatalogo(tipo, items, huella, version)
+        log.info(
+            f"✓ {tipo}: {len(items)} títulos indexados en {(time.perf_counter() - inicio) * 1000:.0f} ms",
+            extra={'catalogo': tipo, 'items': len(items), 'version': version, 'tiempos_ms': snapshot.tiempos}
+        )
+
+        for campo, resumen in snapshot.errores_normalizacion.items():
+            if resumen['invalidos']:
+                log.warning(f"⚠️ {tipo}: {resumen['invalidos']} valores inválidos en '{campo}'")
+
+        return snapshot
+
+
+# ==================== UTILIDADES ====================
+
+def resumir_item(item):
+    """Devuelve solo los campos básicos de un item para listados"""
+    return {campo: item.get(campo) for campo in CAMPOS_RESUMEN}
+
+
+def ordenar_por_relevancia(resultados):
+    """Ordena tuplas (relevancia, tipo, item) de varios catálogos a la vez"""
+    resultados.sort(key=lambda r: (round(r[0], 3), puntuacion_popularidad(r[2])), reverse=True)
+    return resultados
+
+
+def etag_combinado(snapshots, *partes):
+    """
+    Calcula un ETag que cambia si cambia cualquiera de los snapshots
+    o cualquiera de las partes de la petición (ids, modo, ...)
+    """
+    h = hashlib.sha1()
+    for snapshot in snapshots:
+        h.update(f"{snapshot.tipo}:{snapshot.huella};".encode('utf-8'))
+    for parte in partes:
+        h.update(json.dumps(parte, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        h.update(b';')
+    return h.hexdigest()[:32]
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class _Llamada:
+    """Resultado compartido de una ejecución en curso"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class UnVuelo:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una sola ejecución
+    (single-flight): el primer hilo calcula y los demás esperan su resultado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self.ejecutadas = 0
+        self.compartidas = 0
+
+    def ejecutar(self, clave, funcion, *args, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) una sola vez por clave a la vez"""
+        with self._lock:
+            llamada = self._en_vuelo.get(clave)
+            lider = llamada is None
+            if lider:
+                llamada = _Llamada()
+                self._en_vuelo[clave] = llamada
+                self.ejecutadas += 1
+            else:
+                self.compartidas += 1
+
+        if not lider:
+            llamada.evento.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado
+
+        try:
+            llamada.resultado = funcion(*args, **kwargs)
+            return llamada.resultado
+        except Exception as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+            llamada.evento.set()
+
+
+class UnVueloEntreProcesos:
+    """
+    Variante de UnVuelo entre workers usando archivos de bloqueo (flock).
+    El worker que obtiene el bloqueo calcula y deja el resultado en disco;
+    los que esperaban lo leen en lugar de recalcular. Cada clave tiene su
+    propio archivo de bloqueo, así que cálculos distintos nunca se esperan
+    entre sí; los archivos sin uso por más de 'retencion' segundos se borran.
+    Solo funciona donde existe fcntl (no en Windows).
+    """
+
+    def __init__(self, carpeta, vigencia=5, retencion=600):
+        self.carpeta = carpeta
+        self.vigencia = vigencia
+        self.retencion = retencion
+        self._ultima_limpieza = time.time()
+        os.makedirs(carpeta, exist_ok=True)
+
+    def _rutas(self, clave):
+        huella = hashlib.sha1(repr(clave).encode('utf-8')).hexdigest()
+        base = os.path.join(self.carpeta, huella)
+        return huella, f'{base}.lock', f'{base}.resultado'
+
+    def _limpiar(self):
+        """
+        Borra los archivos de claves sin uso reciente. Si otro worker justo
+        abre uno que se borra, en el peor caso esa clave se calcula dos veces.
+        """
+        ahora = time.time()
+        if ahora - self._ultima_limpieza < self.retencion:
+            return
+        self._ultima_limpieza = ahora
+        try:
+            nombres = os.listdir(self.carpeta)
+        except OSError:
+            return
+        for nombre in nombres:
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                if ahora - os.path.getmtime(ruta) > self.retencion:
+                    os.remove(ruta)
+            except OSError:
+                continue
+
+    def _leer(self, ruta, huella, desde):
+        """Resultado guardado para la huella si se escribió después de 'desde'"""
+        try:
+            if os.path.getmtime(ruta) < desde:
+                return None
+            with open(ruta, 'rb') as f:
+                huella_guardada, resultado = pickle.load(f)
+            return resultado if huella_guardada == huella else None
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _escribir(self, ruta, huella, resultado):
+        temporal = f'{ruta}.{os.getpid()}'
+        with open(temporal, 'wb') as f:
+            pickle.dump((huella, resultado), f)
+        os.replace(temporal, ruta)
+
+    def ejecutar(self, clave, funcion, *args, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) una sola vez por clave entre workers"""
+        if fcntl is None:
+            return funcion(*args, **kwargs)
+
+        self._limpiar()
+        huella, ruta_lock, ruta_resultado = self._rutas(clave)
+        inicio = time.time()
+
+        with open(ruta_lock, 'a') as bloqueo:
+            try:
+                fcntl.flock(bloqueo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                esperamos = False
+            except OSError:
+                fcntl.flock(bloqueo, fcntl.LOCK_EX)
+                esperamos = True
+            # Marca de uso para _limpiar
+            os.utime(bloqueo.fileno())
+
+            try:
+                if esperamos:
+                    resultado = self._leer(ruta_resultado, huella, inicio - self.vigencia)
+                    if resultado is not None:
+                        return resultado
+
+                resultado = funcion(*args, **kwargs)
+                self._escribir(ruta_resultado, huella, resultado)
+                return resultado
+            finally:
+                fcntl.flock(bloqueo, fcntl.LOCK_UN)
@@ -0,0 +1,146 @@
+import math
+
+from busqueda import normalizar_texto, slug_persona
+
+try:
+    import numpy as np
+    from scipy import sparse
+    DISPONIBLE = True
+except ImportError:
+    DISPONIBLE = False
+
+# Vecinos que se guardan por título
+VECINOS_POR_TITULO = 20
+
+# Filas de la matriz de similitud que se calculan a la vez (controla la memoria)
+FILAS_POR_LOTE = 512
+
+# Términos presentes en más de esta fracción de títulos (o en más de
+# MAX_DOCUMENTOS_POR_TERMINO) no aportan y encarecen el producto de matrices
+MAX_FRECUENCIA_DOCUMENTO = 0.05
+MAX_DOCUMENTOS_POR_TERMINO = 1000
+
+PALABRAS_VACIAS = set('''
+a al algo ante antes aqui asi aunque cada como con contra cual cuando de del desde
+donde dos e el ella ellas ellos en entre era es esa ese eso esta este esto estos fue
+ha hace han hasta hay la las le les lo los mas me mi mientras muy ni no nos o otra
+otro para pero por porque que quien se sea ser si sin sobre son su sus tambien te
+tiene todo tras tu un una uno unos y ya
+an and are as at be by for from has he her his in is it its of on or she that the
+their they this to was who will with
+'''.split())
+
+
+def terminos_item(item):
+    """
+    Términos de un item para TF-IDF. Las personas se usan como un solo término
+    ("persona:cillian-murphy") para no mezclar nombres de pila comunes.
+    """
+    terminos = []
+    for campo in ['descripcion', 'titulo_original']:
+        for palabra in normalizar_texto(item.get(campo)).split():
+            if len(palabra) > 2 and palabra not in PALABRAS_VACIAS:
+                terminos.append(palabra)
+
+    # Director con más peso que un actor de reparto
+    for nombre in item.get('director') or []:
+        terminos.extend([f"persona:{slug_persona(nombre)}"] * 2)
+    for nombre in item.get('actores') or []:
+        terminos.append(f"persona:{slug_persona(nombre)}")
+
+    return terminos
+
+
+def construir_matriz_tfidf(items):
+    """Matriz dispersa (items x términos) TF-IDF con filas normalizadas (L2)"""
+    documentos = [terminos_item(item) for item in items]
+    total = len(documentos)
+
+    frecuencia_documento = {}
+    for terminos in documentos:
+        for termino in set(terminos):
+            frecuencia_documento[termino] = frecuencia_documento.get(termino, 0) + 1
+
+    # Un término que aparece en un solo título no relaciona nada
+    maximo = max(2, min(int(total * MAX_FRECUENCIA_DOCUMENTO), MAX_DOCUMENTOS_POR_TERMINO))
+    vocabulario = {}
+    idf = []
+    for termino, df in frecuencia_documento.items():
+        if 2 <= df <= maximo:
+            vocabulario[termino] = len(idf)
+            idf.append(math.log((1 + total) / (1 + df)) + 1)
+
+    filas, columnas, valores = [], [], []
+    for fila, terminos in enumerate(documentos):
+        conteo = {}
+        for termino in terminos:
+            columna = vocabulario.get(termino)
+            if columna is not None:
+                conteo[columna] = conteo.get(columna, 0) + 1
+        for columna, tf in conteo.items():
+            filas.append(fila)
+            columnas.append(columna)
+            valores.append((1 + math.log(tf)) * idf[columna])
+
+    matriz = sparse.csr_matrix(
+        (np.asarray(valores, dtype=np.float32), (filas, columnas)),
+        shape=(total, len(vocabulario))
+    )
+
+    normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+    normas[normas == 0] = 1
+    return sparse.diags(1 / normas).dot(matriz).tocsr().astype(np.float32)
+
+
+def construir_vecinos(items, k=VECINOS_POR_TITULO):
+    """
+    Calcula los k vecinos más similares (coseno) de cada item.
+    Devuelve (indices, similitudes), dos arreglos de forma (n, k); las
+    posiciones sin vecino tienen índice -1. Devuelve None si NumPy/SciPy
+    no están instalados o el catálogo está vacío.
+    """
+    if not DISPONIBLE or not items:
+        return None
+
+    matriz = construir_matriz_tfidf(items)
+    total = matriz.shape[0]
+    k = min(k, max(total - 1, 1))
+    transpuesta = matriz.T.tocsc()
+
+    indices = np.full((total, k), -1, dtype=np.int32)
+    similitudes = np.zeros((total, k), dtype=np.float32)
+
+    for inicio in range(0, total, FILAS_POR_LOTE):
+        fin = min(inicio + FILAS_POR_LOTE, total)
+        # El producto se mantiene disperso: solo hay valores para pares que comparten términos
+        bloque = (matriz[inicio:fin] @ transpuesta).tocsr()
+
+        for fila in range(fin - inicio):
+            desde, hasta = bloque.indptr[fila], bloque.indptr[fila + 1]
+            columnas = bloque.indices[desde:hasta]
+            valores = bloque.data[desde:hasta]
+
+            # Un título no es vecino de sí mismo
+            valores = np.where(columnas == inicio + fila, 0, valores)
+
+            if len(valores) > k:
+                mejores = np.argpartition(-valores, k - 1)[:k]
+            else:
+                mejores = np.arange(len(valores))
+            mejores = mejores[np.argsort(-valores[mejores], kind='stable')]
+            mejores = mejores[valores[mejores] > 0]
+
+            indices[inicio + fila, :len(mejores)] = columnas[mejores]
+            similitudes[inicio + fila, :len(mejores)] = valores[mejores]
+
+    return indices, similitudes
+
+
+def vecinos_de(vecinos, posicion, limite):
+    """Lista de (posicion, similitud) de los vecinos guardados para un item"""
+    indices, similitudes = vecinos
+    return [
+        (int(i), float(s))
+        for i, s in zip(indices[posicion][:limite], similitudes[posicion][:limite])
+        if i >= 0
+    ]
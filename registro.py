@@ -0,0 +1,178 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Id de la petición en curso (lo fija la API en before_request)
+request_id = contextvars.ContextVar('request_id', default=None)
+
+# Campos estándar de LogRecord que no se repiten en la salida JSON
+_CAMPOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'request_id'}
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro; los campos de 'extra' se agregan tal cual"""
+
+    def format(self, record):
+        datos = {
+            'ts': round(record.created, 3),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'mensaje': record.getMessage()
+        }
+        if getattr(record, 'request_id', None):
+            datos['request_id'] = record.request_id
+        for clave, valor in vars(record).items():
+            if clave not in _CAMPOS_RECORD:
+                datos[clave] = valor
+        if record.exc_text:
+            datos['error'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormatoTexto(logging.Formatter):
+    """Salida legible para consola (igual que los print de antes)"""
+
+    def format(self, record):
+        texto = record.getMessage()
+        if record.levelno >= logging.WARNING and not texto.startswith(('⚠', '❌', '✗')):
+            texto = f"[{record.levelname}] {texto}"
+        if record.exc_text:
+            texto = f"{texto}\n{record.exc_text}"
+        return texto
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar solo una fracción de los registros de ciertos módulos
+    (por prefijo del nombre). Las advertencias y errores nunca se descartan.
+    """
+
+    def __init__(self, fracciones):
+        super().__init__()
+        # Los prefijos más largos ganan ("scraper.peliculas" antes que "scraper")
+        self.fracciones = sorted(fracciones.items(), key=lambda f: len(f[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefijo, fraccion in self.fracciones:
+            if record.name == prefijo or record.name.startswith(prefijo + '.'):
+                return random.random() < fraccion
+        return True
+
+
+class _ManejadorCola(QueueHandler):
+    """
+    QueueHandler que nunca bloquea: si la cola está llena el registro se
+    descarta y se cuenta. El formateo se hace en el hilo escritor.
+    """
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # Solo lo mínimo en el hilo que registra: resolver el mensaje y la traza
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+_oyente = None
+_manejador = None
+
+
+def leer_muestreo(texto):
+    """Interpreta "scraper.peliculas=0.1,api.peticiones=0.5" como {modulo: fraccion}"""
+    fracciones = {}
+    for parte in (texto or '').split(','):
+        nombre, _, valor = parte.partition('=')
+        try:
+            fracciones[nombre.strip()] = float(valor)
+        except ValueError:
+            continue
+    return fracciones
+
+
+def configurar_registro(nivel=None, formato=None, muestreo=None, destino=None, tamaño_cola=10000):
+    """
+    Configura el logging del proceso: los registros pasan por una cola
+    acotada y un hilo en segundo plano los escribe, así registrar no hace
+    I/O en el hilo que atiende la petición o descarga la página.
+
+    Los valores por defecto se leen de LOG_NIVEL, LOG_FORMATO ('json' o
+    'texto') y LOG_MUESTREO. Llamarla de nuevo no hace nada.
+    """
+    global _oyente, _manejador
+    if _oyente is not None:
+        return _manejador
+
+    nivel = nivel or os.getenv('LOG_NIVEL', 'INFO')
+    formato = os.getenv('LOG_FORMATO', formato or 'json')
+    if muestreo is None:
+        muestreo = leer_muestreo(os.getenv('LOG_MUESTREO'))
+
+    # En modo texto (scrapers en consola) se escribe donde escriben los print
+    salida = logging.StreamHandler(destino or (sys.stdout if formato == 'texto' else sys.stderr))
+    salida.setFormatter(FormatoJSON() if formato == 'json' else FormatoTexto())
+
+    _manejador = _ManejadorCola(queue.Queue(tamaño_cola))
+    if muestreo:
+        _manejador.addFilter(FiltroMuestreo(muestreo))
+
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel.upper())
+    raiz.addHandler(_manejador)
+
+    _oyente = QueueListener(_manejador.queue, salida, respect_handler_level=True)
+    _oyente.start()
+    # Vaciar la cola antes de salir
+    atexit.register(_detener)
+    # El hilo escritor no sobrevive al fork (gunicorn --preload): el hijo lanza el suyo
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_despues_de_fork)
+    return _manejador
+
+
+def _detener():
+    if _oyente is not None:
+        _oyente.stop()
+
+
+def _despues_de_fork():
+    """
+    En el proceso hijo: cola nueva (la heredada pudo quedar con su lock
+    tomado por el hilo del padre) y un hilo escritor con los mismos destinos
+    """
+    global _oyente
+    if _oyente is None:
+        return
+    _manejador.queue = queue.Queue(_manejador.queue.maxsize)
+    _manejador.descartados = 0
+    _oyente = QueueListener(_manejador.queue, *_oyente.handlers, respect_handler_level=True)
+    _oyente.start()
+
+
+def registros_descartados():
+    """Registros perdidos porque la cola estaba llena"""
+    return _manejador.descartados if _manejador is not None else 0
+
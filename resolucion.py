@@ -0,0 +1,161 @@
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from concurrencia import UnVuelo
+
+log = logging.getLogger('resolucion')
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8'
+}
+
+
+class CacheEnlaces:
+    """
+    Cache TTL + LRU de enlaces resueltos en un archivo SQLite, de modo que
+    todos los workers de gunicorn comparten los mismos resultados.
+    Los fallos se guardan con un TTL corto para no martillar el origen.
+    """
+
+    def __init__(self, archivo, ttl=1800, ttl_fallo=60, max_entradas=5000):
+        self.archivo = archivo
+        self.ttl = ttl
+        self.ttl_fallo = ttl_fallo
+        self.max_entradas = max_entradas
+        self._local = threading.local()
+
+        with self._conexion() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS enlaces ('
+                ' clave TEXT PRIMARY KEY, url_final TEXT, expira REAL, usado REAL)'
+            )
+            conexion.execute('CREATE INDEX IF NOT EXISTS enlaces_usado ON enlaces (usado)')
+
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=5)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def obtener(self, clave):
+        """Devuelve (encontrado, url_final); url_final puede ser None si es un fallo guardado"""
+        ahora = time.time()
+        conexion = self._conexion()
+        fila = conexion.execute(
+            'SELECT url_final, expira FROM enlaces WHERE clave = ?', (clave,)
+        ).fetchone()
+
+        if fila is None or fila[1] < ahora:
+            return False, None
+
+        with conexion:
+            conexion.execute('UPDATE enlaces SET usado = ? WHERE clave = ?', (ahora, clave))
+        return True, fila[0]
+
+    def guardar(self, clave, url_final):
+        """Guarda un resultado y expulsa las entradas vencidas o menos usadas"""
+        ahora = time.time()
+        ttl = self.ttl if url_final else self.ttl_fallo
+        conexion = self._conexion()
+
+        with conexion:
+            conexion.execute(
+                'INSERT OR REPLACE INTO enlaces (clave, url_final, expira, usado) VALUES (?, ?, ?, ?)',
+                (clave, url_final, ahora + ttl, ahora)
+            )
+            conexion.execute('DELETE FROM enlaces WHERE expira < ?', (ahora,))
+            conexion.execute(
+                'DELETE FROM enlaces WHERE clave IN ('
+                ' SELECT clave FROM enlaces ORDER BY usado DESC LIMIT -1 OFFSET ?)',
+                (self.max_entradas,)
+            )
+
+
+class ResolvedorEnlaces:
+    """
+    Sigue la redirección /r.php de un servidor en el momento del clic
+    (igual que obtener_url_final_video de los extractores) usando una
+    sesión HTTP con pool de conexiones. Las peticiones simultáneas por el
+    mismo enlace se agrupan en una sola petición al origen.
+    """
+
+    def __init__(self, cache, sesion=None, timeout=(3.05, 10), tamaño_pool=20):
+        self.cache = cache
+        self.timeout = timeout
+        self._vuelos = UnVuelo()
+
+        if sesion is None:
+            sesion = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=tamaño_pool, pool_maxsize=tamaño_pool)
+            sesion.mount('http://', adaptador)
+            sesion.mount('https://', adaptador)
+        self.sesion = sesion
+
+    def resolver(self, url_redirect, referer=None):
+        """
+        Devuelve (url_final, desde_cache). url_final es None si el enlace
+        no se pudo resolver.
+        """
+        encontrado, url_final = self.cache.obtener(url_redirect)
+        if encontrado:
+            return url_final, True
+
+        url_final = self._vuelos.ejecutar(url_redirect, self._resolver_y_guardar, url_redirect, referer)
+        return url_final, False
+
+    def _resolver_y_guardar(self, url_redirect, referer):
+        # Otro worker pudo haberlo resuelto mientras esperábamos
+        encontrado, url_final = self.cache.obtener(url_redirect)
+        if encontrado:
+            return url_final
+
+        url_final = self._seguir_redireccion(url_redirect, referer)
+        self.cache.guardar(url_redirect, url_final)
+        return url_final
+
+    def _seguir_redireccion(self, url_redirect, referer):
+        """Hace la petición sin seguir redirects y lee Location o el iframe"""
+        if not referer:
+            origen = urlparse(url_redirect)
+            referer = f"{origen.scheme}://{origen.netloc}/"
+
+        headers = HEADERS.copy()
+        headers['Referer'] = referer
+
+        try:
+            response = self.sesion.get(
+                url_redirect,
+                headers=headers,
+                timeout=self.timeout,
+                allow_redirects=False
+            )
+
+            if 300 <= response.status_code < 400:
+                return response.headers.get('Location')
+
+            if response.status_code != 200:
+                return None
+
+            soup = BeautifulSoup(response.content, 'html.parser')
+            iframe = soup.find('iframe')
+            if iframe and 'src' in iframe.attrs:
+                return iframe['src']
+
+            return None
+
+        except Exception as e:
+            log.warning(f"Error resolviendo enlace {url_redirect}: {e}")
+            return None
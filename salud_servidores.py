@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from registro import configurar_registro
+from resolucion import HEADERS
+
+log = logging.getLogger('salud')
+
+ESTADO_OK = 'ok'
+ESTADO_CAIDO = 'caido'
+
+# Fallos seguidos a partir de los cuales un servidor se oculta
+UMBRAL_CAIDO = 2
+
+
+class TablaSalud:
+    """
+    Tabla lateral (SQLite) con el último resultado de salud de cada enlace
+    de servidor: estado, código HTTP, tiempo al primer byte y fallos seguidos
+    """
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._local = threading.local()
+
+        with self._conexion() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS salud ('
+                ' url TEXT PRIMARY KEY, estado TEXT, codigo INTEGER, ttfb_ms INTEGER,'
+                ' fallos INTEGER DEFAULT 0, revisado REAL)'
+            )
+
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=5)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def guardar(self, resultados):
+        """Guarda los resultados de una revisión (lista de dicts de _probar)"""
+        with self._conexion() as conexion:
+            conexion.executemany(
+                'INSERT INTO salud (url, estado, codigo, ttfb_ms, fallos, revisado)'
+                ' VALUES (:url, :estado, :codigo, :ttfb_ms, :fallo, :revisado)'
+                ' ON CONFLICT(url) DO UPDATE SET'
+                '  estado = excluded.estado, codigo = excluded.codigo,'
+                '  ttfb_ms = excluded.ttfb_ms, revisado = excluded.revisado,'
+                '  fallos = CASE WHEN excluded.fallos > 0 THEN salud.fallos + 1 ELSE 0 END',
+                [{**r, 'fallo': 1 if r['estado'] == ESTADO_CAIDO else 0} for r in resultados]
+            )
+
+    def estados(self, urls):
+        """Devuelve {url: {estado, codigo, ttfb_ms, fallos, revisado}} de las URLs conocidas"""
+        urls = list(set(urls))
+        resultado = {}
+        conexion = self._conexion()
+
+        # SQLite limita la cantidad de parámetros por consulta
+        for inicio in range(0, len(urls), 500):
+            lote = urls[inicio:inicio + 500]
+            filas = conexion.execute(
+                'SELECT url, estado, codigo, ttfb_ms, fallos, revisado FROM salud'
+                f' WHERE url IN ({",".join("?" * len(lote))})',
+                lote
+            )
+            for url, estado, codigo, ttfb_ms, fallos, revisado in filas:
+                resultado[url] = {
+                    'estado': estado,
+                    'codigo': codigo,
+                    'ttfb_ms': ttfb_ms,
+                    'fallos': fallos,
+                    'revisado': revisado
+                }
+
+        return resultado
+
+
+class VerificadorSalud:
+    """
+    Prueba enlaces de servidores en paralelo: sigue la redirección /r.php y
+    mide el tiempo al primer byte del host final. Usa un pool de hilos acotado
+    y un límite de conexiones simultáneas por host.
+    """
+
+    def __init__(self, tabla, sesion=None, max_trabajadores=16, max_por_host=4, timeout=(3.05, 10)):
+        self.tabla = tabla
+        self.max_trabajadores = max_trabajadores
+        self.max_por_host = max_por_host
+        self.timeout = timeout
+        self._semaforos = {}
+        self._lock = threading.Lock()
+
+        if sesion is None:
+            sesion = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=max_trabajadores, pool_maxsize=max_trabajadores)
+            sesion.mount('http://', adaptador)
+            sesion.mount('https://', adaptador)
+        self.sesion = sesion
+
+    def _semaforo(self, url):
+        """Semáforo del host de la URL (se crea la primera vez que se usa)"""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaforo = self._semaforos.get(host)
+            if semaforo is None:
+                semaforo = threading.BoundedSemaphore(self.max_por_host)
+                self._semaforos[host] = semaforo
+            return semaforo
+
+    def _probar(self, url_redirect, referer):
+        """Prueba un enlace y devuelve su resultado de salud"""
+        resultado = {
+            'url': url_redirect,
+            'estado': ESTADO_CAIDO,
+            'codigo': None,
+            'ttfb_ms': None,
+            'revisado': time.time()
+        }
+
+        headers = HEADERS.copy()
+        if referer:
+            headers['Referer'] = referer
+
+        try:
+            with self._semaforo(url_redirect):
+                response = self.sesion.get(url_redirect, headers=headers, timeout=self.timeout, allow_redirects=False)
+                response.close()
+
+            destino = response.headers.get('Location') if 300 <= response.status_code < 400 else None
+            if not destino:
+                resultado['codigo'] = response.status_code
+                return resultado
+            # Location puede ser relativa al enlace
+            destino = urljoin(url_redirect, destino)
+
+            headers['Referer'] = url_redirect
+            with self._semaforo(destino):
+                inicio = time.perf_counter()
+                response = self.sesion.get(destino, headers=headers, timeout=self.timeout, stream=True)
+                response.raw.read(1)
+                ttfb = time.perf_counter() - inicio
+                response.close()
+
+            resultado['codigo'] = response.status_code
+            resultado['ttfb_ms'] = int(ttfb * 1000)
+            if response.status_code < 400:
+                resultado['estado'] = ESTADO_OK
+
+        except Exception as e:
+            log.info(f"⚠️ Servidor sin respuesta {url_redirect}: {e}")
+
+        return resultado
+
+    def verificar(self, servidores):
+        """
+        Prueba una lista de (url_redirect, referer) y guarda los resultados.
+        Devuelve la lista de resultados.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_trabajadores) as ejecutor:
+            resultados = list(ejecutor.map(lambda s: self._probar(*s), servidores))
+
+        self.tabla.guardar(resultados)
+        return resultados
+
+
+# ==================== CATÁLOGO ====================
+
+def enlaces_del_catalogo(peliculas, series):
+    """Lista sin duplicados de (url_redirect, referer) de películas y episodios"""
+    enlaces = {}
+
+    for pelicula in peliculas:
+        for servidor in pelicula.get('servidores') or []:
+            if servidor.get('url_redirect'):
+                enlaces.setdefault(servidor['url_redirect'], pelicula.get('player_url'))
+
+    for serie in series:
+        for temporada in serie.get('temporadas') or []:
+            if not isinstance(temporada, dict):
+                continue
+            for episodio in temporada.get('episodios') or []:
+                if not isinstance(episodio, dict):
+                    continue
+                for servidor in episodio.get('servidores') or []:
+                    if servidor.get('url_redirect'):
+                        enlaces.setdefault(servidor['url_redirect'], episodio.get('player_url'))
+
+    return list(enlaces.items())
+
+
+def verificar_catalogo(verificador, peliculas, series, archivo_lock=None):
+    """
+    Revisa todos los servidores del catálogo. Con archivo_lock, solo un
+    proceso a la vez hace la revisión (los demás workers la saltan).
+    """
+    bloqueo = None
+    if archivo_lock and fcntl is not None:
+        bloqueo = open(archivo_lock, 'w')
+        try:
+            fcntl.flock(bloqueo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            bloqueo.close()
+            return None
+
+    try:
+        enlaces = enlaces_del_catalogo(peliculas, series)
+        inicio = time.time()
+        resultados = verificador.verificar(enlaces)
+        caidos = sum(1 for r in resultados if r['estado'] == ESTADO_CAIDO)
+        log.info(
+            f"✓ Salud de servidores: {len(resultados)} revisados, {caidos} caídos",
+            extra={'revisados': len(resultados), 'caidos': caidos, 'duracion_ms': int((time.time() - inicio) * 1000)}
+        )
+        return resultados
+    finally:
+        if bloqueo is not None:
+            fcntl.flock(bloqueo, fcntl.LOCK_UN)
+            bloqueo.close()
+
+
+def ordenar_servidores(servidores, estados, incluir_caidos=False):
+    """
+    Devuelve una copia de los servidores ordenada por salud: primero los que
+    responden (por tiempo al primer byte), luego los no revisados y al final
+    los que fallaron. Los caídos de forma repetida se ocultan salvo que se pidan.
+    Cada servidor conserva en 'indice' su posición original.
+    """
+    ordenados = []
+    for indice, servidor in enumerate(servidores):
+        salud = estados.get(servidor.get('url_redirect'))
+
+        if salud is None:
+            rango = (1, 0)
+        elif salud['estado'] == ESTADO_OK:
+            rango = (0, salud['ttfb_ms'] or 0)
+        elif salud['fallos'] >= UMBRAL_CAIDO and not incluir_caidos:
+            continue
+        else:
+            rango = (2, salud['fallos'])
+
+        ordenados.append((rango, indice, {
+            **servidor,
+            'indice': indice,
+            'salud': {'estado': salud['estado'], 'ttfb_ms': salud['ttfb_ms']} if salud else None
+        }))
+
+    ordenados.sort(key=lambda o: (o[0], o[1]))
+    return [servidor for _, _, servidor in ordenados]
+
+
+# Revisión manual (por ejemplo desde cron)
+if __name__ == "__main__":
+    configurar_registro(formato='texto')
+
+    carpeta = os.path.join(os.path.dirname(__file__), 'cache')
+
+    def cargar(nombre):
+        ruta = os.path.join(carpeta, nombre)
+        if not os.path.exists(ruta):
+            return []
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    print("🩺 REVISIÓN DE SALUD DE SERVIDORES")
+    print("=" * 80)
+
+    tabla = TablaSalud(os.path.join(carpeta, 'salud.sqlite3'))
+    verificar_catalogo(
+        VerificadorSalud(tabla),
+        cargar('peliculas.json'),
+        cargar('series.json'),
+        archivo_lock=os.path.join(carpeta, 'salud.lock')
+    )
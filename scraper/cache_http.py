@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+
+log = logging.getLogger('scraper.cache')
+
+# Frescura por clase de URL (segundos): los listados cambian varias veces
+# al día y los players cuando rotan servidores. Las páginas de detalle se
+# revalidan siempre (GET condicional): de ellas salen los episodios nuevos
+# y los cambios de calidad que buscan los refrescos incrementales
+TTL_POR_CLASE = {
+    'listado': 15 * 60,
+    'detalle': 0,
+    'player': 3 * 3600
+}
+
+# (clase, patrón del path) en orden; lo que no coincide es 'player'
+# (los players están en otros dominios: embed.php, etc.)
+CLASES_URL = [
+    ('listado', re.compile(r'^/(serie/)?(page/\d+/?)?$')),
+    ('detalle', re.compile(r'^/(peli|serie|episodio)/[^/]+'))
+]
+
+# Cabeceras de la respuesta que se guardan con el contenido
+CABECERAS_GUARDADAS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def clase_url(url):
+    """'listado', 'detalle' o 'player' según el path de la URL"""
+    path = urlparse(url).path or '/'
+    for clase, patron in CLASES_URL:
+        if patron.match(path):
+            return clase
+    return 'player'
+
+
+def huella_contenido(contenido):
+    return hashlib.sha256(contenido).hexdigest()
+
+
+class CacheHTTP:
+    """
+    Cache de respuestas HTTP en disco (SQLite) para los scrapers.
+
+    Por URL guarda la huella del contenido, ETag/Last-Modified y cuándo se
+    descargó o revalidó. Los contenidos se guardan comprimidos y una sola
+    vez por huella (dos URLs con el mismo HTML comparten la fila). Cuando
+    el total comprimido supera 'tamaño_max' se expulsan las URLs menos
+    usadas y los contenidos que quedan sin referencias.
+
+    También guarda resultados derivados del contenido (el parseo de una
+    página) para no volver a parsear un HTML que no cambió.
+    """
+
+    def __init__(self, archivo, tamaño_max=200 * 1024 * 1024, ttl=None):
+        self.archivo = archivo
+        self.tamaño_max = tamaño_max
+        self.ttl = {**TTL_POR_CLASE, **(ttl or {})}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        with self._conexion() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS respuestas ('
+                ' url TEXT PRIMARY KEY, huella TEXT, cabeceras TEXT, obtenida REAL, usada REAL)'
+            )
+            conexion.execute('CREATE INDEX IF NOT EXISTS respuestas_usada ON respuestas (usada)')
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS contenidos ('
+                ' huella TEXT PRIMARY KEY, datos BLOB, tamaño INTEGER)'
+            )
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS derivados ('
+                ' huella TEXT, nombre TEXT, datos TEXT, PRIMARY KEY (huella, nombre))'
+            )
+            self._tamaño = conexion.execute('SELECT COALESCE(SUM(tamaño), 0) FROM contenidos').fetchone()[0]
+
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=30)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def buscar(self, url):
+        """
+        Entrada guardada para la URL o None. Es un diccionario con
+        contenido, cabeceras, huella, obtenida y fresca (si todavía está
+        dentro del TTL de su clase).
+        """
+        conexion = self._conexion()
+        fila = conexion.execute(
+            'SELECT r.huella, r.cabeceras, r.obtenida, c.datos FROM respuestas r'
+            ' JOIN contenidos c ON c.huella = r.huella WHERE r.url = ?', (url,)
+        ).fetchone()
+        if fila is None:
+            return None
+
+        huella, cabeceras, obtenida, datos = fila
+        ahora = time.time()
+        with conexion:
+            conexion.execute('UPDATE respuestas SET usada = ? WHERE url = ?', (ahora, url))
+        return {
+            'contenido': zlib.decompress(datos),
+            'cabeceras': json.loads(cabeceras),
+            'huella': huella,
+            'obtenida': obtenida,
+            'fresca': ahora - obtenida < self.ttl[clase_url(url)]
+        }
+
+    def fresca(self, url):
+        """Si hay una entrada para la URL dentro del TTL de su clase"""
+        fila = self._conexion().execute('SELECT obtenida FROM respuestas WHERE url = ?', (url,)).fetchone()
+        return fila is not None and time.time() - fila[0] < self.ttl[clase_url(url)]
+
+    def revalidada(self, url):
+        """El origen respondió 304: la entrada vuelve a estar fresca"""
+        ahora = time.time()
+        with self._conexion() as conexion:
+            conexion.execute('UPDATE respuestas SET obtenida = ?, usada = ? WHERE url = ?', (ahora, ahora, url))
+
+    def guardar(self, url, contenido, cabeceras):
+        """Guarda una respuesta 200 y devuelve la huella de su contenido"""
+        huella = huella_contenido(contenido)
+        cabeceras = {clave: cabeceras[clave] for clave in CABECERAS_GUARDADAS if clave in cabeceras}
+        ahora = time.time()
+
+        conexion = self._conexion()
+        with conexion:
+            existe = conexion.execute('SELECT 1 FROM contenidos WHERE huella = ?', (huella,)).fetchone()
+            if existe is None:
+                datos = zlib.compress(contenido, 6)
+                conexion.execute(
+                    'INSERT OR IGNORE INTO contenidos (huella, datos, tamaño) VALUES (?, ?, ?)',
+                    (huella, datos, len(datos))
+                )
+                with self._lock:
+                    self._tamaño += len(datos)
+            conexion.execute(
+                'INSERT OR REPLACE INTO respuestas (url, huella, cabeceras, obtenida, usada) VALUES (?, ?, ?, ?, ?)',
+                (url, huella, json.dumps(cabeceras), ahora, ahora)
+            )
+
+        if self._tamaño > self.tamaño_max:
+            self.expulsar()
+        return huella
+
+    def expulsar(self):
+        """Borra las URLs menos usadas hasta quedar en el 90% de tamaño_max"""
+        objetivo = self.tamaño_max * 0.9
+        conexion = self._conexion()
+        with conexion:
+            tamaño = conexion.execute('SELECT COALESCE(SUM(tamaño), 0) FROM contenidos').fetchone()[0]
+            expulsadas = 0
+            while tamaño > objetivo:
+                # Las menos usadas hasta cubrir lo que sobra (aproximado: un
+                # contenido compartido por varias URLs no se libera hasta la última)
+                urls = []
+                liberado = 0
+                for url, tamaño_url in conexion.execute(
+                    'SELECT r.url, c.tamaño FROM respuestas r JOIN contenidos c ON c.huella = r.huella'
+                    ' ORDER BY r.usada'
+                ):
+                    urls.append(url)
+                    liberado += tamaño_url
+                    if liberado >= tamaño - objetivo:
+                        break
+                if not urls:
+                    break
+                conexion.executemany('DELETE FROM respuestas WHERE url = ?', [(url,) for url in urls])
+                conexion.execute(
+                    'DELETE FROM contenidos WHERE huella NOT IN (SELECT huella FROM respuestas)'
+                )
+                expulsadas += len(urls)
+                tamaño = conexion.execute('SELECT COALESCE(SUM(tamaño), 0) FROM contenidos').fetchone()[0]
+            conexion.execute('DELETE FROM derivados WHERE huella NOT IN (SELECT huella FROM contenidos)')
+
+        with self._lock:
+            self._tamaño = tamaño
+        log.info(
+            f"🧹 Cache HTTP: {expulsadas} URLs expulsadas, {tamaño / 1024 / 1024:.1f} MB",
+            extra={'expulsadas': expulsadas, 'tamaño': tamaño}
+        )
+
+    def derivado(self, huella, nombre, calcular, version=None):
+        """
+        Resultado guardado de calcular() para un contenido (por ejemplo el
+        parseo de la página). Solo se calcula si esa huella no se vio antes
+        con la misma versión del código que lo calcula; el resultado tiene
+        que ser serializable a JSON.
+        """
+        if huella is None:
+            return calcular()
+
+        clave = f'{nombre}@{version}' if version else nombre
+        conexion = self._conexion()
+        fila = conexion.execute(
+            'SELECT datos FROM derivados WHERE huella = ? AND nombre = ?', (huella, clave)
+        ).fetchone()
+        if fila is not None:
+            return json.loads(fila[0])
+
+        resultado = calcular()
+        with conexion:
+            # Los resultados de versiones anteriores ya no se van a leer
+            conexion.execute(
+                'DELETE FROM derivados WHERE huella = ? AND substr(nombre, 1, ?) = ?',
+                (huella, len(nombre) + 1, f'{nombre}@')
+            )
+            conexion.execute(
+                'INSERT OR REPLACE INTO derivados (huella, nombre, datos) VALUES (?, ?, ?)',
+                (huella, clave, json.dumps(resultado, ensure_ascii=False))
+            )
+        return resultado
+
+    def estadisticas(self):
+        conexion = self._conexion()
+        urls, contenidos, tamaño = conexion.execute(
+            'SELECT (SELECT COUNT(*) FROM respuestas), COUNT(*), COALESCE(SUM(tamaño), 0) FROM contenidos'
+        ).fetchone()
+        return {'urls': urls, 'contenidos': contenidos, 'tamaño': tamaño}
@@ -1,16 +1,51 @@
-import requests
-from bs4 import BeautifulSoup
+import logging
 import os
+import sys
 import json
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from registro import configurar_registro
+from cambios import huella_item
+from limitador import LimitadorPorHost
+from cliente_http import cliente_compartido
+from parseo import sopa
+
+log = logging.getLogger('scraper.listados')
+
+# Origen a scrapear (CINECALIDAD_URL permite apuntar a un espejo o al origen falso de benchmarks/)
+BASE_URL = os.getenv('CINECALIDAD_URL', 'https://cinecalidad.bar')
+
+
+def huella_listado(item):
+    """Huella de un item del listado sin su id (el id cambia en cada corrida)"""
+    return huella_item({clave: valor for clave, valor in item.items() if clave != 'id'})
+
+
+def con_ids_nuevos(items):
+    """
+    Los items de un parseo guardado en el cache traen los ids de la primera
+    vez: cada extracción les da ids nuevos, igual que sin cache
+    """
+    return [{**item, 'id': str(uuid.uuid4())} for item in items]
 
 class CinecalidadScraper:
-    def __init__(self):
-        self.base_url = "https://cinecalidad.bar"
+    def __init__(self, max_trabajadores=4, peticiones_por_segundo=1.0, rafaga=2, cliente=None, base_url=None):
+        """
+        max_trabajadores: páginas que se descargan a la vez
+        peticiones_por_segundo / rafaga: límite de cortesía por host (token bucket)
+        cliente: ClienteHTTP a usar (por defecto el compartido del proceso)
+        base_url: origen a scrapear (por defecto BASE_URL)
+        """
+        self.base_url = (base_url or BASE_URL).rstrip('/')
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
+        self.max_trabajadores = max_trabajadores
+        self.limitador = LimitadorPorHost(peticiones_por_segundo, rafaga)
+        self.cliente = cliente or cliente_compartido()
     
     def extraer_peliculas(self, url=None, pagina=1, tipo='pelicula'):
         """
@@ -23,72 +58,19 @@ class CinecalidadScraper:
                 url = f"{self.base_url}/page/{pagina}/"
         
         try:
-            print(f"Scrapeando: {url}")
-            response = requests.get(url, headers=self.headers, timeout=15)
+            log.info(f"Scrapeando: {url}")
+            response = self.cliente.get(url, headers=self.headers, limitador=self.limitador)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Encontrar todos los artículos de películas
-            peliculas = soup.find_all('article', class_='tposty')
+            datos_peliculas = con_ids_nuevos(self.cliente.parseado(
+                response, f'peliculas_{tipo}', lambda: self._parsear_peliculas(response.content, tipo)
+            ))
             
-            datos_peliculas = []
-            
-            for pelicula in peliculas:
-                try:
-                    # Extraer el enlace
-                    enlace_tag = pelicula.find('a', class_='absolute')
-                    enlace = enlace_tag['href'] if enlace_tag else None
-                    
-                    # Extraer el título
-                    titulo_span = pelicula.find('span', class_='sr-only')
-                    titulo = titulo_span.text.strip() if titulo_span else None
-                    
-                    # Extraer la imagen
-                    img_tag = pelicula.find('img')
-                    imagen = img_tag['src'] if img_tag else None
-                    
-                    # Extraer calidad y año
-                    calidad_tag = pelicula.find('span', class_='quality')
-                    calidad = calidad_tag.text.strip() if calidad_tag else None
-                    
-                    año_tag = pelicula.find('span', class_='year')
-                    año = año_tag.text.strip() if año_tag else None
-                    
-                    # Extraer descripción
-                    desc_tag = pelicula.find('p', class_='text-sm opacity-70')
-                    descripcion = desc_tag.text.strip() if desc_tag else None
-                    
-                    # Extraer géneros
-                    generos_container = pelicula.find('p', class_=['absolute', 'bottom-0'])
-                    generos = []
-                    if generos_container:
-                        generos_links = generos_container.find_all('a')
-                        generos = [g.text.strip() for g in generos_links]
-                    
-                    pelicula_data = {
-                        'id': uuid.uuid4(),
-                        'tipo': tipo,
-                        'titulo': titulo,
-                        'enlace': enlace,
-                        'imagen': imagen,
-                        'calidad': calidad,
-                        'año': año,
-                        'descripcion': descripcion,
-                        'generos': generos if generos else []
-                    }
-                    
-                    datos_peliculas.append(pelicula_data)
-                    
-                except Exception as e:
-                    print(f"Error al extraer película: {e}")
-                    continue
-            
-            print(f"✓ {len(datos_peliculas)} películas extraídas de la página {pagina}")
+            log.info(f"✓ {len(datos_peliculas)} películas extraídas de la página {pagina}")
             return datos_peliculas
             
         except Exception as e:
-            print(f"Error al hacer scraping: {e}")
+            log.error(f"Error al hacer scraping: {e}")
             return []
         
     def extraer_series(self, url=None, pagina=1, tipo='serie'):
@@ -102,113 +84,277 @@ class CinecalidadScraper:
                 url = f"{self.base_url}/serie/page/{pagina}/"
     
         try:
-            print(f"Scrapeando: {url}")
-            response = requests.get(url, headers=self.headers, timeout=15)
+            log.info(f"Scrapeando: {url}")
+            response = self.cliente.get(url, headers=self.headers, limitador=self.limitador)
             response.raise_for_status()
         
-            soup = BeautifulSoup(response.content, 'html.parser')
+            datos_series = con_ids_nuevos(self.cliente.parseado(
+                response, f'series_{tipo}', lambda: self._parsear_series(response.content, tipo)
+            ))
+            
+            log.info(f"✓ {len(datos_series)} series extraídas de la página {pagina}")
+            return datos_series
         
-            # Encontrar todos los artículos de series
-            series = soup.find_all('article', class_='tposty')
+        except Exception as e:
+            log.error(f"Error al hacer scraping: {e}")
+            return []
+    
+    def _parsear_peliculas(self, html, tipo):
+        """Items de películas de una página del listado"""
+        soup = sopa(html, 'listado')
         
-            datos_series = []
+        # Encontrar todos los artículos de películas
+        peliculas = soup.find_all('article', class_='tposty')
         
-            for serie in series:
-                try:                    
-                    # Extraer información de temporadas y episodios
-                    temporadas_tag = serie.find('span', class_='last-s')
-                    temporadas = temporadas_tag.text.strip() if temporadas_tag else None
-                    
-                    episodios_tag = serie.find('span', class_='last-ep')
-                    episodios = episodios_tag.text.strip() if episodios_tag else None
-                    
-                    # Extraer el enlace
-                    enlace_tag = serie.find('a', class_='absolute')
-                    enlace = enlace_tag['href'] if enlace_tag else None
+        datos_peliculas = []
+        
+        for pelicula in peliculas:
+            try:
+                # Extraer el enlace
+                enlace_tag = pelicula.find('a', class_='absolute')
+                enlace = enlace_tag['href'] if enlace_tag else None
                 
-                    # Extraer el título
-                    titulo_span = serie.find('span', class_='sr-only')
-                    titulo = titulo_span.text.strip() if titulo_span else None
+                # Extraer el título
+                titulo_span = pelicula.find('span', class_='sr-only')
+                titulo = titulo_span.text.strip() if titulo_span else None
                 
-                    # Extraer la imagen
-                    img_tag = serie.find('img')
-                    imagen = img_tag['src'] if img_tag else None
+                # Extraer la imagen
+                img_tag = pelicula.find('img')
+                imagen = img_tag['src'] if img_tag else None
                 
-                    # Extraer calidad y año
-                    calidad_tag = serie.find('span', class_='quality')
-                    calidad = calidad_tag.text.strip() if calidad_tag else None
+                # Extraer calidad y año
+                calidad_tag = pelicula.find('span', class_='quality')
+                calidad = calidad_tag.text.strip() if calidad_tag else None
                 
-                    año_tag = serie.find('span', class_='year')
-                    año = año_tag.text.strip() if año_tag else None
+                año_tag = pelicula.find('span', class_='year')
+                año = año_tag.text.strip() if año_tag else None
                 
-                    # Extraer descripción
-                    desc_tag = serie.find('p', class_='text-sm opacity-70')
-                    descripcion = desc_tag.text.strip() if desc_tag else None
+                # Extraer descripción
+                desc_tag = pelicula.find('p', class_='text-sm opacity-70')
+                descripcion = desc_tag.text.strip() if desc_tag else None
                 
-                    # Extraer géneros
-                    generos_container = serie.find('p', class_=['absolute', 'bottom-0'])
-                    generos = []
-                    if generos_container:
-                        generos_links = generos_container.find_all('a')
-                        generos = [g.text.strip() for g in generos_links]
+                # Extraer géneros
+                generos_container = pelicula.find('p', class_=['absolute', 'bottom-0'])
+                generos = []
+                if generos_container:
+                    generos_links = generos_container.find_all('a')
+                    generos = [g.text.strip() for g in generos_links]
                 
-                    serie_data = {
-                        'id': uuid.uuid4(),
-                        'tipo': tipo,
-                        'titulo': titulo,
-                        'enlace': enlace,
-                        'imagen': imagen,
-                        'temporadas': temporadas,
-                        'episodios': episodios,
-                        'calidad': calidad,
-                        'año': año,
-                        'descripcion': descripcion,
-                        'generos': generos if generos else []
-                    }
+                pelicula_data = {
+                    'id': str(uuid.uuid4()),
+                    'tipo': tipo,
+                    'titulo': titulo,
+                    'enlace': enlace,
+                    'imagen': imagen,
+                    'calidad': calidad,
+                    'año': año,
+                    'descripcion': descripcion,
+                    'generos': generos if generos else []
+                }
                 
-                    datos_series.append(serie_data)
+                datos_peliculas.append(pelicula_data)
                 
-                except Exception as e:
-                    print(f"Error al extraer serie: {e}")
-                    continue
+            except Exception as e:
+                log.warning(f"Error al extraer película: {e}")
+                continue
         
-            print(f"✓ {len(datos_series)} series extraídas de la página {pagina}")
-            return datos_series
+        return datos_peliculas
+    
+    def _parsear_series(self, html, tipo):
+        """Items de series de una página del listado"""
+        soup = sopa(html, 'listado')
+    
+        # Encontrar todos los artículos de series
+        series = soup.find_all('article', class_='tposty')
+    
+        datos_series = []
+    
+        for serie in series:
+            try:                    
+                # Extraer información de temporadas y episodios
+                temporadas_tag = serie.find('span', class_='last-s')
+                temporadas = temporadas_tag.text.strip() if temporadas_tag else None
+                
+                episodios_tag = serie.find('span', class_='last-ep')
+                episodios = episodios_tag.text.strip() if episodios_tag else None
+                
+                # Extraer el enlace
+                enlace_tag = serie.find('a', class_='absolute')
+                enlace = enlace_tag['href'] if enlace_tag else None
+            
+                # Extraer el título
+                titulo_span = serie.find('span', class_='sr-only')
+                titulo = titulo_span.text.strip() if titulo_span else None
+            
+                # Extraer la imagen
+                img_tag = serie.find('img')
+                imagen = img_tag['src'] if img_tag else None
+            
+                # Extraer calidad y año
+                calidad_tag = serie.find('span', class_='quality')
+                calidad = calidad_tag.text.strip() if calidad_tag else None
+            
+                año_tag = serie.find('span', class_='year')
+                año = año_tag.text.strip() if año_tag else None
+            
+                # Extraer descripción
+                desc_tag = serie.find('p', class_='text-sm opacity-70')
+                descripcion = desc_tag.text.strip() if desc_tag else None
+            
+                # Extraer géneros
+                generos_container = serie.find('p', class_=['absolute', 'bottom-0'])
+                generos = []
+                if generos_container:
+                    generos_links = generos_container.find_all('a')
+                    generos = [g.text.strip() for g in generos_links]
+            
+                serie_data = {
+                    'id': str(uuid.uuid4()),
+                    'tipo': tipo,
+                    'titulo': titulo,
+                    'enlace': enlace,
+                    'imagen': imagen,
+                    'temporadas': temporadas,
+                    'episodios': episodios,
+                    'calidad': calidad,
+                    'año': año,
+                    'descripcion': descripcion,
+                    'generos': generos if generos else []
+                }
+            
+                datos_series.append(serie_data)
+            
+            except Exception as e:
+                log.warning(f"Error al extraer serie: {e}")
+                continue
         
-        except Exception as e:
-            print(f"Error al hacer scraping: {e}")
-            return []
+        return datos_series
     
     def extraer_multiples_paginas(self, num_paginas=3, tipo='pelicula'):
         """
-        Extrae películas o series de múltiples páginas
+        Extrae películas o series de múltiples páginas en paralelo
         tipo: 'pelicula' o 'serie'
+        
+        Las páginas se descargan con hasta max_trabajadores hilos y el ritmo lo
+        pone el limitador por host. Los resultados quedan en orden de página y
+        sin repetir enlaces (un título puede aparecer en dos páginas si el
+        listado se movió durante la descarga).
         """
-        todos_items = []        
-        for pagina in range(1, num_paginas + 1):
-            print(f"\n{'='*60}")
-            print(f"Página {pagina} de {num_paginas} - {tipo_texto}")
-            print('='*60)
-
-            if tipo == 'serie':
-                items = self.extraer_series(pagina=pagina, tipo=tipo)
-            else:
-                items = self.extraer_peliculas(pagina=pagina, tipo=tipo)
-
-            todos_items.extend(items)
-            
-            # Pausa entre páginas para ser respetuoso
-            if pagina < num_paginas:
-                time.sleep(2)
+        extraer = self.extraer_series if tipo == 'serie' else self.extraer_peliculas
+        inicio = time.time()
+        
+        with ThreadPoolExecutor(max_workers=self.max_trabajadores) as ejecutor:
+            # map devuelve los resultados en el orden de las páginas
+            paginas = list(ejecutor.map(
+                lambda pagina: extraer(pagina=pagina, tipo=tipo),
+                range(1, num_paginas + 1)
+            ))
         
+        todos_items = []
+        enlaces = set()
+        for items in paginas:
+            for item in items:
+                enlace = item.get('enlace')
+                if enlace:
+                    if enlace in enlaces:
+                        continue
+                    enlaces.add(enlace)
+                todos_items.append(item)
+        
+        duplicados = sum(len(items) for items in paginas) - len(todos_items)
+        log.info(
+            f"✓ {num_paginas} páginas de {tipo} en {time.time() - inicio:.1f}s: "
+            f"{len(todos_items)} items ({duplicados} duplicados)",
+            extra={'paginas': num_paginas, 'items': len(todos_items), 'duplicados': duplicados}
+        )
         return todos_items
     
+    def extraer_incremental(self, conocidos, tipo='pelicula', max_conocidos_seguidos=20, max_paginas=None):
+        """
+        Recorre el listado desde la página 1 y se detiene al ver
+        max_conocidos_seguidos items seguidos que ya estaban, sin cambios,
+        en la corrida anterior ('conocidos': los items del snapshot previo).
+        Las páginas se piden de a max_trabajadores en paralelo.
+        
+        Devuelve un diccionario con:
+          items: el listado completo (lo recorrido más lo conocido que no se
+                 volvió a ver), con el id anterior para los items ya conocidos
+          nuevos / cambiados: los items que hay que mandar a extraer detalles
+          paginas: páginas descargadas
+        """
+        extraer = self.extraer_series if tipo == 'serie' else self.extraer_peliculas
+        if max_paginas is None:
+            max_paginas = self.obtener_numero_paginas(tipo)
+        inicio = time.time()
+        
+        anteriores = {item['enlace']: item for item in conocidos if item.get('enlace')}
+        items = []
+        nuevos = []
+        cambiados = []
+        vistos = set()
+        seguidos = 0
+        pagina = 1
+        
+        with ThreadPoolExecutor(max_workers=self.max_trabajadores) as ejecutor:
+            while pagina <= max_paginas and seguidos < max_conocidos_seguidos:
+                ventana = range(pagina, min(pagina + self.max_trabajadores, max_paginas + 1))
+                paginas = list(ejecutor.map(lambda numero: extraer(pagina=numero, tipo=tipo), ventana))
+                pagina = ventana.stop
+                
+                for item in (item for items_pagina in paginas for item in items_pagina):
+                    enlace = item.get('enlace')
+                    if enlace in vistos:
+                        continue
+                    if enlace:
+                        vistos.add(enlace)
+                    
+                    anterior = anteriores.get(enlace)
+                    if anterior is None:
+                        nuevos.append(item)
+                        seguidos = 0
+                    else:
+                        item['id'] = anterior.get('id', item['id'])
+                        if huella_listado(item) != huella_listado(anterior):
+                            cambiados.append(item)
+                            seguidos = 0
+                        else:
+                            seguidos += 1
+                    items.append(item)
+                    
+                    if seguidos >= max_conocidos_seguidos:
+                        break
+        
+        # Lo que no se volvió a recorrer se conserva tal como estaba
+        items.extend(item for item in conocidos if item.get('enlace') not in vistos)
+        
+        log.info(
+            f"✓ Incremental de {tipo}: {pagina - 1} páginas en {time.time() - inicio:.1f}s, "
+            f"{len(nuevos)} nuevos, {len(cambiados)} cambiados",
+            extra={'paginas': pagina - 1, 'nuevos': len(nuevos), 'cambiados': len(cambiados), 'items': len(items)}
+        )
+        return {'items': items, 'nuevos': nuevos, 'cambiados': cambiados, 'paginas': pagina - 1}
+    
+    def cargar_json(self, archivo):
+        """
+        Carga un listado guardado con guardar_json en ../database
+        ([] si no existe)
+        """
+        ruta_archivo = os.path.join(os.path.dirname(__file__), '../database', archivo)
+        try:
+            with open(ruta_archivo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            log.info(f"✓ {len(datos)} items conocidos cargados desde {ruta_archivo}")
+            return datos
+        except FileNotFoundError:
+            log.warning(f"No se encontró {ruta_archivo}, se recorrerá todo el listado")
+            return []
+    
     def guardar_json(self, datos, archivo='peliculas_cinecalidad.json'):
         """
         Guarda los datos en un archivo JSON en la carpeta ../database
         """
         if not datos:
-            print("No hay datos para guardar")
+            log.warning("No hay datos para guardar")
             return
         
         carpeta_destino = os.path.join(os.path.dirname(__file__), '../database')
@@ -220,7 +366,7 @@ class CinecalidadScraper:
         with open(ruta_archivo, 'w', encoding='utf-8') as f:
             json.dump(datos, f, ensure_ascii=False, indent=2)
 
-        print(f"✓ Datos guardados en '{ruta_archivo}'")
+        log.info(f"✓ Datos guardados en '{ruta_archivo}'")
     
     def mostrar_peliculas(self, datos, limite=5):
         """
@@ -261,21 +407,21 @@ class CinecalidadScraper:
         elif tipo == 'serie':
             url = f"{self.base_url}/serie/"
         else:
-            print("Tipo no válido. Usa 'peliculas' o 'series'")
+            log.warning("Tipo no válido. Usa 'peliculas' o 'series'")
             return 1
         
         try:
-            print(f"Obteniendo número de páginas de {tipo}...")
-            response = requests.get(url, headers=self.headers, timeout=15)
+            log.info(f"Obteniendo número de páginas de {tipo}...")
+            response = self.cliente.get(url, headers=self.headers, limitador=self.limitador)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = sopa(response.content, 'paginacion')
             
             # Buscar el contenedor de paginación
             nav_pagination = soup.find('nav', class_='navigation pagination')
             
             if not nav_pagination:
-                print("No se encontró paginación")
+                log.warning("No se encontró paginación")
                 return 1
             
             # Buscar todos los enlaces de página
@@ -291,18 +437,19 @@ class CinecalidadScraper:
             # El número más alto es el total de páginas
             if numeros_pagina:
                 total_paginas = max(numeros_pagina)
-                print(f"✓ Total de páginas encontradas: {total_paginas}")
+                log.info(f"✓ Total de páginas encontradas: {total_paginas}")
                 return total_paginas
             else:
-                print("No se encontraron números de página")
+                log.warning("No se encontraron números de página")
                 return 1
                 
         except Exception as e:
-            print(f"Error al obtener número de páginas: {e}")
+            log.error(f"Error al obtener número de páginas: {e}")
             return 1
 
 # Ejemplo de uso
 if __name__ == "__main__":
+    configurar_registro(formato='texto')
     scraper = CinecalidadScraper()
 
     print("🎬 SCRAPER DE CINECALIDAD")
@@ -319,9 +466,29 @@ if __name__ == "__main__":
     total_paginas = scraper.obtener_numero_paginas(tipo=tipo_texto)
 
     print("\n" + "=" * 80)
-    multiple = input("¿Deseas extraer de múltiples páginas? (s/n): ").strip().lower()
+    incremental = input("¿Modo incremental (solo hasta llegar a títulos ya conocidos)? (s/n): ").strip().lower()
+    multiple = 'n' if incremental == 's' else input("¿Deseas extraer de múltiples páginas? (s/n): ").strip().lower()
+
+    # --- MODO INCREMENTAL ---
+    if incremental == 's':
+        carpeta = os.path.join(os.path.dirname(__file__), '../database')
+        previos = sorted(
+            (f for f in os.listdir(carpeta) if f.startswith(f"{tipo_texto}s_") and f.endswith('.json')),
+            key=lambda f: os.path.getmtime(os.path.join(carpeta, f)),
+            reverse=True
+        ) if os.path.isdir(carpeta) else []
+        sugerido = previos[0] if previos else f"{tipo_texto}s_incremental.json"
+        archivo = input(f"Snapshot anterior en database/ [{sugerido}]: ").strip() or sugerido
+
+        conocidos = scraper.cargar_json(archivo)
+        resultado = scraper.extraer_incremental(conocidos, tipo=tipo_texto, max_paginas=total_paginas)
+
+        scraper.mostrar_peliculas(resultado['nuevos'] + resultado['cambiados'], limite=15)
+        scraper.guardar_json(resultado['items'], archivo)
+        print(f"\n📊 {len(resultado['nuevos'])} nuevas y {len(resultado['cambiados'])} cambiadas "
+              f"en {resultado['paginas']} páginas ({len(resultado['items'])} en total)")
 
-    if multiple == 's':
+    elif multiple == 's':
         try:
             num_paginas = int(input(f"¿Cuántas páginas quieres scrapear? (1-{total_paginas}): "))
             if not (1 <= num_paginas <= total_paginas):
@@ -347,4 +514,5 @@ if __name__ == "__main__":
         archivo = f"{tipo_texto}s_pagina_1.json"
         scraper.guardar_json(resultados, archivo)
 
-    print("\n✅ Scraping completado exitosamente!")
\ No newline at end of file
+    print("\n✅ Scraping completado exitosamente!")
+    scraper.cliente.registrar_estadisticas()
\ No newline at end of file
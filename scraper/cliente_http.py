@@ -0,0 +1,259 @@
+import email.utils
+import glob
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import parseo
+from cache_http import CacheHTTP
+
+log = logging.getLogger('scraper.http')
+
+# Respuestas que vale la pena reintentar
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+def _huella_codigo_scrapers():
+    """
+    Huella del código de los scrapers: cualquier cambio en un parser (o en
+    parseo.py) invalida los parseos guardados en el cache
+    """
+    huella = hashlib.sha256()
+    for archivo in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(archivo, 'rb') as f:
+            huella.update(f.read())
+    return huella.hexdigest()[:12]
+
+
+CODIGO_SCRAPERS = _huella_codigo_scrapers()
+
+
+def leer_retry_after(valor):
+    """Segundos indicados por Retry-After (número o fecha HTTP) o None"""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        fecha = email.utils.parsedate_to_datetime(valor)
+        return max(0.0, fecha.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def respuesta_desde_cache(url, entrada, origen):
+    """
+    Arma un requests.Response 200 con una entrada de CacheHTTP.
+    'desde_cache' indica si fue 'fresca' (sin red) o 'revalidada' (304).
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.url = url
+    response.headers = CaseInsensitiveDict(entrada['cabeceras'])
+    response._content = entrada['contenido']
+    response.desde_cache = origen
+    response.huella = entrada['huella']
+    return response
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP compartido por los scrapers: una sesión con pool de
+    conexiones por host, timeouts de conexión y lectura separados, y
+    reintentos con backoff exponencial con jitter ante errores de red,
+    429 y 5xx (respetando Retry-After). Lleva estadísticas por host de
+    peticiones, conexiones nuevas y reutilizadas.
+
+    Con 'cache' (un CacheHTTP) los GET se guardan en disco: dentro del TTL
+    de su clase de URL se responden sin red y después se revalidan con
+    If-None-Match / If-Modified-Since. Las respuestas traen 'desde_cache'
+    (None, 'fresca' o 'revalidada') y 'huella' del contenido.
+    """
+
+    def __init__(self, tamaño_pool=20, timeout=(3.05, 15), reintentos=3,
+                 backoff=0.5, backoff_max=30, cache=None):
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.cache = cache
+
+        self.sesion = requests.Session()
+        self._adaptador = HTTPAdapter(pool_connections=tamaño_pool, pool_maxsize=tamaño_pool, max_retries=0)
+        self.sesion.mount('http://', self._adaptador)
+        self.sesion.mount('https://', self._adaptador)
+
+        self._estadisticas = {}
+        self._lock = threading.Lock()
+
+    def _espera(self, intento, response=None):
+        """Segundos antes del siguiente intento"""
+        if response is not None:
+            retry_after = leer_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        # Backoff exponencial con jitter completo para no sincronizar reintentos
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** intento))
+
+    def _conexiones_abiertas(self, url):
+        """Conexiones creadas hasta ahora por los pools del host"""
+        destino = urlparse(url)
+        pools = self._adaptador.poolmanager.pools
+        total = 0
+        # requests agrega opciones TLS a la clave del pool, así que se buscan por host
+        for clave in pools.keys():
+            if clave.key_scheme == destino.scheme and clave.key_host == destino.hostname:
+                pool = pools.get(clave)
+                total += pool.num_connections if pool is not None else 0
+        return total
+
+    def _anotar(self, host, campo, cantidad=1):
+        with self._lock:
+            estadisticas = self._estadisticas.setdefault(host, {
+                'peticiones': 0, 'conexiones_nuevas': 0, 'reutilizadas': 0,
+                'reintentos': 0, 'errores': 0, 'cache_frescas': 0, 'cache_revalidadas': 0
+            })
+            estadisticas[campo] += cantidad
+
+    def request(self, metodo, url, limitador=None, **kwargs):
+        """
+        Hace la petición con reintentos. Devuelve la última respuesta aunque
+        sea un error HTTP (el llamador decide con raise_for_status) y lanza
+        la excepción de red si fallaron todos los intentos.
+        'limitador' (un LimitadorPorHost) se respeta antes de cada intento.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc
+
+        for intento in range(self.reintentos + 1):
+            if limitador is not None:
+                limitador.esperar(url)
+            antes = self._conexiones_abiertas(url)
+            try:
+                response = self.sesion.request(metodo, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._anotar(host, 'errores')
+                if intento == self.reintentos:
+                    raise
+                espera = self._espera(intento)
+                log.warning(f"⚠️ {url}: {e.__class__.__name__}, reintento en {espera:.1f}s")
+            else:
+                self._anotar(host, 'peticiones')
+                # Con hilos concurrentes la atribución a cada petición es aproximada
+                nuevas = self._conexiones_abiertas(url) - antes
+                self._anotar(host, 'conexiones_nuevas' if nuevas > 0 else 'reutilizadas')
+
+                if response.status_code not in CODIGOS_REINTENTABLES or intento == self.reintentos:
+                    return response
+                espera = self._espera(intento, response)
+                log.warning(f"⚠️ {url}: HTTP {response.status_code}, reintento en {espera:.1f}s")
+                response.close()
+
+            self._anotar(host, 'reintentos')
+            time.sleep(espera)
+
+    def get(self, url, limitador=None, **kwargs):
+        """
+        GET con el cache. 'limitador' solo se aplica si la petición va a la
+        red: una respuesta fresca del cache no espera turno.
+        """
+        # Las redirecciones que se siguen a mano (/r.php) no se guardan
+        if self.cache is None or kwargs.get('allow_redirects') is False:
+            response = self.request('GET', url, limitador=limitador, **kwargs)
+            response.desde_cache = None
+            response.huella = None
+            return response
+
+        host = urlparse(url).netloc
+        entrada = self.cache.buscar(url)
+        if entrada is not None:
+            if entrada['fresca']:
+                self._anotar(host, 'cache_frescas')
+                return respuesta_desde_cache(url, entrada, 'fresca')
+
+            headers = dict(kwargs.get('headers') or {})
+            if 'ETag' in entrada['cabeceras']:
+                headers['If-None-Match'] = entrada['cabeceras']['ETag']
+            if 'Last-Modified' in entrada['cabeceras']:
+                headers['If-Modified-Since'] = entrada['cabeceras']['Last-Modified']
+            kwargs['headers'] = headers
+
+        response = self.request('GET', url, limitador=limitador, **kwargs)
+        if response.status_code == 304 and entrada is not None:
+            self.cache.revalidada(url)
+            self._anotar(host, 'cache_revalidadas')
+            return respuesta_desde_cache(url, entrada, 'revalidada')
+
+        response.desde_cache = None
+        response.huella = None
+        if response.status_code == 200:
+            response.huella = self.cache.guardar(url, response.content, response.headers)
+        return response
+
+    def fresca(self, url):
+        """Si un GET a la URL se respondería desde el cache sin ir a la red"""
+        return self.cache is not None and self.cache.fresca(url)
+
+    def parseado(self, response, nombre, parsear):
+        """
+        parsear() o, si este mismo contenido ya se parseó antes con ese
+        nombre y el mismo código, el resultado guardado en el cache (sin
+        volver a parsear)
+        """
+        if self.cache is None:
+            return parsear()
+        # El parser y los filtros en uso también cambian el resultado
+        version = f'{CODIGO_SCRAPERS}-{parseo.PARSER}-{int(parseo.FILTRAR)}'
+        return self.cache.derivado(getattr(response, 'huella', None), nombre, parsear, version=version)
+
+    def estadisticas(self):
+        """Copia de las estadísticas por host"""
+        with self._lock:
+            return {host: dict(datos) for host, datos in self._estadisticas.items()}
+
+    def registrar_estadisticas(self):
+        """Escribe en el log un resumen por host (al terminar un proceso largo)"""
+        for host, datos in self.estadisticas().items():
+            total = datos['conexiones_nuevas'] + datos['reutilizadas']
+            reuso = datos['reutilizadas'] / total * 100 if total else 0
+            log.info(
+                f"🌐 {host}: {datos['peticiones']} peticiones, {reuso:.0f}% conexiones reutilizadas, "
+                f"{datos['reintentos']} reintentos, {datos['cache_frescas']} desde cache, "
+                f"{datos['cache_revalidadas']} revalidadas",
+                extra={'host': host, **datos}
+            )
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+# Cache de respuestas del cliente compartido ('' lo desactiva)
+CACHE_HTTP = os.getenv(
+    'CACHE_HTTP', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'http.sqlite3')
+)
+CACHE_HTTP_MAX_MB = int(os.getenv('CACHE_HTTP_MAX_MB', 200))
+
+
+def cliente_compartido():
+    """Cliente único del proceso, para que todos los scrapers compartan el pool y el cache"""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            cache = None
+            if CACHE_HTTP:
+                os.makedirs(os.path.dirname(CACHE_HTTP), exist_ok=True)
+                cache = CacheHTTP(CACHE_HTTP, tamaño_max=CACHE_HTTP_MAX_MB * 1024 * 1024)
+            _cliente = ClienteHTTP(cache=cache)
+        return _cliente
@@ -0,0 +1,57 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class CuboTokens:
+    """
+    Limitador de tasa tipo token bucket: se recargan 'tasa' tokens por
+    segundo hasta un máximo de 'rafaga'. Cada petición consume un token y
+    espera solo lo necesario hasta que haya uno disponible.
+    """
+
+    def __init__(self, tasa, rafaga=1):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._tokens = rafaga
+        self._ultima = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reservar(self):
+        """Consume un token sin bloquear y devuelve cuántos segundos hay que esperar por él"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultima) * self.tasa)
+            self._ultima = ahora
+            # Los tokens pueden quedar negativos: es la cola de los que ya esperan
+            self._tokens -= 1
+            return 0 if self._tokens >= 0 else -self._tokens / self.tasa
+
+    def esperar(self):
+        espera = self.reservar()
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+
+class LimitadorPorHost:
+    """Un CuboTokens por host, creado la primera vez que se pide a ese host"""
+
+    def __init__(self, tasa, rafaga=1):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._cubos = {}
+        self._lock = threading.Lock()
+
+    def cubo(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            cubo = self._cubos.get(host)
+            if cubo is None:
+                cubo = CuboTokens(self.tasa, self.rafaga)
+                self._cubos[host] = cubo
+            return cubo
+
+    def esperar(self, url):
+        """Bloquea hasta que se pueda hacer una petición a el host de la URL"""
+        return self.cubo(url).esperar()
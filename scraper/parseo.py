@@ -0,0 +1,50 @@
+import os
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def _parser_por_defecto():
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+# lxml (en C) si está instalado; SCRAPER_PARSER=html.parser vuelve al parser de antes
+PARSER = os.getenv('SCRAPER_PARSER') or _parser_por_defecto()
+
+# Con FILTRAR las páginas que solo se usan para una cosa se parsean
+# parcialmente: del árbol quedan los elementos del filtro y su contenido
+FILTRAR = os.getenv('SCRAPER_FILTRAR', '1') == '1'
+
+
+def _clase(nombre):
+    """
+    Patrón para SoupStrainer: mientras se parsea, 'class' todavía es el
+    texto completo del atributo ("tposty relative group"), no una lista
+    """
+    return re.compile(rf'(^|\s){re.escape(nombre)}(\s|$)')
+
+
+FILTROS = {
+    # Items de un listado de películas o series
+    'listado': SoupStrainer('article', class_=_clase('tposty')),
+    # Paginación del listado
+    'paginacion': SoupStrainer('nav', class_=_clase('pagination')),
+    # Página de un episodio o de /r.php: solo interesan los iframes
+    'iframes': SoupStrainer('iframe'),
+    # Página del player: los botones de servidor
+    'servidores': SoupStrainer('li', onclick=True)
+}
+
+
+def sopa(html, solo=None):
+    """
+    BeautifulSoup del HTML con PARSER. 'solo' es una clave de FILTROS para
+    construir únicamente esa parte del árbol; las páginas de detalle, de
+    las que se sacan muchas cosas, se parsean completas.
+    """
+    filtro = FILTROS[solo] if solo and FILTRAR else None
+    return BeautifulSoup(html, PARSER, parse_only=filtro)
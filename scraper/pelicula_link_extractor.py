@@ -1,14 +1,29 @@
-import requests
-from bs4 import BeautifulSoup
 import json
+import logging
 import os
+import sys
 import time
+import uuid
 from urllib.parse import urljoin, urlparse
 import base64
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from registro import configurar_registro
+from cliente_http import cliente_compartido
+from parseo import sopa
+from pipeline_peliculas import PipelinePeliculas
+
+log = logging.getLogger('scraper.peliculas')
+
+# Campos del listado que, si cambian, obligan a volver a extraer una película
+# ya procesada. Solo sirven los que también guarda armar_resultado: la calidad
+# del listado no está en los resultados y no se puede comparar
+CAMPOS_CAMBIO = ('año',)
+
 class AdvancedLinksExtractor:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, cliente=None):
+        # Cliente HTTP con pool y reintentos (por defecto el compartido del proceso)
+        self.cliente = cliente or cliente_compartido()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -23,10 +38,10 @@ class AdvancedLinksExtractor:
         try:
             with open(archivo_json, 'r', encoding='utf-8') as f:
                 peliculas = json.load(f)
-            print(f"✓ {len(peliculas)} películas cargadas desde {archivo_json}")
+            log.info(f"✓ {len(peliculas)} películas cargadas desde {archivo_json}")
             return peliculas
         except FileNotFoundError:
-            print(f"❌ Error: No se encontró el archivo {archivo_json}")
+            log.error(f"❌ Error: No se encontró el archivo {archivo_json}")
             return []
     
     def extraer_player_url(self, soup):
@@ -39,7 +54,7 @@ class AdvancedLinksExtractor:
             iframes = soup.find_all('iframe', class_='absolute inset-0 w-full h-full')
             
             if not iframes:
-                print("  ⚠️ No se encontraron iframes con las clases especificadas")
+                log.warning("⚠️ No se encontraron iframes con las clases especificadas")
                 return None
             
             # Filtrar iframes que NO sean de YouTube
@@ -49,14 +64,14 @@ class AdvancedLinksExtractor:
                     
                     # Excluir iframes de YouTube (trailers)
                     if 'youtube.com' not in src.lower() and 'youtu.be' not in src.lower():
-                        print(f"  ✓ Player URL encontrada: {src}")
+                        log.info(f"✓ Player URL encontrada: {src}")
                         return src
             
-            print("  ⚠️ No se encontró iframe válido (solo trailers de YouTube)")
+            log.warning("⚠️ No se encontró iframe válido (solo trailers de YouTube)")
             return None
                 
         except Exception as e:
-            print(f"  ❌ Error extrayendo player URL: {e}")
+            log.error(f"❌ Error extrayendo player URL: {e}")
             return None
     
     def extraer_servidores_video(self, player_url, referer_url):
@@ -68,11 +83,26 @@ class AdvancedLinksExtractor:
             headers_player = self.headers.copy()
             headers_player['Referer'] = referer_url
             
-            print(f"  → Accediendo al player...")
-            response = self.session.get(player_url, headers=headers_player, timeout=15)
+            log.debug(f"→ Accediendo al player...")
+            response = self.cliente.get(player_url, headers=headers_player)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Si el player no cambió desde la última vez no se vuelve a parsear
+            return self.cliente.parseado(
+                response, f'servidores {urlparse(player_url).netloc}',
+                lambda: self.parsear_servidores(player_url, response.content)
+            )
+            
+        except Exception as e:
+            log.error(f"❌ Error accediendo al player: {e}")
+            return []
+    
+    def parsear_servidores(self, player_url, html):
+        """
+        Extrae los servidores de video del HTML de la página del player
+        """
+        try:
+            soup = sopa(html, 'servidores')
             
             servidores = []
             
@@ -114,14 +144,14 @@ class AdvancedLinksExtractor:
                             servidores.append(servidor_info)
                             
                 except Exception as e:
-                    print(f"    Error extrayendo servidor: {e}")
+                    log.warning(f"Error extrayendo servidor: {e}")
                     continue
             
-            print(f"  ✓ {len(servidores)} servidores encontrados")
+            log.info(f"✓ {len(servidores)} servidores encontrados")
             return servidores
             
         except Exception as e:
-            print(f"  ❌ Error accediendo al player: {e}")
+            log.error(f"❌ Error leyendo el player: {e}")
             return []
     
     def obtener_url_final_video(self, redirect_url, referer_url):
@@ -133,10 +163,9 @@ class AdvancedLinksExtractor:
             headers_redirect['Referer'] = referer_url
             
             # Hacer petición pero NO seguir redirects automáticamente
-            response = self.session.get(
+            response = self.cliente.get(
                 redirect_url, 
                 headers=headers_redirect, 
-                timeout=15,
                 allow_redirects=False
             )
             
@@ -146,7 +175,7 @@ class AdvancedLinksExtractor:
                 return url_final
             
             # Si no hay redirección, intentar extraer del HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = sopa(response.content, 'iframes')
             iframe = soup.find('iframe')
             if iframe and 'src' in iframe.attrs:
                 return iframe['src']
@@ -154,7 +183,7 @@ class AdvancedLinksExtractor:
             return None
             
         except Exception as e:
-            print(f"    Error obteniendo URL final: {e}")
+            log.warning(f"Error obteniendo URL final: {e}")
             return None
     
     def _extraer_info_pelicula(self, soup):
@@ -222,10 +251,10 @@ class AdvancedLinksExtractor:
                         actores = td.find_all('span', class_='por')
                         info['actores'] = [a.text.strip() for a in actores] if actores else [valor]
 
-            print(f"✓ Información básica extraída: {info.get('titulo', 'Sin título')}")
+            log.info(f"✓ Información básica extraída: {info.get('titulo', 'Sin título')}")
 
         except Exception as e:
-            print(f"❌ Error al extraer información básica de película: {e}")
+            log.error(f"❌ Error al extraer información básica de película: {e}")
 
         return info
 
@@ -237,13 +266,30 @@ class AdvancedLinksExtractor:
         url_pelicula = pelicula.get('enlace') or pelicula.get('url_pelicula')
         
         if not url_pelicula:
-            print(f"  ⚠️ {titulo}: No tiene URL")
+            log.warning(f"⚠️ {titulo}: No tiene URL")
             return None
         
-        response = self.session.get(url_pelicula, headers=self.headers, timeout=15)
+        response = self.cliente.get(url_pelicula, headers=self.headers)
         response.raise_for_status()
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
+        
+        # 1 y 2. Info básica y URL del player
+        resultado = self.armar_resultado(pelicula, url_pelicula, response.content)
+        if not resultado.get('player_url'):
+            return resultado
+        
+        # 3. Extraer servidores del player
+        servidores = self.extraer_servidores_video(resultado['player_url'], url_pelicula)
+                
+        resultado['servidores'] = servidores
+        
+        return resultado
+    
+    def armar_resultado(self, pelicula, url_pelicula, html):
+        """
+        Arma el registro de una película a partir del HTML de su página,
+        con los servidores todavía vacíos. Incluye 'player_url' si la hay.
+        """
+        soup = sopa(html)
 
         # 1. Extraer info básica
         info_basica = self._extraer_info_pelicula(soup)
@@ -257,15 +303,8 @@ class AdvancedLinksExtractor:
         
         # 2. Extraer URL del player
         player_url = self.extraer_player_url(soup)
-        if not player_url:
-            return resultado
-        
-        resultado['player_url'] = player_url
-        
-        # 3. Extraer servidores del player
-        servidores = self.extraer_servidores_video(player_url, url_pelicula)
-                
-        resultado['servidores'] = servidores
+        if player_url:
+            resultado['player_url'] = player_url
         
         return resultado
     
@@ -278,29 +317,29 @@ class AdvancedLinksExtractor:
         
         # Si no tiene URL, buscarla en database
         if not url_pelicula and peliculas_database:
-            print(f"  🔍 Buscando URL en database para: {titulo}")
+            log.info(f"🔍 Buscando URL en database para: {titulo}")
             for p_db in peliculas_database:
                 if p_db.get('titulo') == titulo:
                     url_pelicula = p_db.get('enlace')
                     if url_pelicula:
-                        print(f"  ✓ URL encontrada en database")
+                        log.info(f"✓ URL encontrada en database")
                         pelicula['url_pelicula'] = url_pelicula
                     break
         
         if not url_pelicula:
-            print(f"  ⚠️ {titulo}: No tiene URL ni en cache ni en database")
+            log.warning(f"⚠️ {titulo}: No tiene URL ni en cache ni en database")
             return pelicula
         
         try:
-            response = self.session.get(url_pelicula, headers=self.headers, timeout=15)
+            response = self.cliente.get(url_pelicula, headers=self.headers)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = sopa(response.content, 'iframes')
             
             # Extraer URL del player
             player_url = self.extraer_player_url(soup)
             if not player_url:
-                print(f"  ⚠️ No se encontró player URL")
+                log.warning(f"⚠️ No se encontró player URL")
                 return pelicula
             
             # Actualizar player_url
@@ -313,14 +352,14 @@ class AdvancedLinksExtractor:
             pelicula['servidores'] = servidores
             
             if servidores:
-                print(f"  ✅ {len(servidores)} servidores actualizados")
+                log.info(f"✅ {len(servidores)} servidores actualizados")
             else:
-                print(f"  ⚠️ No se encontraron servidores")
+                log.warning(f"⚠️ No se encontraron servidores")
             
             return pelicula
             
         except Exception as e:
-            print(f"  ❌ Error actualizando: {e}")
+            log.error(f"❌ Error actualizando: {e}")
             return pelicula
     
     def recuperar_servidores_faltantes(self, archivo_cache, archivo_database, delay=5):
@@ -336,7 +375,7 @@ class AdvancedLinksExtractor:
         # Cargar database si se proporciona
         peliculas_database = None
         if archivo_database:
-            print(f"\n📥 Cargando database para buscar URLs faltantes...")
+            log.info(f"📥 Cargando database para buscar URLs faltantes...")
             peliculas_database = self.cargar_peliculas_json(archivo_database)
         
         # Filtrar películas sin servidores o con player_url de YouTube
@@ -352,15 +391,13 @@ class AdvancedLinksExtractor:
         total = len(peliculas_sin_servidores)
         
         if total == 0:
-            print("✅ Todas las películas ya tienen servidores!")
+            log.info("✅ Todas las películas ya tienen servidores!")
             return peliculas
         
-        print(f"\n{'='*80}")
-        print(f"🔄 Recuperando servidores de {total} películas...")
-        print('='*80)
+        log.info(f"🔄 Recuperando servidores de {total} películas...")
         
         for i, pelicula in enumerate(peliculas_sin_servidores, 1):
-            print(f"\n[{i}/{total}] {pelicula.get('titulo', 'Sin título')}")
+            log.info(f"[{i}/{total}] {pelicula.get('titulo', 'Sin título')}")
             
             # Actualizar la película
             pelicula_actualizada = self.actualizar_servidores_pelicula(pelicula, peliculas_database)
@@ -394,10 +431,10 @@ class AdvancedLinksExtractor:
         # Cargar database si se proporciona
         peliculas_database = None
         if archivo_database:
-            print(f"\n📥 Cargando database para buscar años faltantes...")
+            log.info(f"📥 Cargando database para buscar años faltantes...")
             peliculas_database = self.cargar_peliculas_json(archivo_database)
         else:
-            print("❌ Se requiere archivo database para actualizar años")
+            log.error("❌ Se requiere archivo database para actualizar años")
             return peliculas
         
         # Filtrar películas sin año
@@ -412,19 +449,17 @@ class AdvancedLinksExtractor:
         total = len(peliculas_sin_año)
         
         if total == 0:
-            print("✅ Todas las películas ya tienen año!")
+            log.info("✅ Todas las películas ya tienen año!")
             return peliculas
         
-        print(f"\n{'='*80}")
-        print(f"🔄 Actualizando años de {total} películas...")
-        print('='*80)
+        log.info(f"🔄 Actualizando años de {total} películas...")
         
         actualizadas = 0
         no_encontradas = 0
         
         for i, pelicula in enumerate(peliculas_sin_año, 1):
             titulo = pelicula.get('titulo', 'Sin título')
-            print(f"\n[{i}/{total}] {titulo}")
+            log.info(f"[{i}/{total}] {titulo}")
             
             # Buscar año en database
             año_encontrado = None
@@ -438,10 +473,10 @@ class AdvancedLinksExtractor:
                 if p.get('titulo') == titulo:
                     if año_encontrado:
                         peliculas[j]['año'] = año_encontrado
-                        print(f"   ✅ Año actualizado: {año_encontrado}")
+                        log.info(f"✅ Año actualizado: {año_encontrado}")
                         actualizadas += 1
                     else:
-                        print(f"   ⚠️  Año no encontrado en database")
+                        log.warning(f"⚠️  Año no encontrado en database")
                         no_encontradas += 1
                     break
             
@@ -450,11 +485,10 @@ class AdvancedLinksExtractor:
                 time.sleep(delay)
         
         # Resumen
-        print(f"\n{'='*80}")
-        print(f"📊 Resumen de actualización de años:")
-        print(f"   ✅ Actualizadas: {actualizadas}")
-        print(f"   ⚠️  No encontradas: {no_encontradas}")
-        print('='*80)
+        log.info(
+            f"📊 Resumen de actualización de años: ✅ {actualizadas} actualizadas, ⚠️ {no_encontradas} no encontradas",
+            extra={'actualizadas': actualizadas, 'no_encontradas': no_encontradas}
+        )
         
         # Guardar resultados actualizados
         self.guardar_resultados(peliculas, prefijo='peliculas_actualizados')
@@ -474,23 +508,22 @@ class AdvancedLinksExtractor:
         resultados = []
         total = len(peliculas)
         
-        print(f"\n{'='*80}")
-        print(f"Procesando {total} películas...")
-        print('='*80)
+        log.info(f"Procesando {total} películas...")
         
         for i, pelicula in enumerate(peliculas, 1):
-            print(f"\n[{i}/{total}] {pelicula.get('titulo', 'Sin título')}")
+            log.info(f"[{i}/{total}] {pelicula.get('titulo', 'Sin título')}")
             
             resultado = self.procesar_pelicula(pelicula)
-            resultado["id"] = i
             
             if resultado:
+                resultado["id"] = i
+                
                 # Mostrar servidores encontrados
                 if resultado.get('servidores'):
                     for servidor in resultado['servidores']:
-                        print(f"    ✓ {servidor['nombre']} - {servidor['descripcion']}")
+                        log.debug(f"✓ {servidor['nombre']} - {servidor['descripcion']}")
                 else:
-                    print("    ⚠️ No se encontraron servidores")
+                    log.warning("⚠️ No se encontraron servidores")
                 
                 resultados.append(resultado)
             
@@ -500,12 +533,103 @@ class AdvancedLinksExtractor:
         
         return resultados
     
+    def procesar_peliculas_concurrente(self, archivo_json, limite=None, **opciones):
+        """
+        Igual que procesar_peliculas pero con el pipeline asyncio por etapas:
+        sin pausas fijas, limitado por concurrencia y tasa por host.
+        opciones: argumentos de PipelinePeliculas (trabajadores, max_por_host, ...)
+        """
+        peliculas = self.cargar_peliculas_json(archivo_json)
+        
+        if not peliculas:
+            return []
+        
+        if limite:
+            peliculas = peliculas[:limite]
+        
+        log.info(f"Procesando {len(peliculas)} películas (pipeline concurrente)...")
+        return PipelinePeliculas(self, **opciones).procesar(peliculas)
+    
+    def procesar_peliculas_incremental(self, archivo_json, archivo_previo, limite=None, **opciones):
+        """
+        Procesa solo las películas del listado que son nuevas o cambiaron
+        respecto de los resultados anteriores (archivo_previo, en el formato
+        de guardar_resultados) y reutiliza el resto tal como estaba.
+        
+        Una película se vuelve a extraer si no estaba, si no tenía servidores
+        o si cambió alguno de CAMPOS_CAMBIO en el listado. Se empareja por
+        url_pelicula y, para resultados viejos sin ella, por título y año
+        (nunca por el título solo: los remakes se llaman igual). Los
+        resultados reutilizados conservan su id; las nuevas reciben uno nuevo
+        y tienen la misma forma que las de procesar_peliculas.
+        Devuelve todos los resultados: los del listado en su orden y después
+        los anteriores que ya no aparecen en él.
+        """
+        peliculas = self.cargar_peliculas_json(archivo_json)
+        if not peliculas:
+            return []
+        previos = self.cargar_peliculas_json(archivo_previo)
+        
+        # Los resultados viejos pueden no tener url_pelicula: se buscan también
+        # por título y año, y solo si ambos están
+        por_url = {p['url_pelicula']: p for p in previos if p.get('url_pelicula')}
+        por_titulo = {
+            (p['titulo'], str(p['año'])): p
+            for p in previos if p.get('titulo') and p.get('año') and not p.get('url_pelicula')
+        }
+        
+        pendientes = []
+        anteriores = {}
+        for indice, pelicula in enumerate(peliculas):
+            url_pelicula = pelicula.get('enlace') or pelicula.get('url_pelicula')
+            previo = por_url.get(url_pelicula)
+            if previo is None and pelicula.get('titulo') and pelicula.get('año'):
+                previo = por_titulo.get((pelicula['titulo'], str(pelicula['año'])))
+            if previo is not None:
+                anteriores[indice] = previo
+            
+            cambio = previo is not None and any(
+                campo in previo and pelicula.get(campo) != previo.get(campo) for campo in CAMPOS_CAMBIO
+            )
+            if previo is None or not previo.get('servidores') or cambio:
+                pendientes.append(indice)
+        
+        if limite:
+            pendientes = pendientes[:limite]
+        
+        log.info(
+            f"Procesando {len(pendientes)} de {len(peliculas)} películas (nuevas o cambiadas)...",
+            extra={'pendientes': len(pendientes), 'total': len(peliculas)}
+        )
+        procesadas = {}
+        if pendientes:
+            resultados = PipelinePeliculas(self, **opciones).procesar([peliculas[i] for i in pendientes])
+            # El pipeline numera los resultados por su posición en la lista que recibió
+            for resultado in resultados:
+                indice = pendientes[resultado['id'] - 1]
+                previo = anteriores.get(indice)
+                resultado['id'] = previo['id'] if previo is not None and 'id' in previo else str(uuid.uuid4())
+                procesadas[indice] = resultado
+        
+        resultados = []
+        usados = set()
+        for indice in range(len(peliculas)):
+            resultado = procesadas.get(indice) or anteriores.get(indice)
+            if resultado is not None and id(resultado) not in usados:
+                usados.add(id(resultado))
+                resultados.append(resultado)
+        # Los que ya no están en el listado se conservan
+        usados.update(id(p) for p in anteriores.values())
+        resultados.extend(p for p in previos if id(p) not in usados)
+        
+        return resultados
+    
     def guardar_resultados(self, resultados, prefijo='peliculas'):
         """
         Guarda resultados únicamente en un archivo JSON
         """
         if not resultados:
-            print("No hay resultados para guardar")
+            log.warning("No hay resultados para guardar")
             return
 
         carpeta_destino = os.path.join(os.path.dirname(__file__), '../cache')
@@ -516,7 +640,7 @@ class AdvancedLinksExtractor:
         with open(ruta_archivo, 'w', encoding='utf-8') as f:
             json.dump(resultados, f, ensure_ascii=False, indent=2)
 
-        print(f"\n✓ JSON guardado: {ruta_archivo}")
+        log.info(f"✓ JSON guardado: {ruta_archivo}")
 
     def seleccionar_archivo_json(self, carpeta='database'):
         """
@@ -584,6 +708,7 @@ class AdvancedLinksExtractor:
 
 # Ejemplo de uso
 if __name__ == "__main__":
+    configurar_registro(formato='texto')
     extractor = AdvancedLinksExtractor()
     
     print("🎬 EXTRACTOR AVANZADO DE ENLACES DE VIDEO")
@@ -653,6 +778,12 @@ if __name__ == "__main__":
         if not archivo_database:
             exit(1)
         
+        # Con resultados anteriores se puede procesar solo lo nuevo
+        archivo_previo = os.path.join(os.path.dirname(__file__), '../cache/peliculas.json')
+        incremental = os.path.exists(archivo_previo) and input(
+            "\n¿Procesar solo películas nuevas o cambiadas respecto de cache/peliculas.json? (s/n): "
+        ).strip().lower() == 's'
+        
         # Preguntar cuántas procesar
         print("\n¿Cuántas películas procesar?")
         print("  1. Solo 3 (prueba rápida)")
@@ -670,11 +801,17 @@ if __name__ == "__main__":
             print("\n⚙️ Procesando TODAS las películas (esto puede tardar)...")
         
         # Procesar
-        resultados = extractor.procesar_peliculas(
-            archivo_json=archivo_database,
-            limite=limite,
-            delay=5
-        )
+        if incremental:
+            resultados = extractor.procesar_peliculas_incremental(
+                archivo_json=archivo_database,
+                archivo_previo=archivo_previo,
+                limite=limite
+            )
+        else:
+            resultados = extractor.procesar_peliculas_concurrente(
+                archivo_json=archivo_database,
+                limite=limite
+            )
         
         if resultados:
             print(f"\n{'='*80}")
@@ -693,4 +830,6 @@ if __name__ == "__main__":
             # Guardar
             extractor.guardar_resultados(resultados)
         else:
-            print("\n❌ No se procesó ninguna película")
\ No newline at end of file
+            print("\n❌ No se procesó ninguna película")
+
+    extractor.cliente.registrar_estadisticas()
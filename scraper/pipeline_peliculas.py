@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from limitador import CuboTokens, LimitadorPorHost
+
+log = logging.getLogger('scraper.pipeline')
+
+# Hilos por etapa por defecto
+TRABAJADORES = {
+    'pagina': 4,       # descarga de la página de la película
+    'info': 2,         # parseo de la página (info básica y player)
+    'player': 4,       # descarga del player
+    'servidores': 2    # parseo de los servidores
+}
+
+
+class PipelinePeliculas:
+    """
+    Motor asyncio para procesar muchas películas con AdvancedLinksExtractor.
+
+    Cuatro etapas conectadas por colas acotadas (página -> info -> player ->
+    servidores), cada una con su cantidad de trabajadores. Las descargas
+    respetan un límite de concurrencia por host, una tasa por host y una
+    tasa global (token bucket) en lugar de pausas fijas. Las peticiones y
+    el parseo corren en hilos (el cliente HTTP compartido es síncrono), así
+    que se reutilizan los reintentos y el pool de conexiones.
+
+    Produce los mismos registros que procesar_pelicula, en el orden de entrada.
+    """
+
+    def __init__(self, extractor, trabajadores=None, max_por_host=4,
+                 peticiones_por_segundo=5.0, peticiones_por_segundo_host=2.0, tamaño_cola=8):
+        self.extractor = extractor
+        self.trabajadores = {**TRABAJADORES, **(trabajadores or {})}
+        self.max_por_host = max_por_host
+        self.tamaño_cola = tamaño_cola
+        self._tasa_global = peticiones_por_segundo
+        self._limitador_host = LimitadorPorHost(peticiones_por_segundo_host, rafaga=max_por_host)
+
+    # ==================== DESCARGAS ====================
+
+    async def _descargar(self, url, headers):
+        """GET con los límites de concurrencia y tasa; devuelve la respuesta"""
+        host = urlparse(url).netloc
+        semaforo = self._semaforos.get(host)
+        if semaforo is None:
+            semaforo = self._semaforos[host] = asyncio.Semaphore(self.max_por_host)
+
+        async with semaforo:
+            # Una respuesta fresca del cache no va a la red: no consume tasa
+            if not await self._en_hilo(self.extractor.cliente.fresca, url):
+                espera = max(self._cubo_global.reservar(), self._limitador_host.cubo(url).reservar())
+                if espera > 0:
+                    await asyncio.sleep(espera)
+
+            response = await self._en_hilo(self.extractor.cliente.get, url, headers=headers)
+            response.raise_for_status()
+            return response
+
+    def _en_hilo(self, funcion, *args, **kwargs):
+        return asyncio.get_running_loop().run_in_executor(self._hilos, lambda: funcion(*args, **kwargs))
+
+    # ==================== ETAPAS ====================
+    # Cada etapa recibe el trabajo (dict) y devuelve True si terminó con él
+
+    async def _etapa_pagina(self, trabajo):
+        response = await self._descargar(trabajo['url_pelicula'], self.extractor.headers)
+        trabajo['html'] = response.content
+        return False
+
+    async def _etapa_info(self, trabajo):
+        html = trabajo.pop('html')
+        trabajo['resultado'] = await self._en_hilo(
+            self.extractor.armar_resultado, trabajo['pelicula'], trabajo['url_pelicula'], html
+        )
+        return not trabajo['resultado'].get('player_url')
+
+    async def _etapa_player(self, trabajo):
+        headers = self.extractor.headers.copy()
+        headers['Referer'] = trabajo['url_pelicula']
+        try:
+            trabajo['player'] = await self._descargar(trabajo['resultado']['player_url'], headers)
+        except Exception as e:
+            # Igual que extraer_servidores_video: sin player no hay servidores
+            log.error(f"❌ Error accediendo al player: {e}")
+            return True
+        return False
+
+    async def _etapa_servidores(self, trabajo):
+        player_url = trabajo['resultado']['player_url']
+        response = trabajo.pop('player')
+        # Igual que extraer_servidores_video: un player que no cambió no se vuelve a parsear
+        trabajo['resultado']['servidores'] = await self._en_hilo(
+            self.extractor.cliente.parseado, response, f'servidores {urlparse(player_url).netloc}',
+            lambda: self.extractor.parsear_servidores(player_url, response.content)
+        )
+        return True
+
+    async def _trabajador(self, nombre, etapa, entrada, salida):
+        while True:
+            trabajo = await entrada.get()
+            if trabajo is None:
+                return
+
+            try:
+                terminado = await etapa(trabajo)
+            except Exception as e:
+                log.error(f"❌ {trabajo['pelicula'].get('titulo', 'Sin título')}: error en etapa {nombre}: {e}")
+                trabajo['resultado'] = None
+                terminado = True
+
+            if terminado or salida is None:
+                self._terminar(trabajo)
+            else:
+                await salida.put(trabajo)
+
+    def _terminar(self, trabajo):
+        self._hechas += 1
+        resultado = trabajo.get('resultado')
+        self._resultados[trabajo['indice']] = resultado
+        if resultado is not None:
+            log.info(
+                f"[{self._hechas}/{self._total}] {trabajo['pelicula'].get('titulo', 'Sin título')}: "
+                f"{len(resultado.get('servidores') or [])} servidores"
+            )
+
+    # ==================== EJECUCIÓN ====================
+
+    async def ejecutar(self, peliculas):
+        """Procesa la lista de películas y devuelve los resultados en orden"""
+        self._semaforos = {}
+        self._cubo_global = CuboTokens(self._tasa_global, rafaga=max(1, int(self._tasa_global)))
+        self._resultados = {}
+        self._hechas = 0
+        self._total = len(peliculas)
+        self._hilos = ThreadPoolExecutor(max_workers=sum(self.trabajadores.values()))
+
+        etapas = [
+            ('pagina', self._etapa_pagina),
+            ('info', self._etapa_info),
+            ('player', self._etapa_player),
+            ('servidores', self._etapa_servidores)
+        ]
+        colas = [asyncio.Queue(self.tamaño_cola) for _ in etapas]
+
+        tareas = []
+        for i, (nombre, etapa) in enumerate(etapas):
+            salida = colas[i + 1] if i + 1 < len(colas) else None
+            tareas.append([
+                asyncio.create_task(self._trabajador(nombre, etapa, colas[i], salida))
+                for _ in range(self.trabajadores[nombre])
+            ])
+
+        try:
+            for indice, pelicula in enumerate(peliculas, 1):
+                url_pelicula = pelicula.get('enlace') or pelicula.get('url_pelicula')
+                if not url_pelicula:
+                    log.warning(f"⚠️ {pelicula.get('titulo', 'Desconocido')}: No tiene URL")
+                    continue
+                await colas[0].put({'indice': indice, 'pelicula': pelicula, 'url_pelicula': url_pelicula})
+
+            # Cerrar etapa por etapa: cuando terminan los trabajadores de una,
+            # ya no llegan trabajos nuevos a la siguiente
+            for cola, trabajadores in zip(colas, tareas):
+                for _ in trabajadores:
+                    await cola.put(None)
+                await asyncio.gather(*trabajadores)
+        finally:
+            self._hilos.shutdown(wait=False)
+
+        resultados = []
+        for indice in sorted(self._resultados):
+            resultado = self._resultados[indice]
+            if resultado is not None:
+                # Igual que procesar_peliculas: el id es la posición en la entrada
+                resultado['id'] = indice
+                resultados.append(resultado)
+        return resultados
+
+    def procesar(self, peliculas):
+        """Versión síncrona de ejecutar()"""
+        inicio = time.time()
+        resultados = asyncio.run(self.ejecutar(peliculas))
+        log.info(
+            f"✓ {len(resultados)} de {len(peliculas)} películas procesadas en {time.time() - inicio:.1f}s",
+            extra={'procesadas': len(resultados), 'total': len(peliculas)}
+        )
+        return resultados
@@ -1,16 +1,36 @@
-import requests
-from bs4 import BeautifulSoup
 import json
+import logging
 import time
 import os
+import sys
 from urllib.parse import urlparse
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from registro import configurar_registro
+from cliente_http import cliente_compartido
+from parseo import sopa
+from limitador import LimitadorPorHost
+
+log = logging.getLogger('scraper.series')
+
+# Origen a scrapear (igual que en cinecalidad_scraping)
+BASE_URL = os.getenv('CINECALIDAD_URL', 'https://cinecalidad.bar')
 
 class CineCalidadSerieExtractor:
 
-    def __init__(self):
-        self.base_url = "https://cinecalidad.bar"
-        self.session = requests.Session()
+    def __init__(self, cliente=None, max_trabajadores=4, peticiones_por_segundo=1.0, rafaga=2, base_url=None):
+        """
+        max_trabajadores: episodios de una serie que se procesan a la vez
+        peticiones_por_segundo / rafaga: límite de cortesía por host (token bucket)
+        base_url: origen a scrapear (por defecto BASE_URL)
+        """
+        self.base_url = (base_url or BASE_URL).rstrip('/')
+        # Cliente HTTP con pool y reintentos (por defecto el compartido del proceso)
+        self.cliente = cliente or cliente_compartido()
+        self.max_trabajadores = max_trabajadores
+        self.limitador = LimitadorPorHost(peticiones_por_segundo, rafaga)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -25,10 +45,10 @@ class CineCalidadSerieExtractor:
         try:
             with open(archivo_json, 'r', encoding='utf-8') as f:
                 series = json.load(f)
-            print(f"✓ {len(series)} películas cargadas desde {archivo_json}")
+            log.info(f"✓ {len(series)} películas cargadas desde {archivo_json}")
             return series
         except FileNotFoundError:
-            print(f"❌ Error: No se encontró el archivo {archivo_json}")
+            log.error(f"❌ Error: No se encontró el archivo {archivo_json}")
             return []
     
     def extraer_player_url_episodio(self, url_episodio_serie):
@@ -36,16 +56,16 @@ class CineCalidadSerieExtractor:
         Extrae la URL del iframe player desde la página de la película
         """
         try:
-            response = self.session.get(url_episodio_serie, headers=self.headers, timeout=15)
+            response = self.cliente.get(url_episodio_serie, headers=self.headers, limitador=self.limitador)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = sopa(response.content, 'iframes')
             
             # Buscar el iframe
             iframes = soup.find_all('iframe', class_='absolute inset-0 w-full h-full')
         
             if not iframes:
-                print("  ⚠️ No se encontraron iframes con las clases especificadas")
+                log.warning("⚠️ No se encontraron iframes con las clases especificadas")
                 return None
             
             # Filtrar iframes que NO sean de YouTube
@@ -55,14 +75,14 @@ class CineCalidadSerieExtractor:
                     
                     # Excluir iframes de YouTube (trailers)
                     if 'youtube.com' not in src.lower() and 'youtu.be' not in src.lower():
-                        print(f"  ✓ Player URL encontrada: {src}")
+                        log.info(f"✓ Player URL encontrada: {src}")
                         return src
             
-            print("  ⚠️ No se encontró iframe válido (solo trailers de YouTube)")
+            log.warning("⚠️ No se encontró iframe válido (solo trailers de YouTube)")
             return None
                 
         except Exception as e:
-            print(f"  ❌ Error extrayendo player URL: {e}")
+            log.error(f"❌ Error extrayendo player URL: {e}")
             return None
 
     def extraer_servidores_video(self, player_url, referer_url):
@@ -74,11 +94,11 @@ class CineCalidadSerieExtractor:
             headers_player = self.headers.copy()
             headers_player['Referer'] = referer_url
             
-            print(f"  → Accediendo al player...")
-            response = self.session.get(player_url, headers=headers_player, timeout=15)
+            log.debug(f"→ Accediendo al player...")
+            response = self.cliente.get(player_url, headers=headers_player, limitador=self.limitador)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = sopa(response.content, 'servidores')
             
             servidores = []
             
@@ -120,14 +140,14 @@ class CineCalidadSerieExtractor:
                             servidores.append(servidor_info)
                             
                 except Exception as e:
-                    print(f"    Error extrayendo servidor: {e}")
+                    log.warning(f"Error extrayendo servidor: {e}")
                     continue
             
-            print(f"  ✓ {len(servidores)} servidores encontrados")
+            log.info(f"✓ {len(servidores)} servidores encontrados")
             return servidores
             
         except Exception as e:
-            print(f"  ❌ Error accediendo al player: {e}")
+            log.error(f"❌ Error accediendo al player: {e}")
             return []
 
     def obtener_url_final_video(self, redirect_url, referer_url):
@@ -139,10 +159,9 @@ class CineCalidadSerieExtractor:
             headers_redirect['Referer'] = referer_url
             
             # Hacer petición pero NO seguir redirects automáticamente
-            response = self.session.get(
+            response = self.cliente.get(
                 redirect_url, 
                 headers=headers_redirect, 
-                timeout=15,
                 allow_redirects=False
             )
             
@@ -152,7 +171,7 @@ class CineCalidadSerieExtractor:
                 return url_final
             
             # Si no hay redirección, intentar extraer del HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = sopa(response.content, 'iframes')
             iframe = soup.find('iframe')
             if iframe and 'src' in iframe.attrs:
                 return iframe['src']
@@ -160,7 +179,7 @@ class CineCalidadSerieExtractor:
             return None
             
         except Exception as e:
-            print(f"    Error obteniendo URL final: {e}")
+            log.warning(f"Error obteniendo URL final: {e}")
             return None
     
     def _extraer_info_basica(self, soup):
@@ -219,10 +238,10 @@ class CineCalidadSerieExtractor:
                             generos_links = item.find_all('a')
                             info['generos'] = [g.text.strip() for g in generos_links]
             
-            print(f"✓ Información básica extraída: {info.get('titulo', 'Sin título')}")
+            log.info(f"✓ Información básica extraída: {info.get('titulo', 'Sin título')}")
             
         except Exception as e:
-            print(f"Error al extraer información básica: {e}")
+            log.warning(f"Error al extraer información básica: {e}")
         
         return info
     
@@ -235,19 +254,19 @@ class CineCalidadSerieExtractor:
             season_selector = soup.find('select', id='season-selector')
             
             if not season_selector:
-                print("No se encontró selector de temporadas")
+                log.warning("No se encontró selector de temporadas")
                 return temporadas
             
             # Obtener todas las opciones de temporada
             options = season_selector.find_all('option')
             
-            print(f"\n📺 Temporadas encontradas: {len(options)}")
+            log.info(f"📺 Temporadas encontradas: {len(options)}")
             
             for option in options:
                 temp_numero = option['value']
                 temp_nombre = option.text.strip()
                 
-                print(f"  → {temp_nombre}")
+                log.debug(f"→ {temp_nombre}")
                 
                 temporada_data = {
                     'numero': temp_numero,
@@ -282,12 +301,12 @@ class CineCalidadSerieExtractor:
                             
                             temporada_data['episodios'].append(episodio_data)
                     
-                    print(f"    ✓ {len(temporada_data['episodios'])} episodios encontrados")
+                    log.info(f"✓ {len(temporada_data['episodios'])} episodios encontrados")
                 
                 temporadas.append(temporada_data)
             
         except Exception as e:
-            print(f"Error al extraer temporadas y episodios: {e}")
+            log.warning(f"Error al extraer temporadas y episodios: {e}")
         
         return temporadas
     
@@ -304,13 +323,25 @@ class CineCalidadSerieExtractor:
                 
         return servidores
     
-    def procesar_serie(self, serie, delay_entre_episodios=5):
+    @staticmethod
+    def _clave_episodio(temporada, episodio):
+        """Identifica un episodio entre corridas: por su URL o por temporada y número"""
+        return episodio.get('url') or (temporada.get('numero'), episodio.get('numero'))
+    
+    def _procesar_episodio(self, episodio):
+        log.debug(f"→ Procesando: {episodio['titulo']}")
+        return self._extraer_enlaces_episodio(episodio['url'])
+    
+    def procesar_serie(self, serie, previa=None):
         """
         Extrae todos los datos de una serie incluyendo episodios y enlaces
         
         Args:
             url_serie (str): URL de la serie (ej: https://cinecalidad.bar/serie/andor-v4/)
             extraer_urls_finales (bool): Si True, extrae las URLs finales de video (más lento)
+            previa (dict): Resultado anterior de la serie; los episodios que ya
+                tenían servidores los reutilizan y solo se extraen los nuevos
+                o los que quedaron sin servidores
         
         Returns:
             dict: Diccionario con toda la información de la serie
@@ -318,14 +349,12 @@ class CineCalidadSerieExtractor:
         try:
             url_serie = serie.get('enlace')
             
-            print(f"\n{'='*60}")
-            print(f"Extrayendo datos de: {url_serie}")
-            print(f"{'='*60}\n")
+            log.info(f"Extrayendo datos de: {url_serie}")
             
-            response = self.session.get(url_serie, headers=self.headers, timeout=15)
+            response = self.cliente.get(url_serie, headers=self.headers, limitador=self.limitador)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = sopa(response.content)
             
             # Extraer información básica de la serie
             serie_info = self._extraer_info_basica(soup)
@@ -333,14 +362,33 @@ class CineCalidadSerieExtractor:
             # Extraer temporadas y episodios
             temporadas = self._extraer_temporadas_episodios(soup)
             
-            # Extraer enlaces de cada episodio
-            print("\n🎬 Extrayendo enlaces de servidores de cada episodio...\n")
+            # Reutilizar los servidores de los episodios que ya estaban en la corrida anterior
+            anteriores = {}
+            for temporada in (previa or {}).get('temporadas', []):
+                for episodio in temporada.get('episodios', []):
+                    if episodio.get('servidores'):
+                        anteriores[self._clave_episodio(temporada, episodio)] = episodio['servidores']
+            
+            episodios = []
+            reutilizados = 0
             for temporada in temporadas:
                 for episodio in temporada['episodios']:
-                    print(f"  → Procesando: {episodio['titulo']}")
-                    servidores = self._extraer_enlaces_episodio(episodio['url'])
+                    servidores = anteriores.get(self._clave_episodio(temporada, episodio))
+                    if servidores:
+                        episodio['servidores'] = servidores
+                        reutilizados += 1
+                    else:
+                        episodios.append(episodio)
+            
+            # Extraer enlaces de cada episodio en paralelo; el ritmo lo pone el limitador por host
+            log.info(
+                f"🎬 Extrayendo enlaces de servidores de {len(episodios)} episodios ({reutilizados} reutilizados)...",
+                extra={'episodios': len(episodios), 'reutilizados': reutilizados}
+            )
+            with ThreadPoolExecutor(max_workers=self.max_trabajadores) as ejecutor:
+                # map conserva el orden, así cada resultado vuelve a su episodio
+                for episodio, servidores in zip(episodios, ejecutor.map(self._procesar_episodio, episodios)):
                     episodio['servidores'] = servidores
-                    time.sleep(delay_entre_episodios) 
             
             # Construir el resultado final
             resultado = {
@@ -348,20 +396,24 @@ class CineCalidadSerieExtractor:
                 'url_serie': url_serie,
                 'temporadas': temporadas
             }
+            if previa and 'id' in previa:
+                resultado['id'] = previa['id']
             
-            print(f"\n{'='*60}")
-            print(f"✓ Extracción completada exitosamente")
-            print(f"{'='*60}\n")
+            log.info(f"✓ Extracción completada exitosamente")
             
             return resultado
             
         except Exception as e:
-            print(f"❌ Error al extraer datos de la serie: {e}")
+            log.error(f"❌ Error al extraer datos de la serie: {e}")
             return None
 
-    def procesar_series(self, archivo_json, limite=None, delay=5):
+    def procesar_series(self, archivo_json, limite=None, delay=0, archivo_previo=None):
         """
         Procesa múltiples películas
+        
+        Con archivo_previo (resultados anteriores, formato de guardar_resultados)
+        cada serie solo extrae los servidores de sus episodios nuevos, y las
+        series anteriores que no se procesaron se conservan al final.
         """
         series = self.cargar_series_json(archivo_json)
         
@@ -371,25 +423,37 @@ class CineCalidadSerieExtractor:
         if limite:
             series = series[:limite]
         
+        previas = self.cargar_series_json(archivo_previo) if archivo_previo else []
+        # Solo por URL: procesar_serie siempre guarda url_serie, y por título
+        # se confundirían series distintas con el mismo nombre
+        por_url = {p['url_serie']: p for p in previas if p.get('url_serie')}
+        usadas = set()
+        
         resultados = []
         total = len(series)
         
-        print(f"\n{'='*80}")
-        print(f"Procesando {total} películas...")
-        print('='*80)
+        log.info(f"Procesando {total} películas...")
         
         for i, serie in enumerate(series, 1):
-            print(f"\n[{i}/{total}] {serie.get('titulo', 'Sin título')}")
+            log.info(f"[{i}/{total}] {serie.get('titulo', 'Sin título')}")
             
-            resultado = self.procesar_serie(serie)
+            previa = por_url.get(serie.get('enlace'))
+            resultado = self.procesar_serie(serie, previa)
             
             if resultado:
                 resultados.append(resultado)
-            
-            # Pausa entre películas
-            if i < total:
+                if previa is not None:
+                    usadas.add(id(previa))
+            elif previa is not None and id(previa) not in usadas:
+                # Si falló la descarga se mantiene lo que había
+                resultados.append(previa)
+                usadas.add(id(previa))
+            
+            # Pausa opcional entre series (el limitador por host ya marca el ritmo)
+            if delay and i < total:
                 time.sleep(delay)
         
+        resultados.extend(p for p in previas if id(p) not in usadas)
         return resultados
 
     def guardar_resultados(self, resultados, prefijo='series'):
@@ -397,7 +461,7 @@ class CineCalidadSerieExtractor:
         Guarda resultados únicamente en un archivo JSON
         """
         if not resultados:
-            print("No hay resultados para guardar")
+            log.warning("No hay resultados para guardar")
             return
         
         carpeta_destino = os.path.join(os.path.dirname(__file__), '../cache')
@@ -408,7 +472,7 @@ class CineCalidadSerieExtractor:
         with open(ruta_archivo, 'w', encoding='utf-8') as f:
             json.dump(resultados, f, ensure_ascii=False, indent=2)
 
-        print(f"\n✓ JSON guardado: {ruta_archivo}")
+        log.info(f"✓ JSON guardado: {ruta_archivo}")
     
     def recuperar_propiedad_faltantes(self, archivo_cache, archivo_database, delay=1):
         """
@@ -423,10 +487,10 @@ class CineCalidadSerieExtractor:
         # Cargar database si se proporciona
         series_database = None
         if archivo_database:
-            print(f"\n📥 Cargando database para buscar propiedad faltantes...")
+            log.info(f"📥 Cargando database para buscar propiedad faltantes...")
             series_database = self.cargar_series_json(archivo_database)
         else:
-            print("❌ Se requiere archivo database para actualizar propiedad")
+            log.error("❌ Se requiere archivo database para actualizar propiedad")
             return series
         
         # Filtrar películas sin año
@@ -441,19 +505,17 @@ class CineCalidadSerieExtractor:
         total = len(serie_sin_propiedad)
         
         if total == 0:
-            print("✅ Todas las películas ya tienen año!")
+            log.info("✅ Todas las películas ya tienen año!")
             return series
         
-        print(f"\n{'='*80}")
-        print(f"🔄 Actualizando años de {total} películas...")
-        print('='*80)
+        log.info(f"🔄 Actualizando años de {total} películas...")
         
         actualizadas = 0
         no_encontradas = 0
         
         for i, serie in enumerate(serie_sin_propiedad, 1):
             titulo = serie.get('titulo', 'Sin título')
-            print(f"\n[{i}/{total}] {titulo}")
+            log.info(f"[{i}/{total}] {titulo}")
             
             # Buscar año en database
             año_encontrado = None
@@ -467,10 +529,10 @@ class CineCalidadSerieExtractor:
                 if p.get('titulo') == titulo:
                     if año_encontrado:
                         series[j]['id'] = f"{uuid.uuid4()}"
-                        print(f"   ✅ Propiedad actualizada: {año_encontrado}")
+                        log.info(f"✅ Propiedad actualizada: {año_encontrado}")
                         actualizadas += 1
                     else:
-                        print(f"   ⚠️  Propiedad no encontrada en database")
+                        log.warning(f"⚠️  Propiedad no encontrada en database")
                         no_encontradas += 1
                     break
             
@@ -479,11 +541,10 @@ class CineCalidadSerieExtractor:
                 time.sleep(delay)
         
         # Resumen
-        print(f"\n{'='*80}")
-        print(f"📊 Resumen de actualización de propiedad:")
-        print(f"   ✅ Actualizadas: {actualizadas}")
-        print(f"   ⚠️  No encontradas: {no_encontradas}")
-        print('='*80)
+        log.info(
+            f"📊 Resumen de actualización de propiedad: ✅ {actualizadas} actualizadas, ⚠️ {no_encontradas} no encontradas",
+            extra={'actualizadas': actualizadas, 'no_encontradas': no_encontradas}
+        )
         
         # Guardar resultados actualizados
         self.guardar_resultados(series, prefijo='series_actualizadas')
@@ -555,6 +616,7 @@ class CineCalidadSerieExtractor:
 
 # Ejemplo de uso
 if __name__ == "__main__":
+    configurar_registro(formato='texto')
     extractor = CineCalidadSerieExtractor()
     
     print("🎬 EXTRACTOR DE SERIES - CINECALIDAD")
@@ -613,11 +675,18 @@ if __name__ == "__main__":
         else:
             print("\n⚙️ Procesando TODAS las películas (esto puede tardar)...")
         
+        # Con resultados anteriores solo se extraen los episodios nuevos
+        archivo_previo = os.path.join(os.path.dirname(__file__), '../cache/series.json')
+        if not os.path.exists(archivo_previo) or input(
+            "\n¿Reutilizar los episodios ya extraídos en cache/series.json? (s/n): "
+        ).strip().lower() != 's':
+            archivo_previo = None
+        
         # Procesar
         resultados = extractor.procesar_series(
             archivo_json=archivo_json,
             limite=limite,
-            delay=5  
+            archivo_previo=archivo_previo
         )
         if resultados:
             print(f"\n{'='*80}")
@@ -627,4 +696,6 @@ if __name__ == "__main__":
             # Guardar
             extractor.guardar_resultados(resultados)
         else:
-            print("\n❌ No se procesó ninguna película")
\ No newline at end of file
+            print("\n❌ No se procesó ninguna película")
+
+    extractor.cliente.registrar_estadisticas()
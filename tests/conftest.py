@@ -0,0 +1,112 @@
+import http.server
+import json
+import os
+import socketserver
+import sys
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'scraper'))
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+PELICULAS = [
+    {'id': 'p1', 'titulo': 'Estreno', 'año': '2024', 'rating': '7.1', 'duracion': '1h 50m',
+     'generos': ['Drama'], 'director': ['Ana Gómez'], 'actores': []},
+    {'id': 'p2', 'titulo': 'Clásico', 'año': '1999', 'rating': '8.0', 'duracion': '2h',
+     'generos': ['Drama'], 'director': ['Ana Gómez'], 'actores': []},
+    {'id': 'p3', 'titulo': 'Sin año', 'año': '', 'rating': '', 'duracion': '',
+     'generos': ['Comedia'], 'director': ['Ana Gómez'], 'actores': []},
+    {'id': 'p4', 'titulo': 'Reciente', 'año': '2010', 'rating': '6.0', 'duracion': '95m',
+     'generos': ['Comedia'], 'director': ['Ana Gómez'], 'actores': []},
+    {'id': 'p5', 'titulo': 'Año inválido', 'año': 'N/A', 'rating': '', 'duracion': '',
+     'generos': ['Comedia'], 'director': ['Ana Gómez'], 'actores': []}
+]
+
+SERIES = [
+    # Formato de los listados (database/series_*.json): temporadas y episodios son texto
+    {'id': 's1', 'tipo': 'serie', 'titulo': 'La nueva brigada', 'temporadas': 'seasons 1',
+     'episodios': 'Episodios 6', 'año': '', 'generos': ['Drama']},
+    {'id': 's2', 'titulo': 'Con episodios', 'url_serie': 'https://cinecalidad.bar/serie/con-episodios/',
+     'temporadas': [
+         {'numero': 'Temporada 1', 'episodios': [
+             {'numero': '1x2', 'url': 'https://cinecalidad.bar/episodio/con-episodios-1x2/', 'servidores': []},
+             {'numero': '1x1', 'url': 'https://cinecalidad.bar/episodio/con-episodios-1x1/', 'servidores': []}
+         ]}
+     ]}
+]
+
+
+@pytest.fixture(scope='session')
+def api(tmp_path_factory):
+    """Módulo app cargado sobre catálogos chicos en un directorio temporal"""
+    directorio = tmp_path_factory.mktemp('api')
+    os.makedirs(directorio / 'cache')
+    with open(directorio / 'cache' / 'peliculas.json', 'w', encoding='utf-8') as f:
+        json.dump(PELICULAS, f, ensure_ascii=False)
+    with open(directorio / 'cache' / 'series.json', 'w', encoding='utf-8') as f:
+        json.dump(SERIES, f, ensure_ascii=False)
+
+    # Las rutas de la API son relativas al directorio de trabajo
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    os.environ.update({'PRECARGA': 'sincrona', 'SALUD_INTERVALO_MIN': '0', 'LOG_NIVEL': 'WARNING'})
+    try:
+        import app
+        yield app
+    finally:
+        os.chdir(anterior)
+
+
+@pytest.fixture(scope='session')
+def cliente(api):
+    """Cliente de prueba de la API"""
+    return api.app.test_client()
+
+
+@contextmanager
+def servidor_local(responder):
+    """
+    Servidor HTTP en un hilo. responder(path, cabeceras) devuelve
+    (estado, cabeceras, cuerpo); da el origen http://127.0.0.1:puerto
+    y la lista de paths pedidos.
+    """
+    pedidos = []
+
+    class Manejador(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _atender(self, con_cuerpo):
+            pedidos.append(self.path)
+            estado, cabeceras, cuerpo = responder(self.path, self.headers)
+            datos = cuerpo.encode('utf-8') if isinstance(cuerpo, str) else cuerpo
+            self.send_response(estado)
+            self.send_header('Content-Length', str(len(datos)))
+            for clave, valor in cabeceras.items():
+                self.send_header(clave, valor)
+            self.end_headers()
+            if con_cuerpo:
+                self.wfile.write(datos)
+
+        def do_GET(self):
+            self._atender(True)
+
+        def do_HEAD(self):
+            self._atender(False)
+
+    class Servidor(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+
+    servidor = Servidor(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        yield f'http://127.0.0.1:{servidor.server_address[1]}', pedidos
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
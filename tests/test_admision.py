@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from admision import MOTIVO_CAPACIDAD, MOTIVO_PLAZO, ControlAdmision, PresupuestoRuta, Saturado, leer_inicio_cola
+
+
+def test_leer_inicio_cola_normaliza_unidades():
+    assert leer_inicio_cola('t=1700000000.5') == 1700000000.5
+    assert leer_inicio_cola('1700000000500') == pytest.approx(1700000000.5)
+    assert leer_inicio_cola('t=1700000000500000') == pytest.approx(1700000000.5)
+    assert leer_inicio_cola(None) is None
+    assert leer_inicio_cola('ayer') is None
+
+
+def test_sin_lugar_ni_cola_rechaza_por_capacidad():
+    presupuesto = PresupuestoRuta('g', 1, espera_max=0)
+    presupuesto.entrar(10)
+
+    with pytest.raises(Saturado) as error:
+        presupuesto.entrar(10)
+
+    assert error.value.motivo == MOTIVO_CAPACIDAD
+    assert error.value.reintentar_en >= 1
+    assert presupuesto.metricas()['rechazadas'] == {MOTIVO_CAPACIDAD: 1, MOTIVO_PLAZO: 0}
+
+
+def test_la_cola_espera_a_que_se_libere_un_lugar():
+    presupuesto = PresupuestoRuta('g', 1, espera_max=2)
+    presupuesto.entrar(10)
+    admitida = threading.Event()
+
+    def esperar():
+        presupuesto.entrar(10)
+        admitida.set()
+
+    hilo = threading.Thread(target=esperar)
+    hilo.start()
+    time.sleep(0.1)
+    assert not admitida.is_set() and presupuesto.en_cola == 1
+
+    presupuesto.salir(0.1, False)
+    hilo.join(2)
+
+    assert admitida.is_set()
+    assert presupuesto.metricas()['admitidas'] == 2 and presupuesto.en_cola == 0
+
+
+def test_la_cola_llena_rechaza_sin_esperar():
+    presupuesto = PresupuestoRuta('g', 1, espera_max=5, max_cola=0)
+    presupuesto.entrar(10)
+
+    inicio = time.monotonic()
+    with pytest.raises(Saturado):
+        presupuesto.entrar(10)
+    assert time.monotonic() - inicio < 1
+
+
+def test_la_espera_en_cola_es_acotada():
+    presupuesto = PresupuestoRuta('g', 1, espera_max=0.1)
+    presupuesto.entrar(10)
+
+    with pytest.raises(Saturado) as error:
+        presupuesto.entrar(10)
+    assert error.value.motivo == MOTIVO_CAPACIDAD
+    assert presupuesto.en_cola == 0
+
+
+def test_retry_after_crece_con_la_duracion_media():
+    presupuesto = PresupuestoRuta('g', 2)
+    for _ in range(30):
+        presupuesto.entrar(10)
+        presupuesto.salir(4.0, False)
+
+    assert presupuesto.reintentar_en() == 4
+
+
+def test_plazo_vencido_en_la_cola_del_proxy_se_rechaza():
+    control = ControlAdmision(plazo=1)
+    control.grupo('g', 5)
+
+    with pytest.raises(Saturado) as error:
+        with control.admitir('g', inicio_cola=time.time() - 2):
+            pass
+
+    assert error.value.motivo == MOTIVO_PLAZO
+    assert control.metricas()['grupos']['g']['admitidas'] == 0
+
+
+def test_admitir_libera_el_lugar_y_cuenta_fuera_de_plazo():
+    control = ControlAdmision(plazo=1)
+    control.grupo('g', 1)
+
+    with control.admitir('g', inicio_cola=time.time() - 0.9) as presupuesto:
+        assert presupuesto.en_curso == 1
+        time.sleep(0.2)
+
+    metricas = control.metricas()['grupos']['g']
+    assert metricas['en_curso'] == 0 and metricas['fuera_de_plazo'] == 1
+
+    # Un inicio en el futuro (relojes desfasados) cuenta desde ahora
+    with control.admitir('g', inicio_cola=time.time() + 60):
+        pass
+    assert control.metricas()['grupos']['g']['admitidas'] == 2
+
+
+def test_la_ruta_saturada_responde_503_con_retry_after(api, cliente, monkeypatch):
+    presupuesto = PresupuestoRuta('busqueda', 1, espera_max=0)
+    monkeypatch.setitem(api.admision._grupos, 'busqueda', presupuesto)
+    presupuesto.entrar(10)
+
+    respuesta = cliente.get('/api/peliculas/buscar?q=otra')
+
+    assert respuesta.status_code == 503
+    assert respuesta.get_json()['motivo'] == MOTIVO_CAPACIDAD
+    assert int(respuesta.headers['Retry-After']) >= 1
+
+    presupuesto.salir(0, False)
+    assert cliente.get('/api/peliculas/buscar?q=otra').status_code == 200
@@ -0,0 +1,166 @@
+import threading
+import time
+
+from admision import PresupuestoRuta
+
+
+def test_ready_con_series_de_listado(cliente):
+    respuesta = cliente.get('/api/ready')
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['listo'] is True
+
+
+def test_detalle_de_serie_con_temporadas_en_texto(cliente):
+    respuesta = cliente.get('/api/serie/s1')
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['temporadas'] == 'seasons 1'
+
+
+def test_detalle_de_serie_con_episodios(cliente):
+    respuesta = cliente.get('/api/serie/s2')
+
+    assert respuesta.status_code == 200
+    episodios = respuesta.get_json()['temporadas'][0]['episodios']
+    assert [e['numero'] for e in episodios] == ['1x2', '1x1']
+
+
+def test_episodios_vecinos_en_orden_de_numero(cliente):
+    primero = cliente.get('/api/episodio/con-episodios-1x1').get_json()
+    assert primero['anterior'] is None and primero['siguiente'] == 'con-episodios-1x2'
+
+    siguiente = cliente.get('/api/episodio/con-episodios-1x1/siguiente')
+    assert siguiente.status_code == 200 and siguiente.get_json()['id'] == 'con-episodios-1x2'
+    assert cliente.get('/api/episodio/con-episodios-1x2/anterior').get_json()['id'] == 'con-episodios-1x1'
+    assert cliente.get('/api/episodio/con-episodios-1x2/siguiente').status_code == 404
+    assert cliente.get('/api/episodio/no-existe/siguiente').status_code == 404
+
+
+def test_episodio_por_url(cliente):
+    respuesta = cliente.get('/api/episodio/url/https://cinecalidad.bar/episodio/con-episodios-1x2/')
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['id'] == 'con-episodios-1x2'
+
+
+def test_lote_por_post(cliente):
+    respuesta = cliente.post('/api/lote', json={'ids': ['p1', 's1', 'no-existe']})
+
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()
+    assert [item['id'] for item in datos['items']] == ['p1', 's1']
+    assert datos['no_encontrados'] == ['no-existe']
+
+
+def test_lote_por_get_con_etag(cliente):
+    respuesta = cliente.get('/api/lote?ids=s2,p1,s2&modo=completo')
+
+    assert [(i['id'], i['tipo']) for i in respuesta.get_json()['items']] == [('s2', 'serie'), ('p1', 'pelicula')]
+    assert respuesta.get_json()['items'][1]['datos']['director'] == ['Ana Gómez']
+
+    etag = respuesta.headers['ETag']
+    assert cliente.get('/api/lote?ids=s2,p1&modo=completo', headers={'If-None-Match': etag}).status_code == 304
+    assert cliente.get('/api/lote?ids=p1,s2&modo=completo', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_lote_con_demasiados_ids_o_modo_invalido(api, cliente):
+    ids = ','.join(f'x{i}' for i in range(api.LIMITE_LOTE + 1))
+
+    assert cliente.get(f'/api/lote?ids={ids}').status_code == 400
+    assert cliente.get('/api/lote?ids=').status_code == 400
+    assert cliente.get('/api/lote?ids=p1&modo=otro').status_code == 400
+
+
+def test_lote_con_cuerpo_que_no_es_objeto(cliente):
+    for cuerpo in ([1, 2], 'x', 3):
+        respuesta = cliente.post('/api/lote', json=cuerpo)
+        assert respuesta.status_code == 400
+
+
+def test_lote_con_ids_que_no_son_lista(cliente):
+    for ids in ('p1', {'p1': True}, 5, ['p1', {'id': 'p2'}], [None], [True]):
+        respuesta = cliente.post('/api/lote', json={'ids': ids})
+        assert respuesta.status_code == 400
+
+
+def test_persona_ordena_titulos_por_año_con_faltantes_al_final(cliente):
+    respuesta = cliente.get('/api/persona/ana-gomez')
+
+    assert respuesta.status_code == 200
+    titulos = respuesta.get_json()['titulos']['director']
+    assert [t['id'] for t in titulos] == ['p1', 'p4', 'p2', 'p3', 'p5']
+
+
+def test_buscar_personas_y_filtrar_por_rol(cliente):
+    personas = cliente.get('/api/personas/buscar?q=gom').get_json()['personas']
+    assert personas == [{'slug': 'ana-gomez', 'nombre': 'Ana Gómez', 'roles': {'director': 5}}]
+    assert cliente.get('/api/personas/buscar?q=').status_code == 400
+
+    # El slug se normaliza: vale el nombre con acentos
+    assert cliente.get('/api/persona/Ana Gómez').get_json()['slug'] == 'ana-gomez'
+    assert cliente.get('/api/persona/nadie').status_code == 404
+
+    assert cliente.get('/api/peliculas?persona=ana-gomez&rol=director').get_json()['total_items'] == 5
+    assert cliente.get('/api/peliculas?persona=ana-gomez&rol=actor').get_json()['total_items'] == 0
+
+
+def test_peliculas_filtradas_por_año(cliente):
+    respuesta = cliente.get('/api/peliculas?año=2024')
+
+    assert respuesta.status_code == 200
+    assert [p['id'] for p in respuesta.get_json()['items']] == ['p1']
+
+
+def test_peliculas_filtradas_y_ordenadas_por_columna(cliente):
+    respuesta = cliente.get('/api/peliculas?año_desde=1990&ordenar=año')
+    assert [p['id'] for p in respuesta.get_json()['items']] == ['p1', 'p4', 'p2']
+
+    # Candidatos de otro filtro: los que no tienen año quedan al final
+    respuesta = cliente.get('/api/peliculas?persona=ana-gomez&ordenar=año')
+    ids = [p['id'] for p in respuesta.get_json()['items']]
+    assert ids[:3] == ['p1', 'p4', 'p2'] and set(ids[3:]) == {'p3', 'p5'}
+
+
+def test_peliculas_con_filtro_numerico_vacio_no_filtra(cliente):
+    respuesta = cliente.get('/api/peliculas?año=&rating_min=')
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['total_items'] == 5
+
+
+def test_peliculas_con_filtro_numerico_invalido(cliente):
+    for consulta in ('año=abc', 'año_desde=x', 'año_hasta=2020.5', 'rating_min=alto',
+                     'rating_min=nan', 'duracion_max=1h'):
+        respuesta = cliente.get(f'/api/peliculas?{consulta}')
+        assert respuesta.status_code == 400, consulta
+
+
+def test_rafaga_identica_ocupa_un_solo_lugar_del_presupuesto(api, monkeypatch):
+    """Las peticiones que esperan a la primera (single-flight) no agotan el presupuesto"""
+    cargar_json = api.cargar_json
+    llamadas = []
+
+    def cargar_lento(archivo):
+        llamadas.append(archivo)
+        time.sleep(0.3)
+        return cargar_json(archivo)
+
+    monkeypatch.setattr(api, 'cargar_json', cargar_lento)
+    monkeypatch.setitem(api.admision._grupos, 'busqueda', PresupuestoRuta('busqueda', 1, espera_max=0))
+
+    estados = []
+
+    def pedir():
+        estados.append(api.app.test_client().get('/api/peliculas/buscar?q=estreno').status_code)
+
+    hilos = [threading.Thread(target=pedir) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+        time.sleep(0.01)
+    for hilo in hilos:
+        hilo.join()
+
+    assert estados == [200] * 6
+    assert len(llamadas) == 1
+    assert api.admision._grupos['busqueda'].admitidas == 1
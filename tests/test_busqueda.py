@@ -0,0 +1,136 @@
+from busqueda import IndicePrefijos, IndiceTrigramas, buscar_titulos, normalizar_texto
+
+ITEMS = [
+    {'id': 'a', 'titulo': 'El Señor de los Anillos', 'año': '2001', 'rating': '8.8'},
+    {'id': 'b', 'titulo': 'Señora Acero', 'año': '2015'},
+    {'id': 'c', 'titulo': 'Anillos de fuego', 'año': '1990'},
+    {'id': 'd', 'titulo': 'Spider-Man', 'titulo_original': 'Spider-Man', 'año': '2002'},
+]
+
+
+def ids(resultados):
+    return [item['id'] for _, item in resultados]
+
+
+def test_normalizar_texto():
+    assert normalizar_texto('Días Perfectos!') == 'dias perfectos'
+    assert normalizar_texto('  SPIDER-man ') == 'spider man'
+    assert normalizar_texto(None) == ''
+
+
+def test_prefijos_buscan_desde_cualquier_palabra():
+    indice = IndicePrefijos(ITEMS)
+
+    assert ids(indice.buscar('senor de')) == ['a']
+    assert ids(indice.buscar('man')) == ['d']
+    assert indice.buscar('') == [] and indice.buscar('zzz') == []
+
+
+def test_prefijos_prefieren_el_inicio_del_titulo_y_despues_lo_reciente():
+    indice = IndicePrefijos(ITEMS)
+
+    # 'Anillos de fuego' empieza por el prefijo aunque es más vieja
+    assert ids(indice.buscar('anil')) == ['c', 'a']
+    assert ids(indice.buscar('señ')) == ['b', 'a']
+
+
+def test_prefijos_precalculados_coinciden_con_la_busqueda_binaria():
+    items = [{'id': str(i), 'titulo': f'Titulo {i}', 'año': str(1950 + i)} for i in range(30)]
+    indice = IndicePrefijos(items, limite_precalculado=5)
+
+    # 'ti' está precalculado con 5 resultados; pedir 8 obliga a la búsqueda binaria
+    assert ids(indice.buscar('ti', 5)) == ids(indice.buscar('ti', 8))[:5]
+    assert ids(indice.buscar('ti', 3)) == ['29', '28', '27']
+
+
+def test_un_item_aparece_una_sola_vez():
+    indice = IndicePrefijos([{'id': 'x', 'titulo': 'Casa casa', 'titulo_original': 'Casa'}])
+
+    assert ids(indice.buscar('cas')) == ['x']
+
+
+def test_sugerencias_mezclan_peliculas_y_series(cliente):
+    respuesta = cliente.get('/api/sugerencias?q=con')
+    sugerencias = respuesta.get_json()['sugerencias']
+
+    assert respuesta.status_code == 200
+    assert [(s['id'], s['tipo']) for s in sugerencias] == [('s2', 'serie')]
+
+    sugerencias = cliente.get('/api/sugerencias?q=CLAS').get_json()['sugerencias']
+    assert [s['id'] for s in sugerencias] == ['p2']
+
+
+def test_sugerencias_respetan_el_limite(cliente):
+    datos = cliente.get('/api/sugerencias?q=a&limite=1').get_json()
+
+    assert datos['total'] == 1
+    assert cliente.get('/api/sugerencias?q=').get_json()['total'] == 0
+
+
+def test_trigramas_toleran_errores_acentos_y_guiones():
+    indice = IndiceTrigramas(ITEMS)
+
+    assert ids(indice.buscar('spiderman')) == ['d']
+    assert ids(indice.buscar('senor de los anilos'))[0] == 'a'
+    assert indice.buscar('zzzz') == [] and indice.buscar('') == []
+
+
+def test_trigramas_ordenan_por_similitud_y_respetan_el_umbral():
+    indice = IndiceTrigramas(ITEMS)
+
+    resultados = indice.buscar('senora acero')
+    assert ids(resultados)[0] == 'b'
+    assert [s for s, _ in resultados] == sorted((s for s, _ in resultados), reverse=True)
+    assert all(s >= 0.8 for s, _ in indice.buscar('anillos', umbral=0.8))
+
+
+def test_trigramas_encuentran_un_titulo_entre_muchos_parecidos():
+    # Los trigramas que están en casi todos los títulos se descartan al elegir candidatos
+    items = [{'id': str(i), 'titulo': f'Pelicula {i:04d}'} for i in range(2000)]
+    items.append({'id': 'x', 'titulo': 'Xilofonista'})
+    indice = IndiceTrigramas(items)
+
+    assert ids(indice.buscar('xilofnista', limite=1)) == ['x']
+
+
+def test_busqueda_difusa_en_la_api(cliente):
+    peliculas = cliente.get('/api/peliculas/buscar?q=clasico&difuso=1').get_json()
+    series = cliente.get('/api/series/buscar?q=la nueba brigada&difuso=1').get_json()
+
+    assert [p['id'] for p in peliculas['items']] == ['p2']
+    assert [s['id'] for s in series['items']] == ['s1']
+    # Sin el modo difuso el acento sí importa
+    assert cliente.get('/api/peliculas/buscar?q=clasico').get_json()['total_items'] == 0
+
+
+def test_buscar_titulos_combina_prefijos_y_trigramas():
+    resultados = buscar_titulos(IndicePrefijos(ITEMS), IndiceTrigramas(ITEMS), 'anillos')
+
+    # Prefijo al inicio del título: 1.0; en medio del título: 0.85, o más si los trigramas lo acercan
+    assert [(item['id'], round(relevancia, 2)) for relevancia, item in resultados] == [('c', 1.0), ('a', 0.9)]
+
+
+def test_buscar_todo_pagina_con_cursor(cliente):
+    vistos = []
+    url = '/api/buscar?q=e&limite=2'
+    while url:
+        datos = cliente.get(url).get_json()
+        vistos.extend((r['tipo'], r['id']) for r in datos['resultados'])
+        cursor = datos['siguiente_cursor']
+        url = f'/api/buscar?q=e&limite=2&cursor={cursor}' if cursor else None
+
+    assert len(vistos) == len(set(vistos)) == datos['total']
+    assert ('pelicula', 'p1') in vistos and ('serie', 's2') in vistos
+
+
+def test_buscar_todo_modos_y_errores(api, cliente):
+    resumen = cliente.get('/api/buscar?q=clasico').get_json()['resultados'][0]
+    completo = cliente.get('/api/buscar?q=clasico&modo=completo').get_json()['resultados'][0]
+
+    assert resumen['id'] == completo['id'] == 'p2'
+    assert completo['datos']['director'] == ['Ana Gómez']
+    assert cliente.get('/api/buscar?q=').status_code == 400
+    assert cliente.get('/api/buscar?q=x&modo=otro').status_code == 400
+    assert cliente.get('/api/buscar?q=x&cursor=%%%').status_code == 400
+    # Un cursor de otra versión del catálogo obliga a reiniciar
+    assert cliente.get(f"/api/buscar?q=x&cursor={api.codificar_cursor(2, 'vieja')}").status_code == 409
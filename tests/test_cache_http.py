@@ -0,0 +1,176 @@
+import os
+import time
+
+import pytest
+
+import cliente_http
+from cache_http import CacheHTTP, clase_url
+from cinecalidad_scraping import CinecalidadScraper
+from cliente_http import ClienteHTTP
+from limitador import LimitadorPorHost
+
+from conftest import servidor_local
+
+CARPETA_FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', 'cinecalidad')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheHTTP(str(tmp_path / 'http.sqlite3'))
+
+
+def test_clase_url():
+    assert clase_url('https://cinecalidad.bar') == 'listado'
+    assert clase_url('https://cinecalidad.bar/serie/page/3/') == 'listado'
+    assert clase_url('https://cinecalidad.bar/peli/una/') == 'detalle'
+    assert clase_url('https://cinecalidad.bar/episodio/una-1x1/') == 'detalle'
+    assert clase_url('https://player.top/embed.php?id=1') == 'player'
+
+
+def test_guardar_y_buscar(cache):
+    cache.guardar('https://x/peli/a/', b'<html>a</html>', {'ETag': '"1"', 'Set-Cookie': 'no'})
+
+    entrada = cache.buscar('https://x/peli/a/')
+    assert entrada['contenido'] == b'<html>a</html>'
+    assert entrada['cabeceras'] == {'ETag': '"1"'}
+    assert cache.buscar('https://x/peli/b/') is None
+
+
+def test_contenido_compartido_se_guarda_una_vez(cache):
+    cache.guardar('https://x/peli/a/', b'igual', {})
+    cache.guardar('https://x/peli/b/', b'igual', {})
+
+    assert cache.estadisticas()['urls'] == 2
+    assert cache.estadisticas()['contenidos'] == 1
+
+
+def test_expulsa_las_urls_menos_usadas(tmp_path):
+    cache = CacheHTTP(str(tmp_path / 'http.sqlite3'), tamaño_max=3000)
+    for i in range(3):
+        cache.guardar(f'https://x/peli/{i}/', os.urandom(900), {})
+    cache.buscar('https://x/peli/0/')
+
+    cache.guardar('https://x/peli/3/', os.urandom(900), {})
+
+    assert cache.estadisticas()['tamaño'] <= 3000 * 0.9
+    assert cache.buscar('https://x/peli/0/') is not None
+    assert cache.buscar('https://x/peli/1/') is None
+    assert cache.buscar('https://x/peli/3/') is not None
+
+
+def test_derivado_se_recalcula_con_otra_version(cache):
+    huella = cache.guardar('https://x/peli/a/', b'html', {})
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        return {'n': len(llamadas)}
+
+    assert cache.derivado(huella, 'info', calcular, version='v1') == {'n': 1}
+    assert cache.derivado(huella, 'info', calcular, version='v1') == {'n': 1}
+    assert cache.derivado(huella, 'info', calcular, version='v2') == {'n': 2}
+    assert cache.derivado(huella, 'info', calcular, version='v2') == {'n': 2}
+    assert len(llamadas) == 2
+
+    conexion = cache._conexion()
+    assert conexion.execute('SELECT nombre FROM derivados').fetchall() == [('info@v2',)]
+
+
+def test_parseado_depende_del_codigo_de_los_scrapers(cache, monkeypatch):
+    cliente = ClienteHTTP(cache=cache)
+    response = cliente_http.respuesta_desde_cache(
+        'https://x/peli/a/', {'contenido': b'html', 'cabeceras': {}, 'huella': cache.guardar('https://x/peli/a/', b'html', {})},
+        'fresca'
+    )
+    llamadas = []
+
+    def parsear():
+        llamadas.append(1)
+        return len(llamadas)
+
+    assert cliente.parseado(response, 'info', parsear) == 1
+    assert cliente.parseado(response, 'info', parsear) == 1
+    monkeypatch.setattr(cliente_http, 'CODIGO_SCRAPERS', 'otro')
+    assert cliente.parseado(response, 'info', parsear) == 2
+
+
+def test_cliente_revalida_con_etag(cache):
+    def responder(path, cabeceras):
+        if cabeceras.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, ''
+        return 200, {'ETag': '"v1"', 'Content-Type': 'text/html'}, '<html>listado</html>'
+
+    with servidor_local(responder) as (origen, pedidos):
+        cliente = ClienteHTTP(cache=cache)
+        cache.ttl['listado'] = 0
+
+        primera = cliente.get(f'{origen}/')
+        segunda = cliente.get(f'{origen}/')
+
+        cache.ttl['listado'] = 3600
+        tercera = cliente.get(f'{origen}/')
+
+    assert primera.desde_cache is None
+    assert segunda.desde_cache == 'revalidada'
+    assert segunda.content == b'<html>listado</html>'
+    assert tercera.desde_cache == 'fresca'
+    assert len(pedidos) == 2
+    host = origen.split('//')[1]
+    assert cliente.estadisticas()[host]['cache_revalidadas'] == 1
+    assert cliente.estadisticas()[host]['cache_frescas'] == 1
+
+
+def test_listado_desde_cache_trae_ids_nuevos(cache):
+    with open(os.path.join(CARPETA_FIXTURES, 'listado_peliculas.html'), 'rb') as f:
+        listado = f.read()
+
+    with servidor_local(lambda path, cabeceras: (200, {}, listado)) as (origen, pedidos):
+        scraper = CinecalidadScraper(cliente=ClienteHTTP(cache=cache), base_url=origen)
+        primera = scraper.extraer_peliculas()
+        segunda = scraper.extraer_peliculas()
+
+    assert len(pedidos) == 1
+    assert primera and len(primera) == len(segunda)
+    assert [p['titulo'] for p in primera] == [p['titulo'] for p in segunda]
+    assert not {p['id'] for p in primera} & {p['id'] for p in segunda}
+
+
+def test_detalle_se_revalida_siempre(cache):
+    version = {'etag': '"v1"', 'html': '<html>1 episodio</html>'}
+
+    def responder(path, cabeceras):
+        if cabeceras.get('If-None-Match') == version['etag']:
+            return 304, {'ETag': version['etag']}, ''
+        return 200, {'ETag': version['etag']}, version['html']
+
+    with servidor_local(responder) as (origen, pedidos):
+        cliente = ClienteHTTP(cache=cache)
+        cliente.get(f'{origen}/serie/una/')
+        sin_cambios = cliente.get(f'{origen}/serie/una/')
+        version.update(etag='"v2"', html='<html>2 episodios</html>')
+        con_cambios = cliente.get(f'{origen}/serie/una/')
+
+    assert len(pedidos) == 3
+    assert sin_cambios.desde_cache == 'revalidada'
+    assert con_cambios.desde_cache is None
+    assert con_cambios.content == b'<html>2 episodios</html>'
+
+
+def test_limitador_solo_para_peticiones_a_la_red(cache):
+    with servidor_local(lambda path, cabeceras: (200, {}, '<html></html>')) as (origen, pedidos):
+        cliente = ClienteHTTP(cache=cache)
+        limitador = LimitadorPorHost(tasa=2, rafaga=1)
+
+        inicio = time.monotonic()
+        for _ in range(5):
+            cliente.get(f'{origen}/', limitador=limitador)
+        desde_cache = time.monotonic() - inicio
+
+        inicio = time.monotonic()
+        for i in range(3):
+            cliente.get(f'{origen}/page/{i + 2}/', limitador=limitador)
+        a_la_red = time.monotonic() - inicio
+
+    assert len(pedidos) == 4
+    assert desde_cache < 0.3
+    assert a_la_red >= 1.2
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from cambios import AGREGADO, ELIMINADO, MODIFICADO, RegistroCambios, compactar
+
+
+@pytest.fixture
+def registro(tmp_path):
+    return RegistroCambios(str(tmp_path / 'cambios.sqlite3'), max_versiones=3)
+
+
+def test_compactar_deja_el_cambio_neto():
+    delta = compactar([
+        ('a', AGREGADO), ('a', ELIMINADO),
+        ('b', ELIMINADO), ('b', AGREGADO),
+        ('c', AGREGADO), ('c', MODIFICADO),
+        ('d', MODIFICADO), ('d', ELIMINADO),
+    ])
+
+    assert delta == {'agregados': ['c'], 'modificados': ['b'], 'eliminados': ['d']}
+
+
+def test_registrar_detecta_agregados_modificados_y_eliminados(registro):
+    v1 = registro.registrar('peliculas', 'h1', [{'id': 'a', 'x': 1}, {'id': 'b', 'x': 1}])
+    v2 = registro.registrar('peliculas', 'h2', [{'id': 'a', 'x': 2}, {'id': 'c', 'x': 1}])
+
+    assert v2 == v1 + 1
+    assert registro.desde(v1) == (v2, {'peliculas': {'agregados': ['c'], 'modificados': ['a'], 'eliminados': ['b']}})
+    assert registro.desde(v2) == (v2, {})
+
+
+def test_la_misma_huella_no_crea_version(registro):
+    v1 = registro.registrar('peliculas', 'h1', [{'id': 'a'}])
+
+    assert registro.registrar('peliculas', 'h1', [{'id': 'a'}]) == v1
+    # Otro worker (otra conexión) ve la misma versión
+    assert RegistroCambios(registro.archivo).registrar('peliculas', 'h1', [{'id': 'a'}]) == v1
+
+
+def test_workers_simultaneos_registran_una_sola_version(registro):
+    versiones = []
+
+    def registrar():
+        otro = RegistroCambios(registro.archivo)
+        versiones.append(otro.registrar('series', 'h', [{'id': str(i)} for i in range(100)]))
+
+    hilos = [threading.Thread(target=registrar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(set(versiones)) == 1
+    assert registro.version_actual() == versiones[0]
+
+
+def test_historial_truncado_o_delta_grande_obliga_a_resincronizar(registro):
+    for numero in range(1, 6):
+        registro.registrar('peliculas', f'h{numero}', [{'id': str(i)} for i in range(numero)])
+
+    assert registro.version_minima() == 3
+    assert registro.desde(1) is None
+    assert registro.desde(2) is not None
+    assert registro.desde(99) is None
+    assert registro.desde(2, limite=2) is None
+
+
+def test_api_cambios(api, cliente):
+    datos = cliente.get('/api/cambios?desde=0').get_json()
+
+    assert datos['resync'] is False
+    assert sorted(datos['cambios']['peliculas']['agregados']) == ['p1', 'p2', 'p3', 'p4', 'p5']
+    assert cliente.get(f"/api/cambios?desde={datos['version']}").get_json()['cambios'] == {}
+    assert cliente.get(f"/api/cambios?desde={datos['version'] + 10}").get_json()['resync'] is True
+    assert cliente.get('/api/cambios').status_code == 400
+    assert cliente.get('/api/cambios?desde=-1').status_code == 400
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+
+import catalogo
+from catalogo import ColumnaOrdenada, GestorCatalogo, IndiceEpisodios, SnapshotCatalogo
+
+from conftest import PELICULAS, SERIES
+
+
+def gestor_en(tmp_path, peliculas=PELICULAS):
+    archivo = tmp_path / 'peliculas.json'
+    archivo.write_text(json.dumps(peliculas), encoding='utf-8')
+    return GestorCatalogo({'peliculas': str(archivo)}), archivo
+
+
+def test_series_con_temporadas_en_texto_se_cargan():
+    snapshot = SnapshotCatalogo('series', SERIES, huella='x', version=1)
+
+    assert snapshot.por_id['s1']['temporadas'] == 'seasons 1'
+    assert len(snapshot.episodios) == 2
+
+
+def test_indice_episodios_ignora_temporadas_y_episodios_que_no_son_objetos():
+    series = [
+        {'id': 'a', 'temporadas': 'seasons 2'},
+        {'id': 'b', 'temporadas': ['Temporada 1', {'numero': '1', 'episodios': 'Episodios 3'}]},
+        {'id': 'c', 'temporadas': [{'numero': '1', 'episodios': [
+            'Episodio suelto', {'numero': '2', 'url': 'https://x/episodio/c-1x2/'},
+            {'numero': '1', 'url': 'https://x/episodio/c-1x1/'}
+        ]}]}
+    ]
+    indice = IndiceEpisodios(series)
+
+    assert len(indice) == 2
+    primero = indice.obtener('c-1x1')
+    assert indice.vecino(primero, 1)['id'] == 'c-1x2'
+
+
+def test_columna_ordena_subconjuntos_como_los_ordenes_precalculados():
+    columna = ColumnaOrdenada([3, None, 1, 3, None, 2])
+
+    for subconjunto in [{0, 1, 2, 3, 4, 5}, {1, 3, 5}, {4, 0}, set()]:
+        assert columna.ordenar(subconjunto) == [i for i in columna.orden_ascendente if i in subconjunto]
+        assert columna.ordenar(subconjunto, descendente=True) == [
+            i for i in columna.orden_descendente if i in subconjunto
+        ]
+
+
+def test_precarga_deja_el_catalogo_listo(tmp_path):
+    gestor, _ = gestor_en(tmp_path)
+    assert not gestor.listo() and gestor.estado() == {}
+
+    gestor.precargar()
+
+    assert gestor.listo() and gestor.duracion_precarga is not None
+    assert gestor.estado()['peliculas']['items'] == len(PELICULAS)
+
+
+def test_precarga_en_segundo_plano_no_bloquea(tmp_path, monkeypatch):
+    gestor, _ = gestor_en(tmp_path)
+    liberar = threading.Event()
+    construir = catalogo.SnapshotCatalogo
+
+    def construir_lento(*args):
+        liberar.wait(5)
+        return construir(*args)
+
+    monkeypatch.setattr(catalogo, 'SnapshotCatalogo', construir_lento)
+    monkeypatch.setattr(os, 'register_at_fork', lambda **kwargs: None)
+    gestor.precargar_en_segundo_plano()
+
+    assert not gestor.esperar(0.1)
+    liberar.set()
+    assert gestor.esperar(5)
+
+
+def test_el_snapshot_se_reconstruye_solo_si_cambia_el_archivo(tmp_path):
+    gestor, archivo = gestor_en(tmp_path)
+    primero = gestor.obtener('peliculas')
+    assert gestor.obtener('peliculas') is primero
+
+    archivo.write_text(json.dumps(PELICULAS[:2]), encoding='utf-8')
+    os.utime(archivo, ns=(0, 0))
+    segundo = gestor.obtener('peliculas')
+
+    assert segundo is not primero
+    assert len(segundo.items) == 2 and segundo.version == primero.version + 1
+
+
+def test_ready_responde_503_hasta_la_precarga(api, cliente, monkeypatch):
+    assert cliente.get('/api/ready').get_json()['listo'] is True
+
+    monkeypatch.setattr(api.catalogo, '_listo', threading.Event())
+    respuesta = cliente.get('/api/ready')
+
+    assert respuesta.status_code == 503
+    assert respuesta.get_json()['listo'] is False
@@ -0,0 +1,89 @@
+import email.utils
+import socket
+import time
+
+import pytest
+import requests
+
+from cliente_http import ClienteHTTP, leer_retry_after
+
+from conftest import servidor_local
+
+
+def secuencia(*respuestas):
+    """responder que devuelve las respuestas en orden y repite la última"""
+    pendientes = list(respuestas)
+
+    def responder(path, cabeceras):
+        return pendientes.pop(0) if len(pendientes) > 1 else pendientes[0]
+    return responder
+
+
+def test_leer_retry_after():
+    assert leer_retry_after('2') == 2.0
+    assert leer_retry_after('-5') == 0.0
+    assert leer_retry_after(email.utils.formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
+    assert leer_retry_after('mañana') is None
+    assert leer_retry_after(None) is None
+
+
+def test_reintenta_errores_del_servidor_hasta_lograrlo():
+    cliente = ClienteHTTP(reintentos=3, backoff=0.01)
+    with servidor_local(secuencia((503, {}, 'caido'), (502, {}, 'caido'), (200, {}, 'ok'))) as (origen, pedidos):
+        response = cliente.get(origen + '/x')
+
+    assert response.status_code == 200 and response.text == 'ok'
+    assert len(pedidos) == 3
+    assert cliente.estadisticas()[origen.removeprefix('http://')]['reintentos'] == 2
+
+
+def test_respeta_retry_after():
+    cliente = ClienteHTTP(reintentos=1, backoff=0.01)
+    with servidor_local(secuencia((429, {'Retry-After': '0.3'}, 'espera'), (200, {}, 'ok'))) as (origen, _):
+        inicio = time.monotonic()
+        response = cliente.get(origen + '/x')
+
+    assert response.status_code == 200
+    assert time.monotonic() - inicio >= 0.3
+
+
+def test_retry_after_se_acota_con_backoff_max():
+    cliente = ClienteHTTP(reintentos=1, backoff=0.01, backoff_max=0.1)
+    with servidor_local(secuencia((503, {'Retry-After': '60'}, ''), (200, {}, 'ok'))) as (origen, _):
+        inicio = time.monotonic()
+        cliente.get(origen + '/x')
+
+    assert time.monotonic() - inicio < 5
+
+
+def test_devuelve_el_ultimo_error_y_no_reintenta_los_definitivos():
+    cliente = ClienteHTTP(reintentos=2, backoff=0.01)
+    with servidor_local(secuencia((503, {}, 'caido'))) as (origen, pedidos):
+        assert cliente.get(origen + '/x').status_code == 503
+        assert len(pedidos) == 3
+
+    with servidor_local(secuencia((404, {}, 'no'))) as (origen, pedidos):
+        assert cliente.get(origen + '/x').status_code == 404
+        assert len(pedidos) == 1
+
+
+def test_error_de_red_se_lanza_despues_de_los_reintentos():
+    with socket.socket() as libre:
+        libre.bind(('127.0.0.1', 0))
+        puerto = libre.getsockname()[1]
+    cliente = ClienteHTTP(reintentos=2, backoff=0.01)
+
+    with pytest.raises(requests.ConnectionError):
+        cliente.get(f'http://127.0.0.1:{puerto}/')
+    assert cliente.estadisticas()[f'127.0.0.1:{puerto}']['errores'] == 3
+
+
+def test_reutiliza_conexiones_del_pool():
+    cliente = ClienteHTTP()
+    with servidor_local(secuencia((200, {}, 'ok'))) as (origen, _):
+        for _ in range(5):
+            cliente.get(origen + '/x')
+
+    datos = cliente.estadisticas()[origen.removeprefix('http://')]
+    assert datos['peticiones'] == 5
+    assert datos['conexiones_nuevas'] == 1 and datos['reutilizadas'] == 4
@@ -0,0 +1,134 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+import concurrencia
+from concurrencia import UnVuelo, UnVueloEntreProcesos
+
+
+def rafaga(funcion, hilos=8):
+    """Corre funcion() en varios hilos a la vez y devuelve resultados o excepciones"""
+    resultados = []
+    barrera = threading.Barrier(hilos)
+
+    def correr():
+        barrera.wait()
+        try:
+            resultados.append(funcion())
+        except Exception as e:
+            resultados.append(e)
+
+    trabajadores = [threading.Thread(target=correr) for _ in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    return resultados
+
+
+def test_un_vuelo_agrupa_llamadas_simultaneas():
+    vuelos = UnVuelo()
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        time.sleep(0.2)
+        return 'resultado'
+
+    resultados = rafaga(lambda: vuelos.ejecutar('clave', calcular))
+
+    assert resultados == ['resultado'] * 8
+    assert len(llamadas) == 1
+    assert vuelos.ejecutadas == 1 and vuelos.compartidas == 7
+
+
+def test_un_vuelo_comparte_el_error_y_despues_vuelve_a_calcular():
+    vuelos = UnVuelo()
+
+    def fallar():
+        time.sleep(0.1)
+        raise ValueError('falló')
+
+    resultados = rafaga(lambda: vuelos.ejecutar('clave', fallar), hilos=4)
+
+    assert all(isinstance(r, ValueError) for r in resultados)
+    assert vuelos.ejecutar('clave', lambda: 'ok') == 'ok'
+
+
+def test_un_vuelo_claves_distintas_no_se_esperan():
+    vuelos = UnVuelo()
+    contador = iter(range(100))
+
+    resultados = rafaga(lambda: vuelos.ejecutar(next(contador), lambda: time.sleep(0.1) or 'ok'), hilos=4)
+
+    assert resultados == ['ok'] * 4
+    assert vuelos.ejecutadas == 4
+
+
+def test_sin_fcntl_entre_procesos_calcula_directo(tmp_path, monkeypatch):
+    monkeypatch.setattr(concurrencia, 'fcntl', None)
+
+    assert UnVueloEntreProcesos(str(tmp_path)).ejecutar('clave', lambda: 42) == 42
+
+
+
+def _en_otro_proceso(funcion):
+    contexto = multiprocessing.get_context('fork')
+    proceso = contexto.Process(target=funcion)
+    proceso.start()
+    return proceso
+
+
+@pytest.mark.skipif(concurrencia.fcntl is None, reason='requiere fcntl')
+def test_entre_procesos_agrupa_la_misma_clave(tmp_path):
+    registro = tmp_path / 'llamadas'
+    vuelos = UnVueloEntreProcesos(str(tmp_path / 'vuelos'))
+
+    def calcular():
+        with open(registro, 'a') as f:
+            f.write('x')
+        time.sleep(0.5)
+        return 'resultado'
+
+    otro = _en_otro_proceso(lambda: vuelos.ejecutar('clave', calcular))
+    time.sleep(0.1)
+    resultado = vuelos.ejecutar('clave', calcular)
+    otro.join()
+
+    assert resultado == 'resultado'
+    assert registro.read_text() == 'x'
+
+
+@pytest.mark.skipif(concurrencia.fcntl is None, reason='requiere fcntl')
+def test_entre_procesos_claves_distintas_no_se_bloquean(tmp_path):
+    vuelos = UnVueloEntreProcesos(str(tmp_path / 'vuelos'))
+    # Claves que con 64 franjas compartían archivo de bloqueo
+    franja = lambda clave: int(hashlib.sha1(repr(clave).encode('utf-8')).hexdigest()[:8], 16) % 64
+    otra = next(f'clave-{i}' for i in range(1, 10000) if franja(f'clave-{i}') == franja('clave-0'))
+
+    lento = _en_otro_proceso(lambda: vuelos.ejecutar('clave-0', lambda: time.sleep(1)))
+    time.sleep(0.2)
+    inicio = time.monotonic()
+    vuelos.ejecutar(otra, lambda: 'ok')
+    espera = time.monotonic() - inicio
+    lento.join()
+
+    assert espera < 0.5
+
+
+def test_entre_procesos_borra_archivos_viejos(tmp_path):
+    carpeta = tmp_path / 'vuelos'
+    vuelos = UnVueloEntreProcesos(str(carpeta), retencion=60)
+    vuelos.ejecutar('vieja', lambda: 1)
+    for archivo in carpeta.iterdir():
+        os.utime(archivo, (time.time() - 120, time.time() - 120))
+
+    vuelos._ultima_limpieza = 0
+    vuelos.ejecutar('nueva', lambda: 2)
+
+    huella_nueva = vuelos._rutas('nueva')[0]
+    assert {archivo.name.split('.')[0] for archivo in carpeta.iterdir()} == {huella_nueva}
@@ -0,0 +1,158 @@
+import json
+
+import pytest
+
+import pelicula_link_extractor
+from cinecalidad_scraping import CinecalidadScraper
+from cliente_http import ClienteHTTP
+from origen_falso import OrigenFalso
+from pelicula_link_extractor import AdvancedLinksExtractor
+
+
+class PipelineFalso:
+    """Arma resultados como armar_resultado, numerados por posición como el pipeline."""
+    procesadas = []
+
+    def __init__(self, extractor, **opciones):
+        pass
+
+    def procesar(self, peliculas):
+        PipelineFalso.procesadas.extend(p['enlace'] for p in peliculas)
+        return [
+            {
+                'titulo': p['titulo'],
+                'año': p.get('año'),
+                'url_pelicula': p['enlace'],
+                'servidores': [{'nombre': 'nuevo', 'descripcion': '', 'url': p['enlace'] + 'e'}],
+                'id': i,
+            }
+            for i, p in enumerate(peliculas, 1)
+        ]
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    PipelineFalso.procesadas = []
+    monkeypatch.setattr(pelicula_link_extractor, 'PipelinePeliculas', PipelineFalso)
+    return AdvancedLinksExtractor(cliente=object())
+
+
+@pytest.fixture
+def scraper():
+    origen_falso = OrigenFalso(paginas=6)
+    origen_falso.iniciar()
+    yield CinecalidadScraper(max_trabajadores=2, peticiones_por_segundo=1000, rafaga=2,
+                             cliente=ClienteHTTP(), base_url=origen_falso.origen)
+    origen_falso.detener()
+
+
+def escribir(tmp_path, nombre, datos):
+    ruta = tmp_path / nombre
+    ruta.write_text(json.dumps(datos), encoding='utf-8')
+    return str(ruta)
+
+
+def servidores(nombre):
+    return [{'nombre': nombre, 'descripcion': '', 'url': 'https://v/' + nombre}]
+
+
+def test_reutiliza_lo_conocido_y_extrae_lo_nuevo(extractor, tmp_path):
+    listado = escribir(tmp_path, 'listado.json', [
+        {'titulo': 'Nueva', 'año': '2024', 'calidad': 'HD', 'enlace': 'https://x/peli/nueva/'},
+        {'titulo': 'Vieja', 'año': '2001', 'calidad': 'HD', 'enlace': 'https://x/peli/vieja/'},
+    ])
+    previo = escribir(tmp_path, 'previo.json', [
+        {'titulo': 'Vieja', 'año': '2001', 'url_pelicula': 'https://x/peli/vieja/',
+         'servidores': servidores('viejo'), 'id': 'v1'},
+        {'titulo': 'Retirada', 'año': '1990', 'url_pelicula': 'https://x/peli/retirada/',
+         'servidores': servidores('r'), 'id': 'r1'},
+    ])
+
+    resultados = extractor.procesar_peliculas_incremental(listado, previo)
+
+    assert PipelineFalso.procesadas == ['https://x/peli/nueva/']
+    assert [r['titulo'] for r in resultados] == ['Nueva', 'Vieja', 'Retirada']
+    assert resultados[1]['id'] == 'v1' and resultados[1]['servidores'] == servidores('viejo')
+    assert isinstance(resultados[0]['id'], str)
+
+
+def test_mismo_titulo_otro_año_no_reutiliza_servidores(extractor, tmp_path):
+    # Resultado viejo sin url_pelicula: solo se empareja por título y año
+    listado = escribir(tmp_path, 'listado.json', [
+        {'titulo': 'Dune', 'año': '2021', 'enlace': 'https://x/peli/dune-2021/'},
+        {'titulo': 'Solaris', 'año': '1972', 'enlace': 'https://x/peli/solaris/'},
+    ])
+    previo = escribir(tmp_path, 'previo.json', [
+        {'titulo': 'Dune', 'año': '1984', 'servidores': servidores('dune84'), 'id': 'd84'},
+        {'titulo': 'Solaris', 'año': '1972', 'servidores': servidores('sol'), 'id': 's72'},
+    ])
+
+    resultados = extractor.procesar_peliculas_incremental(listado, previo)
+
+    assert PipelineFalso.procesadas == ['https://x/peli/dune-2021/']
+    dune, solaris, dune84 = resultados
+    assert dune['servidores'] != servidores('dune84') and dune['id'] != 'd84'
+    assert solaris['id'] == 's72'
+    assert dune84['id'] == 'd84'
+
+
+def test_titulo_sin_año_no_empareja(extractor, tmp_path):
+    listado = escribir(tmp_path, 'listado.json', [
+        {'titulo': 'Dune', 'año': '', 'enlace': 'https://x/peli/dune/'},
+    ])
+    previo = escribir(tmp_path, 'previo.json', [
+        {'titulo': 'Dune', 'año': '', 'servidores': servidores('d'), 'id': 'd'},
+    ])
+
+    extractor.procesar_peliculas_incremental(listado, previo)
+
+    assert PipelineFalso.procesadas == ['https://x/peli/dune/']
+
+
+def test_cambio_de_año_o_sin_servidores_se_vuelve_a_extraer(extractor, tmp_path):
+    listado = escribir(tmp_path, 'listado.json', [
+        {'titulo': 'A', 'año': '2020', 'calidad': '4K', 'enlace': 'https://x/peli/a/'},
+        {'titulo': 'B', 'año': '2019', 'enlace': 'https://x/peli/b/'},
+        {'titulo': 'C', 'año': '2018', 'calidad': 'HD', 'enlace': 'https://x/peli/c/'},
+    ])
+    previo = escribir(tmp_path, 'previo.json', [
+        {'titulo': 'A', 'año': '', 'url_pelicula': 'https://x/peli/a/', 'servidores': servidores('a'), 'id': 'a'},
+        {'titulo': 'B', 'año': '2019', 'url_pelicula': 'https://x/peli/b/', 'servidores': [], 'id': 'b'},
+        {'titulo': 'C', 'año': '2018', 'url_pelicula': 'https://x/peli/c/', 'servidores': servidores('c'), 'id': 'c'},
+    ])
+
+    resultados = extractor.procesar_peliculas_incremental(listado, previo)
+
+    assert PipelineFalso.procesadas == ['https://x/peli/a/', 'https://x/peli/b/']
+    assert [r['id'] for r in resultados] == ['a', 'b', 'c']
+
+
+def test_forma_igual_a_la_corrida_completa(extractor, tmp_path):
+    listado = escribir(tmp_path, 'listado.json', [
+        {'titulo': 'Nueva', 'año': '2024', 'calidad': 'CAM', 'enlace': 'https://x/peli/nueva/'},
+    ])
+    previo = escribir(tmp_path, 'previo.json', [])
+
+    resultado, = extractor.procesar_peliculas_incremental(listado, previo)
+
+    completo, = PipelineFalso(extractor).procesar(json.load(open(listado, encoding='utf-8')))
+    assert set(resultado) == set(completo)
+    assert 'calidad' not in resultado
+
+
+def test_listado_incremental_se_detiene_en_lo_conocido(scraper):
+    completo = scraper.extraer_multiples_paginas(6)
+    por_pagina = len(completo) // 6
+    # La corrida anterior conocía desde la página 3; el primero de esa página cambió de calidad
+    conocidos = [dict(item) for item in completo[2 * por_pagina:]]
+    conocidos[0]['calidad'] = 'CAM'
+
+    resultado = scraper.extraer_incremental(conocidos, max_conocidos_seguidos=5, max_paginas=6)
+
+    assert resultado['paginas'] == 4
+    assert [i['enlace'] for i in resultado['nuevos']] == [i['enlace'] for i in completo[:2 * por_pagina]]
+    assert [i['enlace'] for i in resultado['cambiados']] == [conocidos[0]['enlace']]
+    # El listado queda completo, sin repetidos y con los ids anteriores para lo conocido
+    assert [i['enlace'] for i in resultado['items']] == [i['enlace'] for i in completo]
+    ids = {i['enlace']: i['id'] for i in conocidos}
+    assert all(i['id'] == ids[i['enlace']] for i in resultado['items'][2 * por_pagina:])
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from cinecalidad_scraping import CinecalidadScraper
+from cliente_http import ClienteHTTP
+from limitador import CuboTokens, LimitadorPorHost
+from origen_falso import OrigenFalso
+
+
+@pytest.fixture
+def origen():
+    origen_falso = OrigenFalso(latencia=0.1, paginas=6)
+    origen_falso.iniciar()
+    yield origen_falso
+    origen_falso.detener()
+
+
+def test_cubo_deja_pasar_la_rafaga_y_despues_espacia():
+    cubo = CuboTokens(tasa=10, rafaga=2)
+
+    assert cubo.reservar() == 0 and cubo.reservar() == 0
+    # Cada reserva sin token espera un intervalo más que la anterior
+    assert cubo.reservar() == pytest.approx(0.1, abs=0.01)
+    assert cubo.reservar() == pytest.approx(0.2, abs=0.01)
+
+
+def test_cubo_se_recarga_con_el_tiempo():
+    cubo = CuboTokens(tasa=20, rafaga=1)
+    cubo.reservar()
+    time.sleep(0.06)
+
+    assert cubo.reservar() == 0
+    assert cubo.esperar() > 0
+
+
+def test_un_cubo_por_host():
+    limitador = LimitadorPorHost(tasa=1, rafaga=1)
+
+    assert limitador.cubo('https://a.com/x') is limitador.cubo('https://a.com/y')
+    assert limitador.cubo('https://a.com/x') is not limitador.cubo('https://b.com/x')
+    assert limitador.esperar('https://a.com/') == 0
+    assert limitador.esperar('https://b.com/') == 0
+
+
+def test_listado_en_paralelo_conserva_el_orden_de_las_paginas(origen):
+    scraper = CinecalidadScraper(max_trabajadores=6, peticiones_por_segundo=100, rafaga=6,
+                                 cliente=ClienteHTTP(), base_url=origen.origen)
+
+    inicio = time.monotonic()
+    items = scraper.extraer_multiples_paginas(6)
+    duracion = time.monotonic() - inicio
+
+    paginas = [int(item['enlace'].rstrip('/').rsplit('-p', 1)[1]) for item in items]
+    assert paginas == sorted(paginas) and set(paginas) == set(range(1, 7))
+    assert len(items) == 6 * origen.items_por_pagina
+    # Seis páginas de 0.1 s a la vez tardan bastante menos que en serie
+    assert duracion < 0.4
+
+
+def test_listado_en_paralelo_respeta_la_tasa_por_host(origen):
+    scraper = CinecalidadScraper(max_trabajadores=6, peticiones_por_segundo=10, rafaga=1,
+                                 cliente=ClienteHTTP(), base_url=origen.origen)
+
+    inicio = time.monotonic()
+    scraper.extraer_multiples_paginas(6)
+
+    # Un token de entrada y los otros cinco a 10 por segundo
+    assert time.monotonic() - inicio >= 0.5
+    assert origen.estadisticas()['peticiones'] == 6
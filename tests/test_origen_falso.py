@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cinecalidad_scraping import CinecalidadScraper
+from cliente_http import ClienteHTTP
+from origen_falso import OrigenFalso
+
+from conftest import RAIZ
+
+
+@pytest.fixture
+def origen_falso():
+    falso = OrigenFalso(paginas=3)
+    falso.origen = 'http://falso'
+    return falso
+
+
+def test_rutas_del_origen_falso(origen_falso):
+    for path in ('/', '/page/2/', '/serie/', '/serie/page/3/', '/peli/una/', '/serie/una/',
+                 '/episodio/una-1x1/', '/embed.php'):
+        assert origen_falso.pagina(path, {})[0] == 200, path
+
+    assert origen_falso.pagina('/page/4/', {})[0] == 404
+    assert origen_falso.pagina('/otra/', {})[0] == 404
+
+    estado, cabeceras, _ = origen_falso.pagina('/r.php', {'id': ['abc']})
+    assert estado == 302
+    assert cabeceras['Location'] == origen_falso.pagina('/r.php', {'id': ['abc']})[1]['Location']
+    assert cabeceras['Location'] != origen_falso.pagina('/r.php', {'id': ['xyz']})[1]['Location']
+
+
+def test_los_enlaces_apuntan_al_origen_falso(origen_falso):
+    _, _, html = origen_falso.pagina('/page/2/', {})
+
+    assert 'cinecalidad.bar' not in html
+    assert 'http://falso/peli/' in html and '-p2/' in html
+
+
+def test_el_scraper_se_recupera_de_errores_inyectados():
+    # Con un solo trabajador la secuencia de errores de la semilla es siempre la misma
+    falso = OrigenFalso(tasa_error=0.5, paginas=5, semilla=3)
+    falso.iniciar()
+    try:
+        scraper = CinecalidadScraper(max_trabajadores=1, peticiones_por_segundo=1000,
+                                     cliente=ClienteHTTP(reintentos=8, backoff=0.01), base_url=falso.origen)
+        items = scraper.extraer_multiples_paginas(5)
+    finally:
+        falso.detener()
+
+    assert len(items) == 5 * falso.items_por_pagina
+    assert falso.estadisticas()['errores_inyectados'] > 0
+
+
+def test_el_scraper_respeta_los_429_del_origen():
+    falso = OrigenFalso(limite_por_segundo=3, paginas=6)
+    falso.iniciar()
+    try:
+        scraper = CinecalidadScraper(max_trabajadores=6, peticiones_por_segundo=1000, rafaga=6,
+                                     cliente=ClienteHTTP(reintentos=8), base_url=falso.origen)
+        items = scraper.extraer_multiples_paginas(6)
+    finally:
+        falso.detener()
+
+    estadisticas = falso.estadisticas()
+    assert len(items) == 6 * falso.items_por_pagina
+    assert estadisticas['limitadas'] > 0 and estadisticas['ok'] == 6
+
+
+def test_base_url_por_defecto_sale_del_entorno():
+    codigo = 'import cinecalidad_scraping as c; print(c.CinecalidadScraper(cliente=object()).base_url)'
+    salida = subprocess.run(
+        [sys.executable, '-c', codigo], cwd=os.path.join(RAIZ, 'scraper'), capture_output=True, text=True,
+        env={**os.environ, 'CINECALIDAD_URL': 'http://127.0.0.1:8765/'}, check=True
+    ).stdout
+
+    assert salida.strip().splitlines()[-1] == 'http://127.0.0.1:8765'
+    assert CinecalidadScraper(cliente=object(), base_url='http://otro/').base_url == 'http://otro'
@@ -0,0 +1,34 @@
+"""
+El parseo rápido (lxml + filtros por página, scraper/parseo.py) tiene que dar
+exactamente lo mismo que el de referencia (html.parser sobre la página
+completa) en cada extracción, sobre el corpus de benchmarks/fixtures/cinecalidad
+"""
+import functools
+
+import pytest
+
+import parseo
+from corpus_cinecalidad import casos, correr
+
+CASOS = [nombre for nombre, _ in casos()]
+
+MODOS_RAPIDOS = [('html.parser', True)]
+if parseo._parser_por_defecto() == 'lxml':
+    MODOS_RAPIDOS += [('lxml', False), ('lxml', True)]
+
+
+@functools.lru_cache(maxsize=None)
+def resultados(parser, filtrar):
+    return correr(parser, filtrar)
+
+
+@pytest.mark.parametrize('caso', CASOS)
+def test_la_referencia_extrae_algo(caso):
+    # Un corpus que no ejercita la extracción haría pasar cualquier parseo
+    assert resultados('html.parser', False)[caso] not in (None, [], {}, 1)
+
+
+@pytest.mark.parametrize('parser, filtrar', MODOS_RAPIDOS)
+@pytest.mark.parametrize('caso', CASOS)
+def test_parseo_rapido_igual_a_referencia(parser, filtrar, caso):
+    assert resultados(parser, filtrar)[caso] == resultados('html.parser', False)[caso]
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from cinecalidad_scraping import CinecalidadScraper
+from cliente_http import ClienteHTTP
+from origen_falso import OrigenFalso
+from pelicula_link_extractor import AdvancedLinksExtractor
+from pipeline_peliculas import PipelinePeliculas
+
+SIN_LIMITE = {'peticiones_por_segundo': 1000, 'peticiones_por_segundo_host': 1000}
+
+
+class ClienteContado(ClienteHTTP):
+    """ClienteHTTP que registra cuántos GET hay en curso a la vez"""
+
+    def __init__(self, **opciones):
+        super().__init__(**opciones)
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self._contador = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._contador:
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        try:
+            return super().get(url, **kwargs)
+        finally:
+            with self._contador:
+                self.en_curso -= 1
+
+
+@pytest.fixture(scope='module')
+def origen():
+    origen_falso = OrigenFalso(latencia=0.02, jitter=0.05, semilla=7)
+    origen_falso.iniciar()
+    yield origen_falso
+    origen_falso.detener()
+
+
+@pytest.fixture(scope='module')
+def listado(origen):
+    scraper = CinecalidadScraper(cliente=ClienteHTTP(), base_url=origen.origen, peticiones_por_segundo=1000)
+    return scraper.extraer_peliculas()[:12]
+
+
+def test_mismos_resultados_y_orden_que_en_serie(listado):
+    extractor = AdvancedLinksExtractor(cliente=ClienteHTTP())
+    en_serie = [extractor.procesar_pelicula(pelicula) for pelicula in listado]
+
+    resultados = PipelinePeliculas(extractor, **SIN_LIMITE).procesar(listado)
+
+    assert [r['id'] for r in resultados] == list(range(1, len(listado) + 1))
+    assert [{k: v for k, v in r.items() if k != 'id'} for r in resultados] == en_serie
+    assert all(r['servidores'] for r in resultados)
+
+
+def test_respeta_la_concurrencia_por_host(listado):
+    cliente = ClienteContado()
+    extractor = AdvancedLinksExtractor(cliente=cliente)
+
+    PipelinePeliculas(extractor, max_por_host=2, trabajadores={'pagina': 6, 'player': 6}, **SIN_LIMITE).procesar(listado)
+
+    # Películas y players están en el mismo host
+    assert cliente.max_en_curso == 2
+
+
+def test_respeta_la_tasa_global(listado):
+    extractor = AdvancedLinksExtractor(cliente=ClienteHTTP())
+    inicio = time.monotonic()
+
+    PipelinePeliculas(extractor, peticiones_por_segundo=20, peticiones_por_segundo_host=1000).procesar(listado[:5])
+
+    # 10 descargas (página y player): una ráfaga de 20 no las frena; con 5 por segundo sí
+    assert time.monotonic() - inicio < 1
+    inicio = time.monotonic()
+    PipelinePeliculas(extractor, peticiones_por_segundo=5, peticiones_por_segundo_host=1000).procesar(listado[:5])
+    assert time.monotonic() - inicio >= 0.9
+
+
+def test_una_pelicula_que_falla_no_frena_las_demas(origen, listado):
+    peliculas = [
+        listado[0],
+        {'titulo': 'Sin URL'},
+        {'titulo': 'Borrada', 'enlace': origen.origen + '/no-existe/'},
+        listado[1],
+    ]
+
+    resultados = PipelinePeliculas(AdvancedLinksExtractor(cliente=ClienteHTTP()), **SIN_LIMITE).procesar(peliculas)
+
+    assert [(r['id'], r['url_pelicula']) for r in resultados] == [(1, listado[0]['enlace']), (4, listado[1]['enlace'])]
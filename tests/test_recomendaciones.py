@@ -0,0 +1,61 @@
+import pytest
+
+from recomendaciones import DISPONIBLE, construir_vecinos, terminos_item, vecinos_de
+
+requiere_scipy = pytest.mark.skipif(not DISPONIBLE, reason='NumPy/SciPy no están instalados')
+
+ITEMS = [
+    {'id': 'a', 'descripcion': 'Un detective investiga un crimen en el puerto', 'director': ['Ana Gómez']},
+    {'id': 'b', 'descripcion': 'Otro crimen sin resolver', 'director': ['Ana Gómez']},
+    {'id': 'c', 'descripcion': 'Una nave viaja a otra galaxia', 'actores': ['Luis Paz']},
+    {'id': 'd', 'descripcion': 'La galaxia en guerra', 'actores': ['Luis Paz']},
+    {'id': 'e', 'descripcion': 'Comedia romántica'},
+]
+
+
+def test_terminos_usan_personas_como_un_solo_termino():
+    terminos = terminos_item(ITEMS[0])
+
+    assert terminos.count('persona:ana-gomez') == 2
+    assert 'detective' in terminos and 'un' not in terminos and 'en' not in terminos
+
+
+@requiere_scipy
+def test_vecinos_por_contenido_compartido():
+    vecinos = construir_vecinos(ITEMS)
+
+    assert [i for i, _ in vecinos_de(vecinos, 0, 5)] == [1]
+    assert [i for i, _ in vecinos_de(vecinos, 3, 5)] == [2]
+    # Sin términos en común no hay vecinos, ni el propio item
+    assert vecinos_de(vecinos, 4, 5) == []
+    similitud = vecinos_de(vecinos, 0, 5)[0][1]
+    assert 0 < similitud <= 1
+
+
+@requiere_scipy
+def test_vecinos_por_lotes_dan_lo_mismo(monkeypatch):
+    completo = construir_vecinos(ITEMS)
+    monkeypatch.setattr('recomendaciones.FILAS_POR_LOTE', 2)
+    por_lotes = construir_vecinos(ITEMS)
+
+    assert (completo[0] == por_lotes[0]).all()
+    assert construir_vecinos([]) is None
+
+
+def test_relacionados_por_generos_y_año(cliente):
+    datos = cliente.get('/api/peliculas/p1/relacionados').get_json()
+
+    assert datos['modo'] == 'generos'
+    assert [p['id'] for p in datos['relacionados']] == ['p2']
+    assert datos['item_actual']['id'] == 'p1'
+
+
+@requiere_scipy
+def test_relacionados_por_contenido_y_errores(cliente):
+    # Todas las películas comparten director: el término no relaciona nada
+    datos = cliente.get('/api/peliculas/p1/relacionados?modo=contenido').get_json()
+    assert datos['modo'] == 'contenido' and datos['relacionados'] == []
+
+    assert cliente.get('/api/peliculas/p1/relacionados?modo=otro').status_code == 400
+    assert cliente.get('/api/otros/p1/relacionados').status_code == 400
+    assert cliente.get('/api/peliculas/nada/relacionados').status_code == 404
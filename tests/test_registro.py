@@ -0,0 +1,98 @@
+import logging
+import os
+import queue
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from registro import FiltroMuestreo, _ManejadorCola, leer_muestreo
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+
+
+def correr(codigo, tmp_path):
+    """Corre el código en un proceso nuevo (configurar_registro es una vez por proceso)"""
+    salida = tmp_path / 'registro.log'
+    resultado = subprocess.run(
+        [sys.executable, '-c', textwrap.dedent(codigo).format(salida=str(salida))],
+        cwd=RAIZ, env={**os.environ, 'LOG_FORMATO': 'json', 'LOG_MUESTREO': ''},
+        capture_output=True, text=True, timeout=30
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    return salida.read_text(encoding='utf-8')
+
+
+def test_registros_llegan_a_la_salida(tmp_path):
+    texto = correr("""
+        import logging
+        import registro
+        from registro import configurar_registro
+        destino = open({salida!r}, 'w', encoding='utf-8')
+        configurar_registro(nivel='INFO', destino=destino)
+        logging.getLogger('prueba').info('hola', extra={{'campo': 1}})
+        registro._oyente.stop()
+    """, tmp_path)
+
+    assert '"mensaje": "hola"' in texto
+    assert '"campo": 1' in texto
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requiere os.fork')
+def test_registros_del_hijo_despues_de_fork(tmp_path):
+    texto = correr("""
+        import logging, os
+        import registro
+        from registro import configurar_registro
+        destino = open({salida!r}, 'w', encoding='utf-8', buffering=1)
+        configurar_registro(nivel='INFO', destino=destino)
+        logging.getLogger('prueba').info('antes del fork')
+        pid = os.fork()
+        if pid == 0:
+            logging.getLogger('prueba').info('desde el hijo')
+            registro._oyente.stop()
+            destino.flush()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        registro._oyente.stop()
+    """, tmp_path)
+
+    assert 'antes del fork' in texto
+    assert 'desde el hijo' in texto
+
+
+def registro_de(nombre, nivel=logging.INFO, mensaje='mensaje'):
+    return logging.LogRecord(nombre, nivel, __file__, 1, mensaje, None, None)
+
+
+def test_cola_llena_descarta_sin_bloquear():
+    manejador = _ManejadorCola(queue.Queue(1))
+    for _ in range(3):
+        manejador.emit(registro_de('prueba'))
+
+    assert manejador.queue.qsize() == 1
+    assert manejador.descartados == 2
+
+
+def test_mensaje_se_resuelve_al_encolar():
+    manejador = _ManejadorCola(queue.Queue())
+    record = logging.LogRecord('prueba', logging.INFO, __file__, 1, 'hola %s', ('mundo',), None)
+    manejador.emit(record)
+
+    encolado = manejador.queue.get_nowait()
+    assert encolado.msg == 'hola mundo'
+    assert encolado.args is None
+
+
+def test_muestreo_por_prefijo_y_advertencias_siempre():
+    filtro = FiltroMuestreo({'scraper': 1.0, 'scraper.peliculas': 0.0})
+
+    assert filtro.filter(registro_de('scraper.series'))
+    assert not filtro.filter(registro_de('scraper.peliculas'))
+    assert filtro.filter(registro_de('scraper.peliculas', logging.WARNING))
+    assert filtro.filter(registro_de('api'))
+
+
+def test_leer_muestreo_ignora_partes_invalidas():
+    assert leer_muestreo('scraper.peliculas=0.1, api=0.5,roto,x=y') == {'scraper.peliculas': 0.1, 'api': 0.5}
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from origen_falso import OrigenFalso
+from resolucion import CacheEnlaces, ResolvedorEnlaces
+
+from conftest import servidor_local
+
+
+@pytest.fixture
+def origen():
+    """Origen falso: /r.php responde 302 a un destino que depende del id"""
+    origen_falso = OrigenFalso(latencia=0.2)
+    origen_falso.iniciar()
+    yield origen_falso
+    origen_falso.detener()
+
+
+def resolvedor(tmp_path, **opciones):
+    return ResolvedorEnlaces(CacheEnlaces(str(tmp_path / 'enlaces.sqlite3'), **opciones))
+
+
+def test_resuelve_la_redireccion_y_la_guarda(tmp_path, origen):
+    enlaces = resolvedor(tmp_path)
+
+    url_final, desde_cache = enlaces.resolver(f'{origen.origen}/r.php?id=1')
+    repetido, repetido_desde_cache = enlaces.resolver(f'{origen.origen}/r.php?id=1')
+
+    assert url_final.startswith('https://video.servidor.invalid/e/')
+    assert not desde_cache
+    assert (repetido, repetido_desde_cache) == (url_final, True)
+    assert origen.estadisticas()['peticiones'] == 1
+
+
+def test_llamadas_simultaneas_hacen_una_sola_peticion(tmp_path, origen):
+    enlaces = resolvedor(tmp_path)
+    resultados = []
+    barrera = threading.Barrier(8)
+
+    def resolver():
+        barrera.wait()
+        resultados.append(enlaces.resolver(f'{origen.origen}/r.php?id=2')[0])
+
+    hilos = [threading.Thread(target=resolver) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(set(resultados)) == 1 and resultados[0]
+    assert origen.estadisticas()['peticiones'] == 1
+
+
+def test_vence_con_el_ttl(tmp_path, origen):
+    enlaces = resolvedor(tmp_path, ttl=0.3)
+
+    enlaces.resolver(f'{origen.origen}/r.php?id=3')
+    time.sleep(0.4)
+    _, desde_cache = enlaces.resolver(f'{origen.origen}/r.php?id=3')
+
+    assert not desde_cache
+    assert origen.estadisticas()['peticiones'] == 2
+
+
+def test_los_fallos_se_guardan_con_ttl_corto(tmp_path, origen):
+    enlaces = resolvedor(tmp_path, ttl_fallo=0.3)
+    url = f'{origen.origen}/no-existe/r.php'
+
+    assert enlaces.resolver(url) == (None, False)
+    assert enlaces.resolver(url) == (None, True)
+    time.sleep(0.4)
+    assert enlaces.resolver(url) == (None, False)
+    assert origen.estadisticas()['peticiones'] == 2
+
+
+def test_expulsa_los_menos_usados(tmp_path):
+    cache = CacheEnlaces(str(tmp_path / 'enlaces.sqlite3'), max_entradas=2)
+
+    cache.guardar('a', 'https://video/a')
+    time.sleep(0.01)
+    cache.guardar('b', 'https://video/b')
+    time.sleep(0.01)
+    cache.obtener('a')
+    time.sleep(0.01)
+    cache.guardar('c', 'https://video/c')
+
+    assert cache.obtener('a') == (True, 'https://video/a')
+    assert cache.obtener('b') == (False, None)
+    assert cache.obtener('c') == (True, 'https://video/c')
+
+
+def test_sin_redireccion_usa_el_iframe(tmp_path):
+    pagina = '<html><iframe src="https://video.servidor.invalid/e/iframe"></iframe></html>'
+    with servidor_local(lambda path, cabeceras: (200, {}, pagina)) as (origen, _):
+        url_final, _ = resolvedor(tmp_path).resolver(f'{origen}/r.php?id=4')
+
+    assert url_final == 'https://video.servidor.invalid/e/iframe'
@@ -0,0 +1,102 @@
+import socket
+import time
+
+import pytest
+
+from salud_servidores import (ESTADO_CAIDO, ESTADO_OK, UMBRAL_CAIDO, TablaSalud, VerificadorSalud,
+                              enlaces_del_catalogo, ordenar_servidores)
+
+from conftest import servidor_local
+
+
+def puerto_cerrado():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def hosts():
+    """Host de servidores de video: /r/<nombre> redirige a /video/<nombre>"""
+    cerrado = puerto_cerrado()
+
+    def responder(path, cabeceras):
+        if path == '/r/muerto':
+            return 302, {'Location': f'http://127.0.0.1:{cerrado}/video'}, ''
+        if path.startswith('/r/'):
+            return 302, {'Location': f'/video/{path[3:]}'}, ''
+        if path == '/video/lento':
+            time.sleep(0.3)
+        if path == '/video/error':
+            return 503, {}, 'no disponible'
+        return 200, {}, 'video'
+
+    with servidor_local(responder) as (origen, pedidos):
+        yield origen
+
+
+@pytest.fixture
+def tabla(tmp_path):
+    return TablaSalud(str(tmp_path / 'salud.sqlite3'))
+
+
+def revisar(tabla, origen, *nombres):
+    verificador = VerificadorSalud(tabla, max_trabajadores=4)
+    return {r['url'].rsplit('/', 1)[1]: r for r in verificador.verificar([(f'{origen}/r/{n}', None) for n in nombres])}
+
+
+def test_estado_codigo_y_ttfb(tabla, hosts):
+    resultados = revisar(tabla, hosts, 'ok', 'lento', 'error', 'muerto', 'sin-redireccion')
+
+    assert resultados['ok']['estado'] == ESTADO_OK and resultados['ok']['codigo'] == 200
+    assert resultados['lento']['estado'] == ESTADO_OK and resultados['lento']['ttfb_ms'] >= 300
+    assert resultados['ok']['ttfb_ms'] < resultados['lento']['ttfb_ms']
+    assert resultados['error']['estado'] == ESTADO_CAIDO and resultados['error']['codigo'] == 503
+    assert resultados['muerto']['estado'] == ESTADO_CAIDO and resultados['muerto']['codigo'] is None
+
+    estados = tabla.estados([f'{hosts}/r/ok', f'{hosts}/r/error'])
+    assert estados[f'{hosts}/r/ok']['fallos'] == 0
+    assert estados[f'{hosts}/r/error']['fallos'] == 1
+
+
+def test_orden_por_salud(tabla, hosts):
+    revisar(tabla, hosts, 'ok', 'lento', 'error')
+    servidores = [{'url_redirect': f'{hosts}/r/{n}'} for n in ('error', 'nuevo', 'lento', 'ok')]
+
+    ordenados = ordenar_servidores(servidores, tabla.estados([s['url_redirect'] for s in servidores]))
+
+    assert [s['url_redirect'].rsplit('/', 1)[1] for s in ordenados] == ['ok', 'lento', 'nuevo', 'error']
+    assert [s['indice'] for s in ordenados] == [3, 2, 1, 0]
+
+
+def test_se_oculta_recien_al_llegar_al_umbral(tabla, hosts):
+    servidores = [{'url_redirect': f'{hosts}/r/error'}]
+
+    for revision in range(1, UMBRAL_CAIDO + 1):
+        revisar(tabla, hosts, 'error')
+        estados = tabla.estados([servidores[0]['url_redirect']])
+        visibles = ordenar_servidores(servidores, estados)
+        assert estados[servidores[0]['url_redirect']]['fallos'] == revision
+        assert len(visibles) == (1 if revision < UMBRAL_CAIDO else 0)
+
+    assert len(ordenar_servidores(servidores, estados, incluir_caidos=True)) == 1
+
+
+def test_una_revision_exitosa_reinicia_los_fallos(tabla):
+    url = 'https://video/r/1'
+    tabla.guardar([{'url': url, 'estado': ESTADO_CAIDO, 'codigo': 503, 'ttfb_ms': None, 'revisado': 0}])
+    tabla.guardar([{'url': url, 'estado': ESTADO_CAIDO, 'codigo': 503, 'ttfb_ms': None, 'revisado': 1}])
+    tabla.guardar([{'url': url, 'estado': ESTADO_OK, 'codigo': 200, 'ttfb_ms': 10, 'revisado': 2}])
+
+    assert tabla.estados([url])[url]['fallos'] == 0
+
+
+def test_enlaces_del_catalogo_sin_duplicados():
+    peliculas = [{'player_url': 'p1', 'servidores': [{'url_redirect': 'a'}, {'url_redirect': 'b'}]}]
+    series = [
+        {'temporadas': 'seasons 1'},
+        {'temporadas': [{'episodios': [{'player_url': 'e1', 'servidores': [{'url_redirect': 'b'}, {'url_redirect': 'c'}]}]}]},
+        {'temporadas': [{'episodios': 'Episodios 3'}]}
+    ]
+
+    assert enlaces_del_catalogo(peliculas, series) == [('a', 'p1'), ('b', 'p1'), ('c', 'e1')]
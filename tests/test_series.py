@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+
+import pytest
+
+from cinecalidad_scraping import CinecalidadScraper
+from cliente_http import ClienteHTTP
+from origen_falso import OrigenFalso
+from serie_link_extractor import CineCalidadSerieExtractor
+
+
+class ClienteContado(ClienteHTTP):
+    """ClienteHTTP que anota las URLs pedidas y cuántos GET hay en curso a la vez"""
+
+    def __init__(self, **opciones):
+        super().__init__(**opciones)
+        self.urls = []
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self._contador = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._contador:
+            self.urls.append(url)
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        try:
+            return super().get(url, **kwargs)
+        finally:
+            with self._contador:
+                self.en_curso -= 1
+
+
+@pytest.fixture(scope='module')
+def origen():
+    origen_falso = OrigenFalso(latencia=0.01, jitter=0.02, semilla=3)
+    origen_falso.iniciar()
+    yield origen_falso
+    origen_falso.detener()
+
+
+@pytest.fixture(scope='module')
+def serie(origen):
+    scraper = CinecalidadScraper(cliente=ClienteHTTP(), base_url=origen.origen, peticiones_por_segundo=1000)
+    return scraper.extraer_series()[0]
+
+
+def extractor_en(origen, cliente=None, **opciones):
+    opciones = {'peticiones_por_segundo': 1000, 'rafaga': 100, **opciones}
+    return CineCalidadSerieExtractor(cliente=cliente or ClienteHTTP(), base_url=origen.origen, **opciones)
+
+
+def episodios(resultado):
+    return [episodio for temporada in resultado['temporadas'] for episodio in temporada['episodios']]
+
+
+def test_episodios_en_paralelo_dan_lo_mismo_que_en_serie(origen, serie):
+    en_serie = extractor_en(origen, max_trabajadores=1).procesar_serie(serie)
+    cliente = ClienteContado()
+
+    en_paralelo = extractor_en(origen, cliente, max_trabajadores=4).procesar_serie(serie)
+
+    assert en_paralelo == en_serie
+    assert episodios(en_paralelo) and all(e['servidores'] for e in episodios(en_paralelo))
+    assert 1 < cliente.max_en_curso <= 4
+
+
+def test_episodios_respetan_la_tasa_por_host(origen, serie):
+    extractor = extractor_en(origen, max_trabajadores=8, peticiones_por_segundo=50, rafaga=1)
+
+    inicio = time.monotonic()
+    resultado = extractor.procesar_serie(serie)
+
+    # Serie + página y player de cada episodio, a 50 por segundo después del primero
+    peticiones = 1 + 2 * len(episodios(resultado))
+    assert time.monotonic() - inicio >= (peticiones - 1) / 50 * 0.9
+
+
+def test_refresco_reutiliza_los_episodios_con_servidores(origen, serie):
+    previa = extractor_en(origen).procesar_serie(serie)
+    previa['id'] = 'serie-1'
+    for episodio in episodios(previa):
+        episodio['servidores'] = [] if episodio['url'].endswith('1x2/') else [{'nombre': 'viejo'}]
+    cliente = ClienteContado()
+
+    resultado = extractor_en(origen, cliente).procesar_serie(serie, previa)
+
+    pedidos = {url for url in cliente.urls if '/episodio/' in url}
+    assert pedidos == {url for url in (e['url'] for e in episodios(previa)) if url.endswith('1x2/')}
+    assert resultado['id'] == 'serie-1'
+    for episodio in episodios(resultado):
+        nuevo = episodio['url'].endswith('1x2/')
+        assert (episodio['servidores'] == [{'nombre': 'viejo'}]) != nuevo
+        assert episodio['servidores']
+
+
+def test_procesar_series_empareja_solo_por_url(origen, serie, tmp_path):
+    otra = {**serie, 'enlace': origen.origen + '/serie/otra-con-el-mismo-titulo/'}
+    caida = {**serie, 'titulo': 'Caída', 'enlace': origen.origen + '/no-existe/'}
+    listado = tmp_path / 'series.json'
+    listado.write_text(json.dumps([otra, caida]), encoding='utf-8')
+    previas = [
+        {'id': 'vieja', 'titulo': serie['titulo'], 'url_serie': serie['enlace'], 'temporadas': []},
+        {'id': 'caida', 'titulo': 'Caída', 'url_serie': caida['enlace'], 'temporadas': []},
+    ]
+    archivo_previo = tmp_path / 'previas.json'
+    archivo_previo.write_text(json.dumps(previas), encoding='utf-8')
+
+    resultados = extractor_en(origen).procesar_series(str(listado), archivo_previo=str(archivo_previo))
+
+    # La serie con el mismo título y otra URL es nueva; la que falló conserva lo anterior
+    assert [r.get('id') for r in resultados] == [None, 'caida', 'vieja']
+    assert resultados[0]['url_serie'] == otra['enlace']